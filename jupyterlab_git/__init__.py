@@ -1,7 +1,7 @@
 """Initialize the backend server extension
 """
 
-from traitlets import CFloat, List, Dict, Unicode, default
+from traitlets import Bool, CFloat, CInt, List, Dict, Enum, Unicode, default
 from traitlets.config import Configurable
 
 try:
@@ -39,6 +39,14 @@ class JupyterLabGit(Configurable):
 
     excluded_paths = List(help="Paths to be excluded", config=True, trait=Unicode())
 
+    blob_cache_public = Bool(
+        help="""
+            Whether the file contents requested by blob hash can be cached by shared caches, like a reverse proxy, in addition to the browser.
+            Only enable it if the proxy cache is not shared between users allowed to see different repositories. By default it is set to False.
+        """,
+        config=True,
+    )
+
     credential_helper = Unicode(
         help="""
             The value of Git credential helper will be set to this value when the Git credential caching mechanism is activated by this extension.
@@ -52,6 +60,75 @@ class JupyterLabGit(Configurable):
         config=True,
     )
 
+    fetch_interval = CFloat(
+        help="Minimal delay in seconds between two background fetches, or probes, of a repository; requests in between get the last fetch result. By default it is set to 30 seconds.",
+        config=True,
+    )
+
+    fetch_max_backoff = CFloat(
+        help="Maximal delay in seconds between two background fetches of a repository when they keep failing. By default it is set to 600 seconds.",
+        config=True,
+    )
+
+    fetch_probe = Enum(
+        ["none", "heads", "upstream"],
+        default_value="heads",
+        help="""
+            Remote branches compared with `git ls-remote` before a background fetch; the fetch only runs if they changed.
+            "heads" probes all branches of all remotes, "upstream" only the current branch upstream and "none" disables the probe.
+        """,
+        config=True,
+    )
+
+    fetch_scope = Dict(
+        help="""
+            Scope of the background fetches. Supported keys: upstream_only (bool; only the current branch upstream),
+            remotes (list of remote names), refspecs (list of refspecs of the single remote in remotes),
+            tags (bool; whether to fetch tags), depth (int) and shallow_since (date).
+            By default only the current branch upstream is fetched, without tags. Forced fetches and fetches with credentials,
+            requested by the user, always fetch all the remotes.
+        """,
+        config=True,
+    )
+
+    job_retention = CFloat(
+        help="Delay in seconds during which the result of a finished background git operation (clone, fetch, pull, push) is kept. By default it is set to 300 seconds.",
+        config=True,
+    )
+
+    mirror_directory = Unicode(
+        help="""
+            Directory of the local mirrors of the cloned remote repositories, shared by all servers running as users able to write in it.
+            A clone of a mirrored remote only downloads the objects missing from the mirror. The mirror of a remote is created when
+            it is first cloned without credentials, in the background, and refreshed in the background when used. Mirrors only fetch the
+            remote branches and tags.
+            By default it is empty; mirrors are disabled.
+        """,
+        config=True,
+    )
+
+    mirror_quota = CInt(
+        help="Disk quota in bytes of the mirrors; the least recently used mirrors are deleted beyond it. By default it is set to 10 GiB.",
+        config=True,
+    )
+
+    mirror_refresh_interval = CFloat(
+        help="Minimal delay in seconds between two background refreshes of a mirror. By default it is set to 600 seconds.",
+        config=True,
+    )
+
+    mirror_dissociate = Bool(
+        help="""
+            Whether clones copy the objects borrowed from a mirror (`git clone --dissociate`). Otherwise the clones keep using the mirror
+            objects and break if the mirror is deleted, e.g. to respect the quota. By default it is set to True.
+        """,
+        config=True,
+    )
+
+    @default("blob_cache_public")
+    def _blob_cache_public_default(self):
+        return False
+
     @default("credential_helper")
     def _credential_helper_default(self):
         return "cache --timeout=3600"
@@ -60,6 +137,34 @@ class JupyterLabGit(Configurable):
     def _git_command_timeout_default(self):
         return 20.0
 
+    @default("fetch_interval")
+    def _fetch_interval_default(self):
+        return 30.0
+
+    @default("fetch_max_backoff")
+    def _fetch_max_backoff_default(self):
+        return 600.0
+
+    @default("fetch_scope")
+    def _fetch_scope_default(self):
+        return {"upstream_only": True, "tags": False}
+
+    @default("mirror_quota")
+    def _mirror_quota_default(self):
+        return 10 * 1024**3
+
+    @default("mirror_refresh_interval")
+    def _mirror_refresh_interval_default(self):
+        return 600.0
+
+    @default("mirror_dissociate")
+    def _mirror_dissociate_default(self):
+        return True
+
+    @default("job_retention")
+    def _job_retention_default(self):
+        return 300.0
+
 
 def _jupyter_server_extension_points():
     return [{"module": "jupyterlab_git"}]
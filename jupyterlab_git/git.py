@@ -2,28 +2,85 @@
 Module for executing git commands, sending results back to the handlers
 """
 
+import asyncio
 import base64
+import codecs
+import csv
 import datetime
+import difflib
+import functools
+from array import array
+import io
+import json
 import os
 import pathlib
 import re
 import shlex
 import shutil
+import signal
 import subprocess
+import tarfile
+import tempfile
+import threading
+import time
 import traceback
+import weakref
+from collections import OrderedDict
 from enum import Enum, IntEnum
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
 from urllib.parse import unquote
 
 import nbformat
 import pexpect
 import tornado
 import tornado.locks
-from jupyter_server.utils import ensure_async
+from jupyter_server.utils import ensure_async, url2path
 from nbdime import diff_notebooks, merge_notebooks
+from packaging.version import parse
 
+from .graph import (
+    DEFAULT_GRAPH_PAGE,
+    MAX_CACHED_GRAPHS,
+    MAX_GRAPH_PAGE,
+    CommitGraph,
+)
+from .images import (
+    DEFAULT_PREVIEW_SIZE,
+    MAX_CACHED_IMAGE_DIFFS,
+    MAX_PREVIEW_SIZE,
+    Image,
+    image_diff,
+)
+from .jobs import DEFAULT_JOB_RETENTION_S, JobManager
 from .log import get_logger
+from .mirrors import MirrorCache
+from .notebooks import (
+    MAX_CACHED_NOTEBOOK_DIFFS,
+    MAX_CACHED_NOTEBOOK_DIFFS_SIZE,
+    MAX_CACHED_NOTEBOOKS,
+    MAX_NOTEBOOK_DIFF_WORKERS,
+    blob_hash,
+    cell_diffs,
+    cells_summary,
+    content_hash,
+    read_notebook,
+    remove_cell_ids,
+    strip_notebook,
+)
+from .scheduler import (
+    DEFAULT_FETCH_INTERVAL_S,
+    DEFAULT_FETCH_MAX_BACKOFF_S,
+    DEFAULT_FETCH_PROBE,
+    DEFAULT_FETCH_SCOPE,
+    FetchScheduler,
+)
+from .tables import (
+    DEFAULT_TABLE_CHANGES,
+    MAX_TABLE_CHANGES,
+    table_delimiter,
+    table_diff,
+)
 
 # Regex pattern to capture (key, value) of Git configuration options.
 # See https://git-scm.com/docs/git-config#_syntax for git var syntax
@@ -45,14 +102,114 @@ GIT_BRANCH_STATUS = re.compile(
 GIT_DETACHED_HEAD = re.compile(r"^\(HEAD detached at (?P<commit>.+?)\)$")
 # Parse Git branch rebase name
 GIT_REBASING_BRANCH = re.compile(r"^\(no branch, rebasing (?P<branch>.+?)\)$")
+# Parse Git progress line; e.g. "Receiving objects:  45% (450/1000), 1.20 MiB | 1.00 MiB/s"
+GIT_PROGRESS = re.compile(
+    r"^(remote: )?(?P<phase>[A-Za-z][\w ]*?):\s+(?P<percent>\d+)% \((?P<done>\d+)/(?P<total>\d+)\)"
+)
+# Partial clone filters accepted by the clone
+GIT_CLONE_FILTER = re.compile(r"^(blob:none|blob:limit=\d+[kmg]?|tree:\d+)$")
+# Formats of the repository archives and their media type
+ARCHIVE_FORMATS = {
+    "zip": "application/zip",
+    "tar": "application/x-tar",
+    "tar.gz": "application/gzip",
+}
+# Size in bytes of the chunks streamed to the client
+STREAM_CHUNK_SIZE = 64 * 1024
+# Number of blobs copied in temporary files to serve byte ranges
+MAX_SPOOLED_BLOBS = 8
+# Full hash of a git object (SHA-1 or SHA-256)
+GIT_OBJECT_ID = re.compile(r"^([0-9a-f]{40}|[0-9a-f]{64})$")
+# Delay in seconds during which a blob content addressed by its hash is cached
+BLOB_CACHE_MAX_AGE_S = 365 * 24 * 3600
+# Number of leading bytes in which git looks for a NUL byte to detect binary content
+BINARY_DETECTION_SIZE = 8000
+# Names of the index stages of a conflicted file
+CONFLICT_STAGES = {"1": "base", "2": "ours", "3": "theirs"}
 # Git cache as a credential helper
 GIT_CREDENTIAL_HELPER_CACHE = re.compile(r"cache\b")
 # Parse git stash list
 GIT_STASH_LIST = re.compile(
     r"^stash@{(?P<index>\d+)}: (WIP on|On) (?P<branch>.+?): (?P<message>.+?)$"
 )
+# Parse Git upstream tracking information
+GIT_UPSTREAM_TRACK = re.compile(
+    r"^(ahead (?P<ahead>\d+))?(, )?(behind (?P<behind>\d+))?$"
+)
+# Minimal Git version supporting the `ahead-behind` field of for-each-ref
+AHEAD_BEHIND_MIN_VERSION = "2.41"
+# Maximal number of branches compared concurrently without the `ahead-behind` field
+MAX_AHEAD_BEHIND_WORKERS = 8
+# Parse unified diff hunk header
+GIT_DIFF_HUNK = re.compile(
+    r"^@@ -(?P<old_start>\d+)(,(?P<old_lines>\d+))? \+(?P<new_start>\d+)(,(?P<new_lines>\d+))? @@ ?(?P<header>.*)$"
+)
+# Default number of context lines around the text diff hunks
+DEFAULT_DIFF_CONTEXT = 3
+# Maximal number of context lines around the text diff hunks
+MAX_DIFF_CONTEXT = 1000
+# Number of blobs whose line offsets are kept to read ranges of lines
+MAX_CACHED_LINE_OFFSETS = 16
+# Minimal Git version supporting `merge-tree --write-tree`
+MERGE_TREE_MIN_VERSION = "2.38"
+# Minimal Git version supporting `merge-tree --merge-base`
+MERGE_TREE_BASE_MIN_VERSION = "2.40"
+# Operations whose conflicts can be predicted
+MERGE_PREVIEW_OPERATIONS = ("pull", "merge", "rebase")
+# Fields of the references listed by for-each-ref
+REF_FORMATS = ["refname", "refname:short", "objectname", "upstream:short", "HEAD"]
+# for-each-ref sort key of the supported references orders
+REF_SORT_KEYS = {"name": "refname", "date": "-creatordate"}
+# Maximal number of repositories for which cached data are kept
+MAX_CACHED_REPOSITORIES = 64
+# Maximal number of server paths kept in the path resolution cache
+MAX_CACHED_PATHS = 1024
+# Files modified within that delay are not trusted to detect changes
+# as their timestamp may not change on the next write (aka racy git)
+RACY_TIMESTAMP_S = 2
+
+# Git commands that may modify the repository; a call of single_flight methods
+# never shares a call started before one of them
+WRITE_COMMANDS = frozenset(
+    (
+        "add",
+        "branch",
+        "checkout",
+        "cherry-pick",
+        "clone",
+        "commit",
+        "config",
+        "fetch",
+        "init",
+        "merge",
+        "mv",
+        "pull",
+        "push",
+        "rebase",
+        "remote",
+        "reset",
+        "restore",
+        "revert",
+        "rm",
+        "sparse-checkout",
+        "stash",
+        "switch",
+        "symbolic-ref",
+        "tag",
+    )
+)
 
 execution_lock = tornado.locks.Lock()
+# Locks of the network commands per working directory
+_repository_locks = weakref.WeakValueDictionary()
+
+
+def repository_lock(cwd: str) -> tornado.locks.Lock:
+    """Get the lock serializing the network commands run in a directory."""
+    lock = _repository_locks.get(cwd)
+    if lock is None:
+        lock = _repository_locks[cwd] = tornado.locks.Lock()
+    return lock
 
 
 class State(IntEnum):
@@ -86,15 +243,30 @@ async def execute(
     username: "Optional[str]" = None,
     password: "Optional[str]" = None,
     is_binary=False,
+    progress: "Optional[Callable[[dict], None]]" = None,
+    exclusive: bool = True,
+    locked: bool = True,
 ) -> "Tuple[int, str, str]":
     """Asynchronously execute a command.
 
+    The command runs in its own process group; if the calling task is cancelled,
+    the whole group is terminated.
+
+    Commands are serialized by a global lock, except the non exclusive ones. Those
+    are network commands; they are only serialized per working directory so that
+    they do not block the other git commands for the whole transfer. Read-only
+    commands not using the index may run without lock.
+
     Args:
         cmdline (List[str]): Command line to be executed
         cwd (Optional[str]): Current working directory
         env (Optional[Dict[str, str]]): Defines the environment variables for the new process
         username (Optional[str]): User name
         password (Optional[str]): User password
+        progress (Optional[Callable[[dict], None]]): Called with the progress events parsed from the
+            standard error; e.g. ``{"phase": "Receiving objects", "percent": 45, "done": 450, "total": 1000}``
+        exclusive (bool): Whether to hold the global lock rather than the directory one
+        locked (bool): Whether to hold a lock at all
     Returns:
         (int, str, str): (return code, stdout, stderr)
     """
@@ -135,12 +307,20 @@ async def execute(
             returncode = p.wait()
             p.close()
             return returncode, "", response
+        except asyncio.CancelledError:
+            kill_process_group(p.pid)
+            p.close(force=True)
+            raise
         except pexpect.exceptions.EOF:  # In case of pexpect failure
             response = p.before
             returncode = p.exitstatus
             p.close()  # close process
             return returncode, "", response
 
+    # Processes started by call_subprocess, killed if the calling task is cancelled
+    processes = []
+    cancelled = threading.Event()
+
     def call_subprocess(
         cmdline: "List[str]",
         cwd: "Optional[str]" = None,
@@ -148,8 +328,16 @@ async def execute(
         is_binary=is_binary,
     ) -> "Tuple[int, str, str]":
         process = subprocess.Popen(
-            cmdline, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, env=env
+            cmdline,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            start_new_session=True,
         )
+        processes.append(process)
+        if cancelled.is_set():
+            kill_process_group(process.pid)
         output, error = process.communicate()
         if is_binary:
             return (
@@ -160,8 +348,66 @@ async def execute(
         else:
             return (process.returncode, output.decode("utf-8"), error.decode("utf-8"))
 
+    async def call_subprocess_with_progress(
+        cmdline: "List[str]",
+        cwd: "Optional[str]" = None,
+        env: "Optional[Dict[str, str]]" = None,
+    ) -> "Tuple[int, str, str]":
+        process = await asyncio.create_subprocess_exec(
+            *cmdline,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            start_new_session=True,
+        )
+
+        async def read_error() -> str:
+            # Git rewrites progress lines in place using carriage returns
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            error = []
+            pending = ""
+            last_event = None
+            while True:
+                chunk = await process.stderr.read(4096)
+                text = decoder.decode(chunk, final=not chunk)
+                error.append(text)
+                *lines, pending = re.split(r"[\r\n]", pending + text)
+                for line in lines:
+                    match = GIT_PROGRESS.match(line)
+                    if match is None:
+                        continue
+                    event = {
+                        "phase": match.group("phase"),
+                        "percent": int(match.group("percent")),
+                        "done": int(match.group("done")),
+                        "total": int(match.group("total")),
+                    }
+                    if event != last_event:
+                        progress(event)
+                        last_event = event
+                if not chunk:
+                    return "".join(error)
+
+        try:
+            output, error, returncode = await asyncio.gather(
+                process.stdout.read(), read_error(), process.wait()
+            )
+        except asyncio.CancelledError:
+            kill_process_group(process.pid)
+            await process.wait()
+            raise
+        return returncode, output.decode("utf-8"), error
+
+    if not locked:
+        lock = None
+    elif exclusive:
+        lock = execution_lock
+    else:
+        lock = repository_lock(cwd)
     try:
-        await execution_lock.acquire(timeout=datetime.timedelta(seconds=timeout))
+        if lock is not None:
+            await lock.acquire(timeout=datetime.timedelta(seconds=timeout))
     except tornado.util.TimeoutError:
         return (1, "", "Unable to get the lock on the directory")
 
@@ -184,11 +430,19 @@ async def execute(
                 cwd,
                 env,
             )
+        elif progress is not None:
+            code, output, error = await call_subprocess_with_progress(cmdline, cwd, env)
         else:
             current_loop = tornado.ioloop.IOLoop.current()
-            code, output, error = await current_loop.run_in_executor(
-                None, call_subprocess, cmdline, cwd, env
-            )
+            try:
+                code, output, error = await current_loop.run_in_executor(
+                    None, call_subprocess, cmdline, cwd, env
+                )
+            except asyncio.CancelledError:
+                cancelled.set()
+                for process in processes:
+                    kill_process_group(process.pid)
+                raise
         log_output = (
             output[:MAX_LOG_OUTPUT] + "..." if len(output) > MAX_LOG_OUTPUT else output
         )
@@ -198,15 +452,113 @@ async def execute(
         get_logger().debug(
             "Code: {}\nOutput: {}\nError: {}".format(code, log_output, log_error)
         )
+    except asyncio.CancelledError:
+        get_logger().debug("Cancelled {!s}.".format(cmdline))
+        raise
     except BaseException as e:
         code, output, error = -1, "", traceback.format_exc()
         get_logger().warning("Fail to execute {!s}".format(cmdline), exc_info=True)
     finally:
-        execution_lock.release()
+        if lock is not None:
+            lock.release()
 
     return code, output, error
 
 
+def kill_process_group(pid: int) -> None:
+    """Terminate a process and the processes it started."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(pid, signal.SIGTERM)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def archive_command(
+    ref: str, archive_format: str = "tar", prefix: Optional[str] = None
+) -> List[str]:
+    """Command writing the archive of a reference to the standard output."""
+    cmd = ["git", "archive", "--format={}".format(archive_format)]
+    if prefix:
+        cmd.append("--prefix={}/".format(prefix))
+    cmd.extend(["--end-of-options", ref])
+    return cmd
+
+
+def extract_tar_stream(stream, target: str) -> None:
+    """Extract a tar stream into target without seeking into it."""
+    with tarfile.open(fileobj=stream, mode="r|") as archive:
+        if hasattr(tarfile, "data_filter"):
+            archive.extractall(target, filter="data")
+        else:
+            archive.extractall(target)
+
+
+def guess_clone_directory(repo_url: str) -> str:
+    """Directory name chosen by `git clone` for a repository URL."""
+    name = unquote(repo_url).rstrip("/")
+    if name.endswith("/.git"):
+        name = name[: -len("/.git")]
+    name = re.split(r"[/:\\]", name.rstrip("/"))[-1]
+    if name.endswith(".git"):
+        name = name[: -len(".git")]
+    return name or "repository"
+
+
+def split_lines(text: str) -> List[str]:
+    """Split a text on line feeds only.
+
+    Unlike ``str.splitlines``, other line boundaries like form feeds are kept
+    as git does; a final line feed does not add an empty line.
+    """
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+def parse_diff_hunks(patch: str) -> List[dict]:
+    """Parse the hunks of a unified diff; the file headers are skipped."""
+    hunks = []
+    hunk = None
+    for line in split_lines(patch):
+        match = GIT_DIFF_HUNK.match(line)
+        if match is not None:
+            hunk = {
+                "old_start": int(match.group("old_start")),
+                "old_lines": int(match.group("old_lines") or 1),
+                "new_start": int(match.group("new_start")),
+                "new_lines": int(match.group("new_lines") or 1),
+                "header": match.group("header"),
+                "lines": [],
+            }
+            hunks.append(hunk)
+        elif hunk is not None and line[:1] in (" ", "-", "+", "\\"):
+            hunk["lines"].append(line)
+        elif hunk is not None and line == "":
+            # Empty context line with trailing spaces stripped
+            hunk["lines"].append(" ")
+    return hunks
+
+
+def parse_cat_file_batch(output: bytes) -> Dict[str, bytes]:
+    """Parse the output of ``git cat-file --batch``; missing objects are skipped."""
+    contents = {}
+    position = 0
+    while position < len(output):
+        end = output.index(b"\n", position)
+        # Format: <object> SP <type> SP <size> LF <contents> LF or <object> SP missing LF
+        header = output[position:end].decode("utf-8").split()
+        position = end + 1
+        if len(header) == 3:
+            size = int(header[2])
+            contents[header[0]] = output[position : position + size]
+            position += size + 1
+    return contents
+
+
 def strip_and_split(s):
     """strip trailing \x00 and split on \x00
     Useful for parsing output of git commands with -z flag.
@@ -214,6 +566,305 @@ def strip_and_split(s):
     return s.strip("\x00").strip("\n").split("\x00")
 
 
+class LRUCache(OrderedDict):
+    """Mapping keeping at most ``maxsize`` entries.
+
+    The least recently used entry is dropped when the size limit is reached.
+    """
+
+    def __init__(self, maxsize: int = MAX_CACHED_REPOSITORIES):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+class SizedLRUCache(LRUCache):
+    """LRUCache also keeping the total size of its entries under ``maxbytes``.
+
+    The size of an entry is computed by ``sizeof``; an entry larger than
+    ``maxbytes`` is not kept.
+    """
+
+    def __init__(self, maxsize: int, maxbytes: int, sizeof: Callable[[Any], int]):
+        super().__init__(maxsize)
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.total = 0
+        self._sizes = {}
+
+    def __setitem__(self, key, value):
+        if key in self:
+            del self[key]
+        size = self.sizeof(value)
+        if size > self.maxbytes:
+            return
+        self._sizes[key] = size
+        self.total += size
+        super().__setitem__(key, value)
+        while self.total > self.maxbytes:
+            self.popitem(last=False)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.total -= self._sizes.pop(key)
+
+    def popitem(self, last: bool = True):
+        key, value = super().popitem(last)
+        self.total -= self._sizes.pop(key)
+        return key, value
+
+
+class BlobSpool:
+    """Temporary copy of a blob to read byte ranges without streaming it from its start.
+
+    The copy is closed, hence removed, once it is dropped and no range is being read.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._file = tempfile.TemporaryFile()
+        self._readers = 0
+        self._dropped = False
+        self._copy = asyncio.ensure_future(self._write(chunks))
+
+    async def _write(self, chunks: AsyncIterator[bytes]) -> None:
+        try:
+            async for chunk in chunks:
+                self._file.write(chunk)
+        finally:
+            await chunks.aclose()
+
+    async def read(self, start: int, end: Optional[int]) -> AsyncIterator[bytes]:
+        """Stream the bytes start to end (included) once the blob is copied."""
+        self._readers += 1
+        try:
+            await asyncio.shield(self._copy)
+            position = start
+            while end is None or position <= end:
+                size = (
+                    STREAM_CHUNK_SIZE
+                    if end is None
+                    else min(STREAM_CHUNK_SIZE, end + 1 - position)
+                )
+                # Seek and read together as concurrent readers share the file
+                self._file.seek(position)
+                chunk = self._file.read(size)
+                if not chunk:
+                    break
+                position += len(chunk)
+                yield chunk
+        finally:
+            self._readers -= 1
+            self._close_if_unused()
+
+    def drop(self) -> None:
+        """Close the copy once it is not read anymore."""
+        self._dropped = True
+        self._close_if_unused()
+
+    def _close_if_unused(self) -> None:
+        if self._dropped and self._readers == 0:
+            if self._copy.done():
+                self._file.close()
+            else:
+                self._copy.cancel()
+                self._copy.add_done_callback(lambda _: self._file.close())
+
+
+class BlobSpoolCache(LRUCache):
+    """Blob copies per hash; the least recently used copy is dropped."""
+
+    def __init__(self, maxsize: int = MAX_SPOOLED_BLOBS):
+        super().__init__(maxsize)
+
+    def popitem(self, last: bool = True):
+        key, spool = super().popitem(last)
+        spool.drop()
+        return key, spool
+
+
+def find_git_dirs(path: str) -> "Optional[Tuple[Path, Path]]":
+    """Locate the git directory and the common git directory of the repository containing ``path``.
+
+    This only inspects the file system; no git process is spawned.
+
+    Args:
+        path: Path inside a repository
+    Returns:
+        (git directory, common directory) or None if not found
+    """
+    current = Path(path).absolute()
+    for folder in (current, *current.parents):
+        dot_git = folder / ".git"
+        if dot_git.is_dir():
+            git_dir = dot_git
+            break
+        elif dot_git.is_file():
+            # Worktree or submodule: `.git` is a file pointing to the git directory
+            content = dot_git.read_text().strip()
+            if not content.startswith("gitdir:"):
+                return None
+            git_dir = folder / content[len("gitdir:") :].strip()
+            break
+    else:
+        return None
+
+    common_dir = git_dir
+    common_dir_file = git_dir / "commondir"
+    if common_dir_file.is_file():
+        common_dir = git_dir / common_dir_file.read_text().strip()
+    return git_dir, common_dir
+
+
+def get_dot_git_state(path: str) -> "Optional[tuple]":
+    """Get a signature of the `.git` entries of ``path`` and of its parents.
+
+    The signature changes when a repository is created, moved or removed
+    around ``path``. Only the file system is inspected.
+
+    Args:
+        path: Directory path
+    Returns:
+        The state signature or None if ``path`` does not exist
+    """
+    current = Path(path).absolute()
+    try:
+        state = [os.stat(current).st_ino]
+    except OSError:
+        return None
+    for folder in (current, *current.parents):
+        try:
+            state.append(os.stat(folder / ".git").st_ino)
+        except OSError:
+            state.append(None)
+    return tuple(state)
+
+
+def read_head(git_dir: str) -> "Optional[str]":
+    """Read the reference ``HEAD`` points to from the git directory.
+
+    Args:
+        git_dir: Git directory
+    Returns:
+        The full reference name or None if the head is detached or cannot be read
+    """
+    try:
+        content = (Path(git_dir) / "HEAD").read_text().strip()
+    except OSError:
+        return None
+    if content.startswith("ref:"):
+        reference = content[len("ref:") :].strip()
+        # Repositories using the reftable backend store a placeholder
+        if reference != "refs/heads/.invalid":
+            return reference
+    return None
+
+
+def get_ref_state(path: str) -> "Optional[tuple]":
+    """Get a signature of the references state of the repository containing ``path``.
+
+    The signature changes whenever ``HEAD``, ``packed-refs``, the configuration
+    (for the upstream branches) or any loose reference is updated.
+
+    Args:
+        path: Path inside a repository
+    Returns:
+        The state signature or None if it cannot be trusted
+    """
+    dirs = find_git_dirs(path)
+    if dirs is None:
+        return None
+    git_dir, common_dir = dirs
+    # References stored with the reftable backend are not loose files
+    if (common_dir / "reftable").exists():
+        return None
+
+    def signature(filepath):
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    head = signature(git_dir / "HEAD")
+    if head is None:
+        return None
+
+    signatures = [
+        head,
+        signature(common_dir / "packed-refs"),
+        signature(common_dir / "config"),
+    ]
+    for root, _, _ in os.walk(common_dir / "refs"):
+        signatures.append(signature(root))
+
+    # Racy timestamps: a change happening within the same clock tick
+    # as the latest modification would not be detected
+    threshold = time.time_ns() - RACY_TIMESTAMP_S * 1_000_000_000
+    if any(s is not None and s[0] > threshold for s in signatures):
+        return None
+
+    return tuple(signatures)
+
+
+def single_flight(method):
+    """Share the result of concurrent identical calls of a Git coroutine method.
+
+    Calls are identical if they have the same method name and arguments. While
+    a call is running, the identical calls await its result instead of running
+    git again. The shared result must therefore not be modified by the callers.
+
+    A call is only shared if no command of WRITE_COMMANDS started or ended since
+    it started; otherwise it could return the state preceding the write.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        call = (method.__name__, args, tuple(sorted(kwargs.items())))
+        key = (*call, self._writes)
+        try:
+            in_flight = self._in_flight.get(key)
+        except TypeError:  # Unhashable arguments
+            return await method(self, *args, **kwargs)
+
+        if in_flight is not None:
+            hits = self.single_flight_hits[call] = (
+                self.single_flight_hits.get(call, 0) + 1
+            )
+            get_logger().debug(
+                "Share the running {} call for {!s} ({} shared calls).".format(
+                    method.__name__, args, hits
+                )
+            )
+            return await asyncio.shield(in_flight)
+
+        in_flight = self._in_flight[key] = asyncio.ensure_future(
+            method(self, *args, **kwargs)
+        )
+        try:
+            return await asyncio.shield(in_flight)
+        finally:
+            if self._in_flight.get(key) is in_flight:
+                del self._in_flight[key]
+
+    return wrapper
+
+
 class Git:
     """
     A single parent class containing all of the individual git methods in it.
@@ -226,6 +877,69 @@ class Git:
         self._execute_timeout = (
             20.0 if self._config is None else self._config.git_command_timeout
         )
+        # Cache of the references listing per repository
+        self._refs_cache = LRUCache()
+        # Cache of the local branches ahead/behind counts per repository and base
+        self._ahead_behind_cache = LRUCache()
+        self._git_version = None
+        # Cache of the repository descriptor per directory
+        self._repository_cache = LRUCache()
+        # Local paths per contents root directory and server path
+        self._local_paths = LRUCache(MAX_CACHED_PATHS)
+        # Commit graph layouts per repository and history tip
+        self._graph_cache = LRUCache(MAX_CACHED_GRAPHS)
+        # Notebooks of the cell-lazy notebook diffs per content hash
+        self._notebook_cache = LRUCache(MAX_CACHED_NOTEBOOKS)
+        # Notebook diffs, without their base notebook, per pair of blob hashes
+        self._notebook_diff_cache = SizedLRUCache(
+            MAX_CACHED_NOTEBOOK_DIFFS,
+            MAX_CACHED_NOTEBOOK_DIFFS_SIZE,
+            lambda diff: len(json.dumps(diff)),
+        )
+        # Temporary copies of the blobs read by ranges per blob hash
+        self._blob_spools = BlobSpoolCache()
+        # Byte offsets of the lines per blob hash
+        self._line_offsets_cache = LRUCache(MAX_CACHED_LINE_OFFSETS)
+        # Image diff previews per pair of blob hashes
+        self._image_diff_cache = LRUCache(MAX_CACHED_IMAGE_DIFFS)
+        # Running read calls shared by identical concurrent calls
+        self._in_flight = {}
+        # Number of starts and ends of the commands modifying a repository
+        self._writes = 0
+        # Number of calls served by an identical running call
+        self.single_flight_hits = LRUCache()
+        # Network operations running in the background
+        self.jobs = JobManager(
+            DEFAULT_JOB_RETENTION_S
+            if self._config is None
+            else self._config.job_retention
+        )
+        # Remote fetches shared by all clients
+        self.fetch_scheduler = FetchScheduler(
+            self,
+            (
+                DEFAULT_FETCH_INTERVAL_S
+                if self._config is None
+                else self._config.fetch_interval
+            ),
+            (
+                DEFAULT_FETCH_MAX_BACKOFF_S
+                if self._config is None
+                else self._config.fetch_max_backoff
+            ),
+            DEFAULT_FETCH_PROBE if self._config is None else self._config.fetch_probe,
+            DEFAULT_FETCH_SCOPE if self._config is None else self._config.fetch_scope,
+        )
+        # Local mirrors of the cloned remotes; disabled without directory
+        self.mirrors = (
+            MirrorCache(
+                self._config.mirror_directory,
+                self._config.mirror_quota,
+                self._config.mirror_refresh_interval,
+            )
+            if self._config is not None and self._config.mirror_directory
+            else None
+        )
 
     def __del__(self):
         if self._GIT_CREDENTIAL_CACHE_DAEMON_PROCESS:
@@ -239,16 +953,34 @@ class Git:
         username: "Optional[str]" = None,
         password: "Optional[str]" = None,
         is_binary=False,
+        progress: "Optional[Callable[[dict], None]]" = None,
+        exclusive: bool = True,
+        locked: bool = True,
     ) -> "Tuple[int, str, str]":
-        return await execute(
-            cmdline,
-            cwd=cwd,
-            timeout=self._execute_timeout,
-            env=env,
-            username=username,
-            password=password,
-            is_binary=is_binary,
+        kwargs = {} if progress is None else {"progress": progress}
+        if not exclusive:
+            kwargs["exclusive"] = False
+        if not locked:
+            kwargs["locked"] = False
+        write = (
+            len(cmdline) > 1 and cmdline[0] == "git" and cmdline[1] in WRITE_COMMANDS
         )
+        if write:
+            self._writes += 1
+        try:
+            return await execute(
+                cmdline,
+                cwd=cwd,
+                timeout=self._execute_timeout,
+                env=env,
+                username=username,
+                password=password,
+                is_binary=is_binary,
+                **kwargs,
+            )
+        finally:
+            if write:
+                self._writes += 1
 
     async def config(self, path, **kwargs):
         """Get or set Git options.
@@ -334,7 +1066,19 @@ class Git:
 
         return response
 
-    async def clone(self, path, repo_url, auth=None, versioning=True, submodules=False):
+    async def clone(
+        self,
+        path,
+        repo_url,
+        auth=None,
+        versioning=True,
+        submodules=False,
+        progress=None,
+        filter_spec=None,
+        single_branch=False,
+        sparse=None,
+        ref=None,
+    ):
         """
         Execute `git clone`.
         When no auth is provided, disables prompts for the password to avoid the terminal hanging.
@@ -344,41 +1088,110 @@ class Git:
         :param auth: OPTIONAL dictionary with 'username' and 'password' fields
         :param versioning: OPTIONAL whether to clone or download a snapshot of the remote repository; default clone
         :param submodules: OPTIONAL whether to clone submodules content; default False
+        :param progress: OPTIONAL callback receiving the progress events; not supported with auth
+        :param filter_spec: OPTIONAL partial clone filter; e.g. 'blob:none' or 'tree:0'
+        :param single_branch: OPTIONAL whether to only clone the history of the remote HEAD branch; default False
+        :param sparse: OPTIONAL list of directories to check out, using sparse-checkout cone patterns
+        :param ref: OPTIONAL branch or tag to check out; default the remote HEAD
         :return: response with status code and error message.
         """
+        if filter_spec is not None and GIT_CLONE_FILTER.match(filter_spec) is None:
+            raise tornado.web.HTTPError(
+                400, "Unsupported clone filter '{}'.".format(filter_spec)
+            )
+
+        # Snapshots are extracted from the archive of a temporary bare clone;
+        # archives do not contain the submodules so those are still cloned.
+        # The shallow bare clone holds the objects of the HEAD tree in the
+        # temporary directory until the extraction ends; `git archive --remote`
+        # would avoid that but most hosts (e.g. GitHub) do not support it.
+        snapshot = not versioning and not submodules
+        if snapshot:
+            target = os.path.join(path, guess_clone_directory(repo_url))
+            if os.path.exists(target) and os.listdir(target):
+                return {
+                    "code": 128,
+                    "message": "fatal: destination path '{}' already exists and is not an empty directory.".format(
+                        os.path.basename(target)
+                    ),
+                }
+
         env = os.environ.copy()
         cmd = ["git", "clone"]
-        if not versioning:
+        if snapshot:
+            cmd.extend(["--bare", "--depth=1"])
+        elif not versioning:
             cmd.append("--depth=1")
+        if not snapshot and (not versioning or sparse):
             current_content = set(os.listdir(path))
         if submodules:
             cmd.append("--recurse-submodules")
+        if filter_spec is not None:
+            cmd.append("--filter={}".format(filter_spec))
+        if single_branch:
+            cmd.append("--single-branch")
+        if sparse and not snapshot:
+            cmd.append("--sparse")
+        if ref:
+            cmd.extend(["--branch", ref])
+        if self.mirrors is not None and filter_spec is None:
+            reference = await self.mirrors.reference(repo_url, auth)
+            if reference is not None:
+                cmd.extend(["--reference-if-able", reference])
+                # The temporary snapshot repository is deleted anyway
+                if self._config.mirror_dissociate and not snapshot:
+                    cmd.append("--dissociate")
         cmd.append(unquote(repo_url))
+        if snapshot:
+            repository = tempfile.mkdtemp(prefix="jupyterlab-git-")
+            cmd.append(repository)
 
-        if auth:
-            if auth.get("cache_credentials"):
-                await self.ensure_credential_helper(path)
-            env["GIT_TERMINAL_PROMPT"] = "1"
-            cmd.append("-q")
-            code, output, error = await self.__execute(
-                cmd,
-                username=auth["username"],
-                password=auth["password"],
-                cwd=path,
-                env=env,
-            )
-        else:
-            env["GIT_TERMINAL_PROMPT"] = "0"
-            code, output, error = await self.__execute(
-                cmd,
-                cwd=path,
-                env=env,
-            )
+        try:
+            if auth:
+                if auth.get("cache_credentials"):
+                    await self.ensure_credential_helper(path)
+                env["GIT_TERMINAL_PROMPT"] = "1"
+                cmd.append("-q")
+                code, output, error = await self.__execute(
+                    cmd,
+                    username=auth["username"],
+                    password=auth["password"],
+                    cwd=path,
+                    env=env,
+                    exclusive=False,
+                )
+            else:
+                env["GIT_TERMINAL_PROMPT"] = "0"
+                if progress is not None:
+                    cmd.append("--progress")
+                code, output, error = await self.__execute(
+                    cmd,
+                    cwd=path,
+                    env=env,
+                    progress=progress,
+                    exclusive=False,
+                )
 
-        if not versioning:
+            if code == 0 and snapshot:
+                code, error = await self._extract_archive(repository, target, sparse)
+                output = ""
+        finally:
+            if snapshot:
+                shutil.rmtree(repository, ignore_errors=True)
+
+        if code == 0 and not snapshot and (not versioning or sparse):
             new_content = set(os.listdir(path))
             directory = (new_content - current_content).pop()
-            shutil.rmtree(f"{path}/{directory}/.git")
+
+            if sparse:
+                # Only the top level files are checked out by `--sparse`
+                cmd = ["git", "sparse-checkout", "set", "--cone", *sparse]
+                code, output, error = await self.__execute(
+                    cmd, cwd=os.path.join(path, directory), env=env
+                )
+
+            if not versioning:
+                shutil.rmtree(f"{path}/{directory}/.git")
 
         response = {"code": code, "message": output.strip()}
 
@@ -387,105 +1200,834 @@ class Git:
 
         return response
 
-    async def fetch(self, path, auth=None):
-        """
-        Execute git fetch command
+    async def _extract_archive(
+        self, repository: str, target: str, sparse: Optional[List[str]] = None
+    ) -> Tuple[int, str]:
+        """Extract the HEAD archive of repository into the target directory.
+
+        The archive is streamed into the target; if sparse is provided only the
+        top level files and the given directories are extracted, like a cone
+        sparse-checkout would. If an entry cannot be extracted, for example a
+        symbolic link pointing outside of the target, the partially extracted
+        target is removed and an error is returned.
+
+        Returns:
+            (return code, error message)
         """
-        cwd = path
-        # Start by fetching to get accurate ahead/behind status
-        cmd = [
-            "git",
-            "fetch",
-            "--all",
-            "--prune",
-        ]  # Run prune by default to help beginners
-        env = os.environ.copy()
-        if auth:
-            if auth.get("cache_credentials"):
-                await self.ensure_credential_helper(path)
-            env["GIT_TERMINAL_PROMPT"] = "1"
-            code, _, fetch_error = await self.__execute(
-                cmd,
-                cwd=cwd,
-                username=auth["username"],
-                password=auth["password"],
-                env=env,
+        cmd = archive_command("HEAD")
+        if sparse:
+            cmd.extend([":(glob)*", *sparse])
+        get_logger().debug("Extracting archive: {}".format(" ".join(cmd)))
+        process = subprocess.Popen(
+            cmd,
+            cwd=repository,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,
+        )
+        tar_error = None
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, extract_tar_stream, process.stdout, target
             )
-        else:
-            env["GIT_TERMINAL_PROMPT"] = "0"
-            code, _, fetch_error = await self.__execute(cmd, cwd=cwd, env=env)
+        except asyncio.CancelledError:
+            kill_process_group(process.pid)
+            raise
+        except tarfile.TarError as e:
+            get_logger().warning("Failed to extract the archive", exc_info=e)
+            tar_error = e
+            # Stop git before closing the stream it writes to
+            kill_process_group(process.pid)
+        finally:
+            process.stdout.close()
+            error = process.stderr.read().decode("utf-8")
+            process.stderr.close()
+            code = process.wait()
+
+        if tar_error is not None:
+            shutil.rmtree(target, ignore_errors=True)
+            # Git errors prevail as they are likely the cause of the tar error
+            if code == 0 or not error:
+                code, error = 1, "fatal: unable to extract the snapshot: {}".format(
+                    tar_error
+                )
+            return code, error
 
-        result = {
-            "code": code,
-        }
-        if code != 0:
-            result["command"] = " ".join(cmd)
-            result["error"] = fetch_error
-            result["message"] = fetch_error
+        if code == 0 and not os.path.isdir(target):
+            # The archive of an empty selection has no entry
+            os.makedirs(target)
+        return code, error
 
-        return result
+    async def archive(
+        self, path: str, ref: str = "HEAD", archive_format: str = "zip"
+    ) -> AsyncIterator[bytes]:
+        """Archive the tree of a reference.
 
-    async def get_nbdiff(
-        self, prev_content: str, curr_content: str, base_content=None
-    ) -> dict:
-        """Compute the diff between two notebooks.
+        The reference is resolved first so that an unknown reference is
+        reported before any data is sent.
 
         Args:
-            prev_content: Notebook previous content
-            curr_content: Notebook current content
-            base_content: Notebook base content - only passed during a merge conflict
+            path: Repository path
+            ref: Commit, branch or tag to archive
+            archive_format: One of ARCHIVE_FORMATS
         Returns:
-            if not base_content:
-                {"base": Dict, "diff": Dict}
-            else:
-                {"base": Dict, "merge_decisions": Dict}
+            Iterator on the archive chunks; the archive files are prefixed by
+            the repository name
+        Raises:
+            tornado.web.HTTPError: 400 for an unsupported format or 404 for an
+            unknown reference
         """
+        if archive_format not in ARCHIVE_FORMATS:
+            raise tornado.web.HTTPError(
+                400, "Unsupported archive format '{}'.".format(archive_format)
+            )
+        code, output, error = await self.__execute(
+            ["git", "rev-parse", "--verify", "--end-of-options", ref + "^{commit}"],
+            cwd=path,
+        )
+        if code != 0:
+            raise tornado.web.HTTPError(404, "Unknown reference '{}'.".format(ref))
 
-        def read_notebook(content):
-            if not content:
-                return nbformat.versions[nbformat.current_nbformat].new_notebook()
-            if isinstance(content, dict):
-                # Content may come from model as a dict directly
-                return (
-                    nbformat.versions[
-                        content.get("nbformat", nbformat.current_nbformat)
-                    ]
-                    .nbjson.JSONReader()
-                    .to_notebook(content)
-                )
-            else:
-                return nbformat.reads(content, as_version=4)
+        info = await self.repository_info(path)
+        prefix = os.path.basename(info.get("top_level") or os.path.abspath(path))
+        cmd = archive_command(output.strip(), archive_format, prefix)
+        return self._stream(cmd, path)
 
-        # TODO Fix this in nbdime
-        def remove_cell_ids(nb):
-            for cell in nb.cells:
-                cell.pop("id", None)
-            return nb
+    async def blob_info(self, path: str, filename: str, reference: dict) -> dict:
+        """Locate the content of a file at a reference without reading it.
 
-        current_loop = tornado.ioloop.IOLoop.current()
-        prev_nb = await current_loop.run_in_executor(None, read_notebook, prev_content)
-        curr_nb = await current_loop.run_in_executor(None, read_notebook, curr_content)
-        if base_content:
-            base_nb = await current_loop.run_in_executor(
-                None, read_notebook, base_content
-            )
-            # Only remove ids from merge_notebooks as a workaround
-            _, merge_decisions = await current_loop.run_in_executor(
-                None,
-                merge_notebooks,
-                remove_cell_ids(base_nb),
-                remove_cell_ids(prev_nb),
-                remove_cell_ids(curr_nb),
-            )
+        Args:
+            path: Git repository path
+            filename: File path relative to the repository
+            reference: {"git": <commit>}, {"oid": <blob hash>} or {"special": "INDEX" | "WORKING"}
+        Returns:
+            {
+                "code": 0,
+                "size": int,  # in bytes
+                "oid": str,  # blob hash; not set for the working file
+                "file": str,  # only for the working file; its local path
+            }
+        Raises:
+            tornado.web.HTTPError: 400 if the blob hash is invalid,
+                404 if the file does not exist at the reference
+        """
+        if "oid" in reference:
+            oid = reference["oid"]
+            if not GIT_OBJECT_ID.match(oid):
+                raise tornado.web.HTTPError(400, "Invalid blob hash '{}'.".format(oid))
+            cmd = ["git", "cat-file", "-t", oid]
+            code, output, _ = await self.__execute(cmd, cwd=path)
+            if code != 0 or output.strip() != "blob":
+                raise tornado.web.HTTPError(404, "No such blob '{}'.".format(oid))
+            cmd = ["git", "cat-file", "-s", oid]
+            code, output, error = await self.__execute(cmd, cwd=path)
+            if code != 0:
+                return {"code": code, "command": " ".join(cmd), "message": error}
+            return {"code": 0, "size": int(output.strip()), "oid": oid}
+
+        special = reference.get("special")
+        if special == "WORKING":
+            root = os.path.realpath(path)
+            local = os.path.realpath(os.path.join(root, filename))
+            if os.path.commonpath([root, local]) != root or not os.path.isfile(local):
+                raise tornado.web.HTTPError(
+                    404, "No such file '{}' in the working tree.".format(filename)
+                )
+            return {"code": 0, "size": os.path.getsize(local), "file": local}
+
+        if special == "INDEX":
+            cmd = [
+                "git",
+                "ls-files",
+                "--stage",
+                "--",
+                ":(top,literal){}".format(filename),
+            ]
+            code, output, error = await self.__execute(cmd, cwd=path)
+            # Format: <mode> SP <object> SP <stage> TAB <file>
+            fields = output.split("\t", 1)[0].split()
+            if code != 0 or len(fields) != 3:
+                raise tornado.web.HTTPError(
+                    404, "No such file '{}' in the index.".format(filename)
+                )
+            oid = fields[1]
+            cmd = ["git", "cat-file", "-s", oid]
+            code, output, error = await self.__execute(cmd, cwd=path)
+            if code != 0:
+                return {"code": code, "command": " ".join(cmd), "message": error}
+            size = output.strip()
+        else:
+            ref = reference.get("git") or "HEAD"
+            cmd = [
+                "git",
+                "ls-tree",
+                "-l",
+                "--full-tree",
+                "--end-of-options",
+                ref,
+                filename,
+            ]
+            code, output, error = await self.__execute(cmd, cwd=path)
+            # Format: <mode> SP <type> SP <object> SP <size> TAB <file>
+            fields = output.split("\t", 1)[0].split()
+            if code != 0 or len(fields) != 4 or fields[1] != "blob":
+                raise tornado.web.HTTPError(
+                    404, "No such file '{}' at '{}'.".format(filename, ref)
+                )
+            oid, size = fields[2], fields[3]
+
+        return {"code": 0, "size": int(size), "oid": oid}
+
+    async def blob_content(self, path: str, oid: str) -> dict:
+        """Get the content of a blob from its hash.
+
+        Binary contents (with a NUL byte in their first 8000 bytes, like git
+        detects them) are base64 encoded as in ``get_content_at_reference``.
+
+        Args:
+            path: Git repository path
+            oid: Blob hash
+        Returns:
+            {"code": 0, "content": str}
+        Raises:
+            tornado.web.HTTPError: 400 if the hash is invalid, 404 if it is not a blob
+        """
+        if not GIT_OBJECT_ID.match(oid):
+            raise tornado.web.HTTPError(400, "Invalid blob hash '{}'.".format(oid))
+        cmd = ["git", "cat-file", "blob", oid]
+        code, output, error = await self.__execute(cmd, cwd=path, is_binary=True)
+        if code != 0:
+            raise tornado.web.HTTPError(404, "No such blob '{}'.".format(oid))
+        data = base64.decodebytes(output.encode("ascii"))
+        if b"\0" not in data[:BINARY_DETECTION_SIZE]:
+            output = data.decode("utf-8", errors="replace")
+        return {"code": 0, "content": output}
+
+    async def read_blobs(self, path: str, oids: List[str]) -> dict:
+        """Read many blobs with a single ``git cat-file --batch`` process.
+
+        Args:
+            path: Git repository path
+            oids: Blob hashes
+        Returns:
+            {
+                "code": int,
+                "blobs": Dict[str, bytes],  # Content per hash; unknown hashes are missing
+                "command"?: str,  # If error
+                "message"?: str,  # If error
+            }
+        """
+        if not oids:
+            return {"code": 0, "blobs": {}}
+
+        cmd = ["git", "cat-file", "--batch"]
+
+        def read() -> subprocess.CompletedProcess:
+            return subprocess.run(
+                cmd,
+                cwd=path,
+                input="".join(oid + "\n" for oid in oids).encode("utf-8"),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+
+        process = await tornado.ioloop.IOLoop.current().run_in_executor(None, read)
+        if process.returncode != 0:
+            return {
+                "code": process.returncode,
+                "command": " ".join(cmd),
+                "message": process.stderr.decode("utf-8", errors="replace"),
+            }
+        return {"code": 0, "blobs": parse_cat_file_batch(process.stdout)}
+
+    @property
+    def blob_cache_control(self) -> str:
+        """Cache-Control header of the contents addressed by their blob hash."""
+        scope = (
+            "public"
+            if self._config is not None and self._config.blob_cache_public
+            else "private"
+        )
+        return "{}, max-age={}, immutable".format(scope, BLOB_CACHE_MAX_AGE_S)
+
+    async def blob_chunks(
+        self, path: str, oid: str, start: int = 0, end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream the bytes start to end (included) of a blob.
+
+        git cannot read a blob from an offset. So a blob read from another byte than
+        the first one is copied once in a temporary file from which all its ranges are
+        read; the copies of the last MAX_SPOOLED_BLOBS blobs are kept.
+        """
+        if start > 0:
+            spool = self._blob_spools.get(oid)
+            if spool is None:
+                spool = self._blob_spools[oid] = BlobSpool(
+                    self._stream(["git", "cat-file", "blob", oid], path, check=True)
+                )
+            chunks = spool.read(start, end)
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            except Exception:
+                # Copy the blob again on the next read
+                if self._blob_spools.get(oid) is spool:
+                    del self._blob_spools[oid]
+                    spool.drop()
+                raise
+            finally:
+                await chunks.aclose()
+            return
+
+        position = 0
+        chunks = self._stream(["git", "cat-file", "blob", oid], path)
+        try:
+            async for chunk in chunks:
+                offset, position = position, position + len(chunk)
+                if position <= start:
+                    continue
+                stop = None if end is None else end + 1 - offset
+                piece = chunk[max(start - offset, 0) : stop]
+                if piece:
+                    yield piece
+                if end is not None and position > end:
+                    break
+        finally:
+            await chunks.aclose()
+
+    async def _stream(
+        self, cmd: List[str], cwd: str, check: bool = False
+    ) -> AsyncIterator[bytes]:
+        """Yield the standard output of a command; it is killed if the iteration stops.
+
+        With check, subprocess.CalledProcessError is raised if the command fails.
+        """
+        get_logger().debug("Streaming: {}".format(" ".join(cmd)))
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        try:
+            while True:
+                chunk = await process.stdout.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+            if check and await process.wait() != 0:
+                raise subprocess.CalledProcessError(process.returncode, cmd)
+        finally:
+            if process.returncode is None:
+                kill_process_group(process.pid)
+            await process.wait()
+
+    async def fetch(
+        self,
+        path,
+        auth=None,
+        progress=None,
+        upstream_only=False,
+        remotes=None,
+        refspecs=None,
+        tags=True,
+        depth=None,
+        shallow_since=None,
+    ):
+        """
+        Execute git fetch command
+
+        By default all remotes are fetched. The scope can be limited with:
+        - upstream_only: only the upstream of the current branch; all remotes are
+          fetched if the current branch has no upstream
+        - remotes: only the given remotes
+        - refspecs: only the given refspecs of the single remote in ``remotes``
+        - tags: whether to fetch the tags pointing to the fetched commits
+        - depth or shallow_since: limit the fetched history; e.g. for shallow clones
+
+        progress is an optional callback receiving the progress events; it is not supported with auth.
+        """
+        if upstream_only and (remotes or refspecs):
+            raise tornado.web.HTTPError(
+                400, "upstream_only cannot be combined with remotes or refspecs."
+            )
+        if refspecs and len(remotes or []) != 1:
+            raise tornado.web.HTTPError(400, "refspecs require a single remote.")
+        if depth is not None and (not isinstance(depth, int) or depth < 1):
+            raise tornado.web.HTTPError(400, "depth must be a positive integer.")
+
+        cwd = path
+        targets = []
+        if upstream_only:
+            response = await self._get_head_upstream(path)
+            if response["code"] != 0:
+                return response
+            upstream = response["upstream"]
+            if upstream is not None:
+                targets = list(upstream[:2])
+        elif refspecs:
+            targets = [*remotes, *refspecs]
+        elif remotes:
+            targets = list(remotes)
+
+        # Start by fetching to get accurate ahead/behind status
+        cmd = ["git", "fetch"]
+        if not targets:
+            cmd.append("--all")
+        cmd.append("--prune")  # Run prune by default to help beginners
+        if not tags:
+            cmd.append("--no-tags")
+        if depth is not None:
+            cmd.append("--depth={}".format(depth))
+        if shallow_since:
+            cmd.append("--shallow-since={}".format(shallow_since))
+        if remotes and len(remotes) > 1 and not refspecs:
+            cmd.append("--multiple")
+        if targets:
+            # Remote names and refspecs are never parsed as options
+            cmd.extend(["--", *targets])
+
+        env = os.environ.copy()
+        if auth:
+            if auth.get("cache_credentials"):
+                await self.ensure_credential_helper(path)
+            env["GIT_TERMINAL_PROMPT"] = "1"
+            code, _, fetch_error = await self.__execute(
+                cmd,
+                cwd=cwd,
+                username=auth["username"],
+                password=auth["password"],
+                env=env,
+                exclusive=False,
+            )
+        else:
+            env["GIT_TERMINAL_PROMPT"] = "0"
+            if progress is not None:
+                cmd.insert(2, "--progress")
+            code, _, fetch_error = await self.__execute(
+                cmd, cwd=cwd, env=env, progress=progress, exclusive=False
+            )
+
+        result = {
+            "code": code,
+        }
+        if code != 0:
+            result["command"] = " ".join(cmd)
+            result["error"] = fetch_error
+            result["message"] = fetch_error
+
+        return result
+
+    async def sparse_checkout(self, path):
+        """Describe the sparse-checkout of the worktree.
+
+        Args:
+            path (str): Git repository path
+        Returns:
+            {
+                "code": int,
+                "enabled": bool, # Whether the worktree is sparse
+                "directories": List[str], # Checked out directories
+                "tracked": int, # Number of tracked files
+                "skipped": int # Number of tracked files not checked out
+            }
+        """
+        response = await self._sparse_checkout_list(path)
+        if response["code"] != 0:
+            return response
+
+        cmd = ["git", "ls-files", "-t", "-z"]
+        code, files, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+        entries = [entry for entry in files.split("\x00") if entry]
+
+        return {
+            **response,
+            "tracked": len(entries),
+            "skipped": sum(1 for entry in entries if entry.startswith("S ")),
+        }
+
+    async def _sparse_checkout_list(self, path):
+        """List the checked out directories without counting the files."""
+        cmd = ["git", "sparse-checkout", "list"]
+        code, output, error = await self.__execute(cmd, cwd=path)
+        enabled = code == 0
+        if not enabled and "not sparse" not in error:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+        return {
+            "code": 0,
+            "enabled": enabled,
+            "directories": output.splitlines() if enabled else [],
+        }
+
+    async def sparse_checkout_add(self, path, directories):
+        """Check out additional directories in a sparse worktree.
+
+        If the worktree is not sparse, it becomes sparse with only the top
+        level files and the given directories checked out.
+
+        Args:
+            path (str): Git repository path
+            directories (List[str]): Directories to check out
+        """
+        current = await self._sparse_checkout_list(path)
+        if current["code"] != 0:
+            return current
+
+        if current["enabled"]:
+            cmd = ["git", "sparse-checkout", "add", "--", *directories]
+        else:
+            cmd = ["git", "sparse-checkout", "set", "--cone", "--", *directories]
+        return await self._set_sparse_checkout(path, cmd)
+
+    async def sparse_checkout_remove(self, path, directories):
+        """Stop checking out directories in a sparse worktree.
+
+        Args:
+            path (str): Git repository path
+            directories (List[str]): Directories to remove from the worktree
+        """
+        current = await self._sparse_checkout_list(path)
+        if current["code"] != 0:
+            return current
+        if not current["enabled"]:
+            return {"code": 128, "message": "The worktree is not sparse."}
+
+        removed = {directory.strip("/") for directory in directories}
+        kept = [d for d in current["directories"] if d.strip("/") not in removed]
+        return await self._set_sparse_checkout(
+            path, ["git", "sparse-checkout", "set", "--cone", "--", *kept]
+        )
+
+    async def _set_sparse_checkout(self, path, cmd):
+        code, _, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+        return await self.sparse_checkout(path)
+
+    async def get_nbdiff(
+        self,
+        prev_content: str,
+        curr_content: str,
+        base_content=None,
+        ignore_outputs: bool = False,
+        ignore_metadata: bool = False,
+        ignore_execution_count: bool = False,
+    ) -> dict:
+        """Compute the diff between two notebooks.
+
+        The ignored parts are removed from both notebooks before the diff;
+        they are not supported for a merge. The diffs of text contents without
+        ignored parts are cached per pair of blob hashes; see notebook_diffs.
+
+        Args:
+            prev_content: Notebook previous content
+            curr_content: Notebook current content
+            base_content: Notebook base content - only passed during a merge conflict
+            ignore_outputs: Whether to ignore the code cells outputs
+            ignore_metadata: Whether to ignore the notebook and the cells metadata
+            ignore_execution_count: Whether to ignore the code cells execution counts
+        Returns:
+            if not base_content:
+                {
+                    "base": Dict,
+                    "diff": Dict,
+                    # Only if a part is ignored; hash of the removed outputs and
+                    # metadata per cell index and of the removed notebook metadata.
+                    # The cells whose hashes differ have different outputs or metadata.
+                    "omitted"?: {
+                        "outputs": bool,
+                        "metadata": bool,
+                        "execution_count": bool,
+                        "previous": {
+                            "outputs"?: {<index>: str},
+                            "metadata"?: {<index>: str},
+                            "notebook_metadata"?: str
+                        },
+                        "current": idem
+                    }
+                }
+            else:
+                {"base": Dict, "merge_decisions": Dict}
+        """
+        ignored = {
+            "outputs": ignore_outputs,
+            "metadata": ignore_metadata,
+            "execution_count": ignore_execution_count,
+        }
+        if base_content and any(ignored.values()):
+            raise ValueError("Notebook parts cannot be ignored for a merge.")
+
+        cache_key = None
+        if (
+            not base_content
+            and not any(ignored.values())
+            and isinstance(prev_content, str)
+            and isinstance(curr_content, str)
+        ):
+            cache_key = (blob_hash(prev_content), blob_hash(curr_content))
+
+        current_loop = tornado.ioloop.IOLoop.current()
+        prev_nb = await current_loop.run_in_executor(None, read_notebook, prev_content)
+        if cache_key is not None:
+            # Only the diff is cached; the base is cheap to read again
+            cached = self._notebook_diff_cache.get(cache_key)
+            if cached is not None:
+                return {"base": prev_nb, "diff": cached}
+        curr_nb = await current_loop.run_in_executor(None, read_notebook, curr_content)
+        if base_content:
+            base_nb = await current_loop.run_in_executor(
+                None, read_notebook, base_content
+            )
+            # Only remove ids from merge_notebooks as a workaround
+            _, merge_decisions = await current_loop.run_in_executor(
+                None,
+                merge_notebooks,
+                remove_cell_ids(base_nb),
+                remove_cell_ids(prev_nb),
+                remove_cell_ids(curr_nb),
+            )
 
             return {"base": base_nb, "merge_decisions": merge_decisions}
         else:
+            omitted = None
+            if any(ignored.values()):
+                omitted = dict(ignored)
+                for name, notebook in (("previous", prev_nb), ("current", curr_nb)):
+                    omitted[name] = await current_loop.run_in_executor(
+                        None, functools.partial(strip_notebook, notebook, **ignored)
+                    )
+
             thediff = await current_loop.run_in_executor(
                 None, diff_notebooks, prev_nb, curr_nb
             )
 
-            return {"base": prev_nb, "diff": thediff}
+            result = {"base": prev_nb, "diff": thediff}
+            if omitted is not None:
+                result["omitted"] = omitted
+            if cache_key is not None:
+                self._notebook_diff_cache[cache_key] = thediff
+            return result
+
+    async def notebook_diffs(
+        self,
+        path: str,
+        commit: str,
+        previous: Optional[str] = None,
+        progress: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        """Compute the diffs of all the notebooks changed by a commit.
+
+        The diffs are computed concurrently by at most MAX_NOTEBOOK_DIFF_WORKERS
+        workers and cached per pair of blob hashes, so that ``get_nbdiff``
+        returns them without diffing the notebooks again. The cache is bounded
+        by MAX_CACHED_NOTEBOOK_DIFFS_SIZE; the largest diffs are not kept.
+
+        Args:
+            path: Git repository path
+            commit: Commit whose changes are diffed
+            previous: Commit compared with; default the first parent of commit
+            progress: Callback called with an event for each diffed notebook
+        Returns:
+            {
+                "code": int,
+                "files": [
+                    {
+                        "filename": str,
+                        "previous": str | None,  # Previous blob hash; None if added
+                        "current": str | None,  # Current blob hash; None if deleted
+                        "status": "cached" | "computed" | "failed",
+                        "message"?: str  # Error if the diff failed
+                    }
+                ]
+            }
+        """
+        for ref in (commit, previous):
+            if ref is not None and (
+                not isinstance(ref, str) or not ref or ref.startswith("-")
+            ):
+                raise tornado.web.HTTPError(400, "Invalid commit '{}'.".format(ref))
+
+        if previous is None:
+            cmd = ["git", "rev-parse", "--verify", "--quiet", commit + "^1"]
+            code, output, _ = await self.__execute(cmd, cwd=path)
+            if code == 0:
+                previous = output.strip()
+
+        cmd = [
+            "git",
+            "diff-tree",
+            "-r",
+            "-z",
+            "--no-commit-id",
+            "--no-renames",
+            "--no-abbrev",
+        ]
+        cmd.extend(["--root", commit] if previous is None else [previous, commit])
+        cmd.extend(["--", "*.ipynb"])
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        # Format: :<old mode> SP <new mode> SP <old object> SP <new object> SP <status> NUL <file> NUL
+        fields = output.split("\0")
+        files = []
+        for meta, filename in zip(fields[0:-1:2], fields[1::2]):
+            old_oid, new_oid = meta.split()[2:4]
+            files.append(
+                {
+                    "filename": filename,
+                    "previous": None if set(old_oid) == {"0"} else old_oid,
+                    "current": None if set(new_oid) == {"0"} else new_oid,
+                }
+            )
+
+        empty = blob_hash("")
+        workers = asyncio.Semaphore(MAX_NOTEBOOK_DIFF_WORKERS)
+        done = 0
+
+        async def diff_file(entry: dict) -> None:
+            nonlocal done
+            async with workers:
+                key = (entry["previous"] or empty, entry["current"] or empty)
+                if self._notebook_diff_cache.get(key) is not None:
+                    entry["status"] = "cached"
+                else:
+                    try:
+                        contents = []
+                        for oid in (entry["previous"], entry["current"]):
+                            content = ""
+                            if oid is not None:
+                                cmd = ["git", "cat-file", "blob", oid]
+                                code, content, error = await self.__execute(
+                                    cmd, cwd=path
+                                )
+                                if code != 0:
+                                    raise RuntimeError(error)
+                            contents.append(content)
+                        result = await self.get_nbdiff(*contents)
+                        self._notebook_diff_cache[key] = result["diff"]
+                        entry["status"] = "computed"
+                    except Exception as e:
+                        get_logger().warning(
+                            "Fail to diff notebook {!s}".format(entry["filename"]),
+                            exc_info=True,
+                        )
+                        entry["status"] = "failed"
+                        entry["message"] = str(e)
+                done += 1
+                if progress is not None:
+                    progress(
+                        {
+                            "phase": "Diffing notebooks",
+                            "percent": done * 100 // len(files),
+                            "done": done,
+                            "total": len(files),
+                            "filename": entry["filename"],
+                            "status": entry["status"],
+                        }
+                    )
+
+        await asyncio.gather(*(diff_file(entry) for entry in files))
+        return {"code": 0, "files": files}
 
+    async def notebook_cells(
+        self, prev_content: Union[str, dict], curr_content: Union[str, dict]
+    ) -> dict:
+        """Align the cells of two notebooks; first phase of a cell-lazy notebook diff.
+
+        The cells are compared through hashes of their parts, which is much
+        faster than a full notebook diff. The notebooks are kept so that the
+        diffs of the modified cells can then be requested with notebook_cell_diffs.
+
+        Args:
+            prev_content: Notebook previous content
+            curr_content: Notebook current content
+        Returns:
+            {
+                "previous": str,  # Key of the previous notebook
+                "current": str,  # Key of the current notebook
+                **cells_summary result
+            }
+        """
+        current_loop = tornado.ioloop.IOLoop.current()
+        keys = []
+        notebooks = []
+        for content in (prev_content, curr_content):
+            key = await current_loop.run_in_executor(None, content_hash, content)
+            notebook = self._notebook_cache.get(key)
+            if notebook is None:
+                notebook = await current_loop.run_in_executor(
+                    None, read_notebook, content
+                )
+            self._notebook_cache[key] = notebook
+            keys.append(key)
+            notebooks.append(notebook)
+
+        summary = await current_loop.run_in_executor(None, cells_summary, *notebooks)
+        return {"previous": keys[0], "current": keys[1], **summary}
+
+    async def notebook_cell_diffs(
+        self,
+        previous: str,
+        current: str,
+        cells: List[List[Optional[int]]],
+        ignore_outputs: bool = False,
+        ignore_metadata: bool = False,
+        ignore_execution_count: bool = False,
+    ) -> dict:
+        """Diff some cells of two notebooks; second phase of a cell-lazy notebook diff.
+
+        Args:
+            previous: Key of the previous notebook returned by notebook_cells
+            current: Key of the current notebook returned by notebook_cells
+            cells: Pairs of previous and current cell indices as returned by notebook_cells
+            ignore_outputs: Whether to ignore the code cells outputs
+            ignore_metadata: Whether to ignore the cells metadata
+            ignore_execution_count: Whether to ignore the code cells execution counts
+        Returns:
+            {"cells": cell_diffs result}
+        Raises:
+            tornado.web.HTTPError: 400 for invalid cell indices, 404 if a notebook
+                is not known anymore; its cells must be aligned again
+        """
+        notebooks = [self._notebook_cache.get(key) for key in (previous, current)]
+        if None in notebooks:
+            raise tornado.web.HTTPError(
+                404, "Unknown notebook; request the notebook cells again."
+            )
+
+        pairs = []
+        for pair in cells if isinstance(cells, list) else [None]:
+            if (
+                not isinstance(pair, list)
+                or len(pair) != 2
+                or pair == [None, None]
+                or not all(
+                    index is None
+                    or (isinstance(index, int) and 0 <= index < len(notebook["cells"]))
+                    for index, notebook in zip(pair, notebooks)
+                )
+            ):
+                raise tornado.web.HTTPError(400, "Invalid cells {}.".format(pair))
+            pairs.append(tuple(pair))
+
+        diffs = await tornado.ioloop.IOLoop.current().run_in_executor(
+            None,
+            functools.partial(
+                cell_diffs,
+                *notebooks,
+                pairs,
+                outputs=ignore_outputs,
+                metadata=ignore_metadata,
+                execution_count=ignore_execution_count,
+            ),
+        )
+        return {"cells": diffs}
+
+    @single_flight
     async def status(self, path: str) -> dict:
         """
         Execute git status command & return the result.
@@ -582,17 +2124,12 @@ class Git:
                     state = state_
                     break
             else:
-                found = False
-                for directory in head:
-                    code, output, _ = await self.__execute(
-                        ["git", "rev-parse", "--git-path", directory], cwd=path
-                    )
-                    filepath = output.strip("\n\t ")
-                    if code == 0 and (Path(path) / filepath).exists():
-                        found = True
-                        state = state_
-                        break
-                if found:
+                info = await self.repository_info(path)
+                git_dir = info.get("git_dir")
+                if git_dir is not None and any(
+                    (Path(git_dir) / directory).exists() for directory in head
+                ):
+                    state = state_
                     break
 
         if state == State.DEFAULT and data["branch"] == "(detached)":
@@ -602,6 +2139,91 @@ class Git:
 
         return data
 
+    async def graph(
+        self,
+        path: str,
+        ref: str = "HEAD",
+        skip: int = 0,
+        count: int = DEFAULT_GRAPH_PAGE,
+        continuation: Optional[dict] = None,
+    ) -> dict:
+        """Get a page of the commit graph layout of a reference history.
+
+        The commits are listed in `--topo-order` and laid out like
+        `src/generateGraphData.ts` does, without the vertical offsets. The
+        layout is cached per history tip and extended page after page.
+
+        Args:
+            path: Git repository path
+            ref: Reference whose history is laid out
+            skip: Index of the first row
+            count: Maximal number of rows
+            continuation: Continuation of the previous page; it avoids laying
+                out the previous rows again if the layout is no longer cached
+        Returns:
+            {
+                "code": int,
+                "tip": str,  # Commit hash of the reference
+                "rows": [{"sha": str, "dot": {"lateralOffset": int, "branch": int}, "routes": [{"from": int, "to": int, "branch": int}]}],
+                "continuation": Optional[dict],  # To pass with the next page
+                "complete": bool,  # Whether this is the last page
+            }
+        """
+        if not isinstance(skip, int) or skip < 0:
+            raise tornado.web.HTTPError(400, "skip must be a non-negative integer.")
+        if not isinstance(count, int) or not 0 < count <= MAX_GRAPH_PAGE:
+            raise tornado.web.HTTPError(
+                400, "count must be an integer between 1 and {}.".format(MAX_GRAPH_PAGE)
+            )
+
+        cmd = ["git", "rev-parse", "--verify", "--end-of-options", ref + "^{commit}"]
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+        tip = output.strip()
+
+        key = (os.path.realpath(path), tip)
+        graph = self._graph_cache.get(key)
+        if graph is None or not graph.start <= skip <= graph.end:
+            if (
+                continuation is not None
+                and continuation.get("tip") == tip
+                and continuation.get("skip") == skip
+            ):
+                graph = CommitGraph(tip, skip, continuation)
+            elif graph is None or skip < graph.start:
+                graph = CommitGraph(tip)
+            self._graph_cache[key] = graph
+
+        end = skip + count
+        while not graph.complete and graph.end < end:
+            limit = end - graph.end
+            cmd = [
+                "git",
+                "rev-list",
+                "--topo-order",
+                "--parents",
+                "--skip={}".format(graph.end),
+                "--max-count={}".format(limit),
+                "--end-of-options",
+                tip,
+            ]
+            code, output, error = await self.__execute(cmd, cwd=path)
+            if code != 0:
+                return {"code": code, "command": " ".join(cmd), "message": error}
+            commits = [line.split() for line in output.splitlines() if line]
+            graph.extend(commits)
+            graph.complete = len(commits) < limit
+
+        return {
+            "code": 0,
+            "tip": tip,
+            "rows": graph.to_json(skip, count),
+            "continuation": graph.continuation(min(end, graph.end)),
+            "complete": graph.complete and end >= graph.end,
+        }
+
+    @single_flight
     async def log(self, path, history_count=10, follow_path=None):
         """
         Execute git log command & return the result.
@@ -780,42 +2402,809 @@ class Git:
             )
         return {"code": code, "result": result}
 
-    async def branch(self, path):
+    async def text_diff(
+        self,
+        path: str,
+        filename: str,
+        previous: dict,
+        current: dict,
+        contents_manager=None,
+        context: int = DEFAULT_DIFF_CONTEXT,
+    ) -> dict:
+        """Compute the unified diff hunks of a text file between two references.
+
+        The references are those of get_content_at_reference. `git diff` is
+        used unless a reference is BASE, in which case both contents are
+        diffed in-process.
+
+        Args:
+            path: Git repository path
+            filename: File path relative to the repository
+            previous: Previous reference
+            current: Current reference
+            contents_manager: Contents manager to read the working content; only
+                used for the in-process diff
+            context: Number of unchanged lines around the changes
+        Returns:
+            {
+                "code": int,
+                "binary": bool,
+                "hunks": [
+                    {
+                        "old_start": int, "old_lines": int,
+                        "new_start": int, "new_lines": int,
+                        "header": str,
+                        "lines": List[str]  # Prefixed by " ", "-", "+" or "\\"
+                    }
+                ]
+            }
         """
-        Execute 'git for-each-ref' command & return the result.
+        if not isinstance(context, int) or not 0 <= context <= MAX_DIFF_CONTEXT:
+            raise tornado.web.HTTPError(
+                400,
+                "context must be an integer between 0 and {}.".format(MAX_DIFF_CONTEXT),
+            )
+
+        cmd = self._text_diff_command(previous, current)
+        if cmd is None:
+            old = await self.get_content_at_reference(
+                filename, previous, path, contents_manager
+            )
+            new = await self.get_content_at_reference(
+                filename, current, path, contents_manager
+            )
+            output = "\n".join(
+                difflib.unified_diff(
+                    split_lines(old["content"]),
+                    split_lines(new["content"]),
+                    n=context,
+                    lineterm="",
+                )
+            )
+        else:
+            cmd[2:2] = ["--no-color", "--no-ext-diff", "-U{}".format(context)]
+            cmd.extend(["--", filename])
+            code, output, error = await self.__execute(cmd, cwd=path)
+            if code != 0:
+                return {"code": code, "command": " ".join(cmd), "message": error}
+
+        return {
+            "code": 0,
+            "binary": cmd is not None
+            and re.search(r"^Binary files .* differ$", output, re.M) is not None,
+            "hunks": parse_diff_hunks(output),
+        }
+
+    @staticmethod
+    def _text_diff_command(previous: dict, current: dict) -> Optional[List[str]]:
+        """Get the `git diff` command comparing two references or None if unsupported."""
+        old = previous.get("special") or previous.get("git")
+        new = current.get("special") or current.get("git")
+        if not old or not new or "BASE" in (old, new) or old == "WORKING":
+            return None
+        if new == "WORKING":
+            return (
+                ["git", "diff"]
+                if old == "INDEX"
+                else ["git", "diff", "--end-of-options", old]
+            )
+        if new == "INDEX":
+            return (
+                None
+                if old == "INDEX"
+                else ["git", "diff", "--cached", "--end-of-options", old]
+            )
+        if old == "INDEX":
+            return ["git", "diff", "-R", "--cached", "--end-of-options", new]
+        return ["git", "diff", "--end-of-options", old, new]
+
+    async def text_lines(
+        self,
+        path: str,
+        filename: str,
+        reference: dict,
+        start: int,
+        end: int,
+        contents_manager=None,
+    ) -> dict:
+        """Get a range of lines of a text file; e.g. to expand the unchanged lines between diff hunks.
+
+        Args:
+            path: Git repository path
+            filename: File path relative to the repository
+            reference: Reference as for get_content_at_reference
+            start: Index of the first line, starting at 1
+            end: Index of the last line, included
+            contents_manager: Contents manager to read the working content
+        Returns:
+            {"code": 0, "lines": List[str], "total": int}  # total number of lines
+
+        The lines of the committed and staged files are read from the line
+        offsets of their blob; only the requested bytes are read.
+        """
+        if not isinstance(start, int) or not isinstance(end, int) or start < 1:
+            raise tornado.web.HTTPError(400, "start and end must be positive integers.")
+
+        if reference.get("special") not in ("WORKING", "BASE"):
+            info = await self.blob_info(path, filename, reference)
+            if info["code"] != 0:
+                return info
+            try:
+                offsets = await self._line_offsets(path, info["oid"])
+            except subprocess.CalledProcessError as e:
+                return {
+                    "code": e.returncode,
+                    "command": " ".join(e.cmd),
+                    "message": "Fail to read the blob {}.".format(info["oid"]),
+                }
+            total = len(offsets) - 1
+            end = min(end, total)
+            if end < start:
+                return {"code": 0, "lines": [], "total": total}
+            chunks = self.blob_chunks(
+                path, info["oid"], offsets[start - 1], offsets[end] - 1
+            )
+            content = b"".join([chunk async for chunk in chunks])
+            lines = split_lines(content.decode("utf-8", errors="replace"))
+            return {"code": 0, "lines": lines, "total": total}
+
+        response = await self.get_content_at_reference(
+            filename, reference, path, contents_manager
+        )
+        lines = split_lines(response["content"])
+        return {"code": 0, "lines": lines[start - 1 : end], "total": len(lines)}
+
+    async def _line_offsets(self, path: str, oid: str) -> array:
+        """Get the byte offsets of the starts of the lines of a blob followed by its size.
+
+        Raises:
+            subprocess.CalledProcessError: if the blob cannot be read
+        """
+        offsets = self._line_offsets_cache.get(oid)
+        if offsets is None:
+            offsets = array("q", [0])
+            position = 0
+            chunks = self._stream(["git", "cat-file", "blob", oid], path, check=True)
+            try:
+                async for chunk in chunks:
+                    index = chunk.find(b"\n")
+                    while index != -1:
+                        offsets.append(position + index + 1)
+                        index = chunk.find(b"\n", index + 1)
+                    position += len(chunk)
+            finally:
+                await chunks.aclose()
+            if offsets[-1] != position:
+                # Last line without line feed
+                offsets.append(position)
+            self._line_offsets_cache[oid] = offsets
+        return offsets
+
+    async def image_diff(
+        self,
+        path: str,
+        filename: str,
+        previous: dict,
+        current: dict,
+        size: int = DEFAULT_PREVIEW_SIZE,
+    ) -> dict:
+        """Compare an image between two references with downscaled previews.
+
+        The result is cached per pair of blob hashes. The full resolution
+        images can be streamed from `content/raw` with the returned hashes.
+
+        Args:
+            path: Git repository path
+            filename: File path relative to the repository
+            previous: Previous reference as for blob_info
+            current: Current reference as for blob_info
+            size: Maximal size in pixels of the largest side of the previews
+        Returns:
+            {
+                "code": 0,
+                "previous": {
+                    "oid": str,
+                    "width": int, "height": int,
+                    "size": int,  # in bytes
+                    "format": str,
+                    "preview": str  # base64 encoded PNG
+                } | None,  # None if the file does not exist at the reference
+                "current": idem,
+                "mask": str | None,  # base64 encoded PNG of the changed pixels
+                "changed": int  # Number of changed pixels
+            }
+        Raises:
+            tornado.web.HTTPError: 400 for an invalid size, 404 if the file does not
+                exist at both references, 415 if it is not an image, 501 if Pillow is
+                not installed
+        """
+        if Image is None:
+            raise tornado.web.HTTPError(501, "Pillow is required to compare images.")
+        if not isinstance(size, int) or not 0 < size <= MAX_PREVIEW_SIZE:
+            raise tornado.web.HTTPError(
+                400,
+                "size must be an integer between 1 and {}.".format(MAX_PREVIEW_SIZE),
+            )
+
+        sides = []
+        for reference in (previous, current):
+            try:
+                info = await self.blob_info(path, filename, reference)
+            except tornado.web.HTTPError as error:
+                if error.status_code != 404:
+                    raise
+                # Added or deleted file
+                info = None
+            else:
+                if info["code"] != 0:
+                    return info
+                if "file" in info:
+                    cmd = ["git", "hash-object", "--", info["file"]]
+                    code, output, error = await self.__execute(cmd, cwd=path)
+                    if code != 0:
+                        return {
+                            "code": code,
+                            "command": " ".join(cmd),
+                            "message": error,
+                        }
+                    info["oid"] = output.strip()
+            sides.append(info)
+        if sides == [None, None]:
+            raise tornado.web.HTTPError(
+                404, "No such file '{}' at both references.".format(filename)
+            )
+
+        key = tuple(None if info is None else info["oid"] for info in sides) + (size,)
+        result = self._image_diff_cache.get(key)
+        if result is None:
+            contents = []
+            for info in sides:
+                if info is None:
+                    contents.append(None)
+                elif "file" in info:
+                    contents.append(pathlib.Path(info["file"]).read_bytes())
+                else:
+                    cmd = ["git", "cat-file", "blob", info["oid"]]
+                    contents.append(
+                        b"".join([chunk async for chunk in self._stream(cmd, path)])
+                    )
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    None, image_diff, *contents, size
+                )
+            except (OSError, Image.DecompressionBombError) as error:
+                raise tornado.web.HTTPError(
+                    415, "'{}' is not a supported image: {}".format(filename, error)
+                )
+            for name, info in zip(("previous", "current"), sides):
+                if info is not None:
+                    result[name]["oid"] = info["oid"]
+            self._image_diff_cache[key] = result
+
+        return {"code": 0, **result}
+
+    async def table_diff(
+        self,
+        path: str,
+        filename: str,
+        previous: dict,
+        current: dict,
+        key: Optional[List[str]] = None,
+        max_changes: int = DEFAULT_TABLE_CHANGES,
+        delimiter: Optional[str] = None,
+    ) -> dict:
+        """Compare the rows of a CSV or TSV file between two references.
+
+        Both versions are streamed and compared in bounded memory; see
+        `tables.table_diff` for the matching of the rows and the result.
+
+        Args:
+            path: Git repository path
+            filename: File path relative to the repository
+            previous: Previous reference as for blob_info
+            current: Current reference as for blob_info
+            key: Names of the columns identifying a row; by default rows are matched by values
+            max_changes: Maximal number of row changes detailed
+            delimiter: Field delimiter; by default deduced from the file extension
+        Returns:
+            {"code": 0, **table_diff result}
+        Raises:
+            tornado.web.HTTPError: 400 for invalid arguments or missing key columns, 404 if the file
+                does not exist at both references, 415 if it is not a valid table
         """
-        heads = await self.branch_heads(path)
-        if heads["code"] != 0:
-            # error; bail
-            return heads
+        delimiter = delimiter or table_delimiter(filename)
+        if not isinstance(delimiter, str) or len(delimiter) != 1:
+            raise tornado.web.HTTPError(
+                400, "Unknown delimiter of the table '{}'.".format(filename)
+            )
+        if (
+            not isinstance(max_changes, int)
+            or not 0 <= max_changes <= MAX_TABLE_CHANGES
+        ):
+            raise tornado.web.HTTPError(
+                400,
+                "max_changes must be an integer between 0 and {}.".format(
+                    MAX_TABLE_CHANGES
+                ),
+            )
+        if key is not None and (
+            not isinstance(key, list) or not all(isinstance(c, str) for c in key)
+        ):
+            raise tornado.web.HTTPError(400, "key must be a list of column names.")
+
+        sides = []
+        for reference in (previous, current):
+            try:
+                info = await self.blob_info(path, filename, reference)
+            except tornado.web.HTTPError as error:
+                if error.status_code != 404:
+                    raise
+                # Added or deleted file
+                info = None
+            else:
+                if info["code"] != 0:
+                    return info
+            sides.append(info)
+        if sides == [None, None]:
+            raise tornado.web.HTTPError(
+                404, "No such file '{}' at both references.".format(filename)
+            )
+
+        processes = []
+
+        def opener(info: Optional[dict]) -> Callable[[], Optional[io.TextIOBase]]:
+            def open_table():
+                if info is None:
+                    return None
+                if "file" in info:
+                    return open(
+                        info["file"], newline="", encoding="utf-8-sig", errors="replace"
+                    )
+                process = subprocess.Popen(
+                    ["git", "cat-file", "blob", info["oid"]],
+                    cwd=path,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+                processes.append(process)
+                return io.TextIOWrapper(
+                    process.stdout, encoding="utf-8-sig", errors="replace", newline=""
+                )
+
+            return open_table
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(
+                    table_diff,
+                    opener(sides[0]),
+                    opener(sides[1]),
+                    delimiter,
+                    key,
+                    max_changes,
+                    sum(info["size"] for info in sides if info is not None),
+                ),
+            )
+        except ValueError as error:
+            raise tornado.web.HTTPError(400, str(error))
+        except csv.Error as error:
+            raise tornado.web.HTTPError(
+                415, "'{}' is not a valid table: {}".format(filename, error)
+            )
+        finally:
+            # Stop the contents not read until the end
+            for process in processes:
+                process.kill()
+                process.wait()
+
+        return {"code": 0, **result}
+
+    def _parse_refs(self, output):
+        """Parse the output of 'git for-each-ref' formatted with ``REF_FORMATS``.
 
-        remotes = await self.branch_remotes(path)
-        if remotes["code"] != 0:
-            # error; bail
-            return remotes
+        Returns:
+            List of (refname, description) in the output order. The description
+            is a tag for references in refs/tags/ and a branch otherwise.
+        """
+        refs = []
+        for refname, name, commit_sha, upstream_name, is_current_branch in (
+            line.split("\t") for line in output.splitlines()
+        ):
+            if refname.startswith("refs/tags/"):
+                refs.append((refname, {"name": name, "baseCommitId": commit_sha}))
+            else:
+                refs.append(
+                    (
+                        refname,
+                        {
+                            "is_current_branch": bool(is_current_branch.strip()),
+                            "is_remote_branch": refname.startswith("refs/remotes/"),
+                            "name": name,
+                            "upstream": upstream_name if upstream_name else None,
+                            "top_commit": commit_sha,
+                            "tag": None,
+                        },
+                    )
+                )
+        return refs
 
+    async def _get_unlisted_current_branch(self, path):
+        """Describe the current branch when it is not a listed reference;
+        e.g. in an empty repository or with a detached head.
+        """
+        current_name = await self.get_current_branch(path)
         # Extract commit hash in case of detached head
-        is_detached = GIT_DETACHED_HEAD.match(heads["current_branch"]["name"])
+        is_detached = GIT_DETACHED_HEAD.match(current_name)
+        # Extract branch name in case of rebasing
+        rebasing = GIT_REBASING_BRANCH.match(current_name)
         if is_detached is not None:
-            try:
-                heads["current_branch"]["name"] = is_detached.groupdict()["commit"]
-            except KeyError:
-                pass
+            current_name = is_detached.group("commit")
+        elif rebasing is not None:
+            current_name = rebasing.group("branch")
+
+        return {
+            "is_current_branch": True,
+            "is_remote_branch": False,
+            "name": current_name,
+            "upstream": None,
+            "top_commit": None,
+            "tag": None,
+        }
+
+    async def _list_refs(self, path):
+        """List local branches, remote branches and tags in a single
+        'git for-each-ref' call & return the result.
+
+        The result is cached until the references of the repository change.
+        """
+        state = get_ref_state(path)
+        cached = self._refs_cache.get(path)
+        if state is not None and cached is not None and cached[0] == state:
+            return cached[1]
+
+        cmd = [
+            "git",
+            "for-each-ref",
+            "--format=" + "%09".join("%({})".format(f) for f in REF_FORMATS),
+            "refs/heads/",
+            "refs/remotes/",
+            "refs/tags/",
+        ]
+
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        current_branch = None
+        heads = []
+        remotes = []
+        tags = []
+        try:
+            for refname, ref in self._parse_refs(output):
+                if refname.startswith("refs/tags/"):
+                    tags.append(ref)
+                elif ref["is_remote_branch"]:
+                    remotes.append(ref)
+                else:
+                    heads.append(ref)
+                    if ref["is_current_branch"]:
+                        current_branch = ref
+
+            # Above can fail in certain cases, such as an empty repo with
+            # no commits. In that case, just fall back to determining
+            # current branch
+            if not current_branch:
+                current_branch = await self._get_unlisted_current_branch(path)
+                heads.append(current_branch)
+
+        except Exception as downstream_error:
+            return {
+                "code": -1,
+                "command": " ".join(cmd),
+                "message": str(downstream_error),
+            }
+
+        refs = {
+            "code": code,
+            "heads": heads,
+            "remotes": remotes,
+            "tags": tags,
+            "current_branch": current_branch,
+        }
+        if state is not None:
+            self._refs_cache[path] = (state, refs)
+        return refs
+
+    async def _list_refs_page(
+        self, path, namespaces, pattern=None, sort=None, offset=0, limit=None
+    ):
+        """List a page of references with 'git for-each-ref' & return the result.
+
+        Filtering, sorting and truncation are carried out by git so only
+        the references up to the requested page are read.
+
+        Args:
+            path: Git repository path
+            namespaces: References namespaces to list; e.g. ["refs/tags/"]
+            pattern: Case insensitive sub-string the reference names must contain
+            sort: Sort key; "name" (default) or "date" (most recent first)
+            offset: Number of references to skip
+            limit: Maximal number of references to return; at least 1
+        Returns:
+            {"code": int, "refs": List[(refname, description)], "has_more": bool}
+        """
+        if sort is None:
+            sort = "name"
+        if sort not in REF_SORT_KEYS:
+            raise tornado.web.HTTPError(400, f"Unknown sort key '{sort}'")
+        if not all(
+            isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+            for value, minimum in ((offset, 0), (1 if limit is None else limit, 1))
+        ):
+            raise tornado.web.HTTPError(
+                400,
+                "offset must be a non-negative integer and limit a positive integer",
+            )
+
+        if pattern:
+            escaped = re.sub(r"([*?\[\\])", r"\\\1", pattern)
+            # for-each-ref matches the patterns as paths: `*` stays within a
+            # name component and `**/` spans any number of components. A single
+            # glob cannot match the pattern both in the last component and in
+            # an intermediate one (e.g. "feature" in "feature/x"), hence two.
+            patterns = [
+                glob
+                for namespace in namespaces
+                for glob in (
+                    f"{namespace}**/*{escaped}*",
+                    f"{namespace}**/*{escaped}*/**",
+                )
+            ]
         else:
-            # Extract branch name in case of rebasing
-            rebasing = GIT_REBASING_BRANCH.match(heads["current_branch"]["name"])
-            if rebasing is not None:
-                try:
-                    heads["current_branch"]["name"] = rebasing.groupdict()["branch"]
-                except KeyError:
-                    pass
+            patterns = list(namespaces)
+
+        cmd = [
+            "git",
+            "for-each-ref",
+            "--format=" + "%09".join("%({})".format(f) for f in REF_FORMATS),
+            "--ignore-case",
+            "--sort=" + REF_SORT_KEYS[sort],
+        ]
+        if limit is not None:
+            # Request one extra reference to know if there are more of them
+            cmd.append(f"--count={offset + limit + 1}")
+        cmd.extend(patterns)
+
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        refs = self._parse_refs(output)
+        end = None if limit is None else offset + limit
+        return {
+            "code": code,
+            "refs": refs[offset:end],
+            "has_more": end is not None and len(refs) > end,
+        }
+
+    async def _get_current_branch_ref(self, path):
+        """Describe the current branch without listing all references."""
+        cmd = [
+            "git",
+            "for-each-ref",
+            "--format=" + "%09".join("%({})".format(f) for f in REF_FORMATS),
+            "--points-at=HEAD",
+            "refs/heads/",
+        ]
+        # Fails if HEAD does not point to a commit yet
+        code, output, _ = await self.__execute(cmd, cwd=path)
+        if code == 0:
+            for _, branch in self._parse_refs(output):
+                if branch["is_current_branch"]:
+                    return branch
+
+        return await self._get_unlisted_current_branch(path)
+
+    @single_flight
+    async def branch(
+        self,
+        path,
+        ahead_behind=False,
+        base=None,
+        pattern=None,
+        sort=None,
+        offset=0,
+        limit=None,
+    ):
+        """
+        Execute 'git for-each-ref' command & return the result.
+
+        If any of ``pattern``, ``sort``, ``offset`` or ``limit`` is set, only the
+        requested page of branches is returned with a ``has_more`` flag.
+
+        Args:
+            path: Git repository path
+            ahead_behind: Whether to add the ahead/behind counts to the local branches
+            base: Optional reference to compute the ahead/behind counts against;
+                only used if ``ahead_behind`` is true
+            pattern: Case insensitive sub-string the branch names must contain
+            sort: Sort key; "name" (default) or "date" (most recent first)
+            offset: Number of branches to skip
+            limit: Maximal number of branches to return
+        """
+        is_paginated = bool(pattern) or sort is not None or offset or limit is not None
+        if is_paginated:
+            page = await self._list_refs_page(
+                path, ["refs/heads/", "refs/remotes/"], pattern, sort, offset, limit
+            )
+            if page["code"] != 0:
+                return page
+            branches = [branch for _, branch in page["refs"]]
+            current_branch = await self._get_current_branch_ref(path)
+        else:
+            refs = await self._list_refs(path)
+            if refs["code"] != 0:
+                # error; bail
+                return refs
+
+            branches = refs["heads"] + refs["remotes"]
+            current_branch = refs["current_branch"]
+
+        if ahead_behind:
+            counts = await self.branch_ahead_behind(path, base)
+            if counts["code"] != 0:
+                return counts
+
+            def add_counts(branch):
+                if branch["is_remote_branch"] or branch["top_commit"] is None:
+                    return branch
+                # Copy to not alter the cached references
+                return {**branch, **counts["branches"].get(branch["name"], {})}
+
+            branches = [add_counts(b) for b in branches]
+            current_branch = add_counts(current_branch)
+
+        result = {
+            "code": 0,
+            "branches": branches,
+            "current_branch": current_branch,
+        }
+        if is_paginated:
+            result["has_more"] = page["has_more"]
+        return result
+
+    async def branch_ahead_behind(self, path, base=None):
+        """
+        Compute the number of commits each local branch is ahead and behind
+        of its upstream branch and optionally of a base reference.
+
+        The upstream counts are obtained from a single 'git for-each-ref' call.
+        The base counts are obtained from the same call if git supports the
+        `ahead-behind` field (git >= 2.41); otherwise from
+        'git rev-list --left-right --count' for each branch, run concurrently
+        for at most MAX_AHEAD_BEHIND_WORKERS branches.
+
+        The result is cached until the references of the repository change.
+
+        Args:
+            path: Git repository path
+            base: Optional reference to compare every local branch with
+        Returns:
+            {
+                "code": int,
+                "branches": {
+                    branch_name: {
+                        "ahead": int | None,  # None if no upstream
+                        "behind": int | None,
+                        "base_ahead": int,  # Only if base is provided
+                        "base_behind": int,
+                    }
+                }
+            }
+        Raises:
+            tornado.web.HTTPError: 400 if base is not a commit
+        """
+        key = (path, base)
+        state = get_ref_state(path)
+        cached = self._ahead_behind_cache.get(key)
+        if state is not None and cached is not None and cached[0] == state:
+            return cached[1]
+
+        use_ahead_behind_field = False
+        if base is not None:
+            if not isinstance(base, str):
+                raise tornado.web.HTTPError(400, "base must be a string.")
+            cmd = [
+                "git",
+                "rev-parse",
+                "--verify",
+                "--end-of-options",
+                base + "^{commit}",
+            ]
+            code, output, _ = await self.__execute(cmd, cwd=path)
+            if code != 0:
+                raise tornado.web.HTTPError(400, "Unknown base '{}'.".format(base))
+            # Compare with the commit to not interpret the name in the commands
+            base = output.strip()
+            git_version = await self._get_git_version()
+            use_ahead_behind_field = git_version is not None and git_version >= parse(
+                AHEAD_BEHIND_MIN_VERSION
+            )
+
+        # Format reference: https://git-scm.com/docs/git-for-each-ref#_field_names
+        formats = ["refname", "refname:short", "upstream", "upstream:track,nobracket"]
+        if use_ahead_behind_field:
+            formats.append(f"ahead-behind:{base}")
+        cmd = [
+            "git",
+            "for-each-ref",
+            "--format=" + "%09".join("%({})".format(f) for f in formats),
+            "refs/heads/",
+        ]
+
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        branches = {}
+        refnames = {}
+        for line in output.splitlines():
+            refname, name, upstream, track, *base_counts = line.split("\t")
+            # The tracking information is "gone" if the upstream branch was deleted
+            match = GIT_UPSTREAM_TRACK.match(track) if upstream else None
+            if match is not None:
+                counts = {
+                    "ahead": int(match.group("ahead") or 0),
+                    "behind": int(match.group("behind") or 0),
+                }
+            else:
+                counts = {"ahead": None, "behind": None}
+
+            if use_ahead_behind_field:
+                ahead, behind = base_counts[0].split()
+                counts["base_ahead"] = int(ahead)
+                counts["base_behind"] = int(behind)
+            elif base is not None:
+                refnames[name] = refname
+
+            branches[name] = counts
+
+        if refnames:
+            workers = asyncio.Semaphore(MAX_AHEAD_BEHIND_WORKERS)
+
+            async def count(refname: str) -> Tuple[List[str], int, str, str]:
+                # Symmetric difference: left is base only, right is branch only
+                rev_cmd = [
+                    "git",
+                    "rev-list",
+                    "--left-right",
+                    "--count",
+                    f"{base}...{refname}",
+                ]
+                async with workers:
+                    # rev-list only reads objects; it does not need the lock
+                    return (
+                        rev_cmd,
+                        *await self.__execute(rev_cmd, cwd=path, locked=False),
+                    )
 
-        # all's good; concatenate results and return
-        return {
-            "code": 0,
-            "branches": heads["branches"] + remotes["branches"],
-            "current_branch": heads["current_branch"],
-        }
+            results = await asyncio.gather(*(count(r) for r in refnames.values()))
+            for name, (rev_cmd, code, rev_output, error) in zip(refnames, results):
+                if code != 0:
+                    return {
+                        "code": code,
+                        "command": " ".join(rev_cmd),
+                        "message": error,
+                    }
+                behind, ahead = rev_output.split()
+                branches[name]["base_ahead"] = int(ahead)
+                branches[name]["base_behind"] = int(behind)
+
+        result = {"code": 0, "branches": branches}
+        if state is not None:
+            self._ahead_behind_cache[key] = (state, result)
+        return result
 
     async def branch_delete(self, path, branch):
         """Execute 'git branch -D <branchname>'"""
@@ -830,171 +3219,163 @@ class Git:
         """
         Execute 'git for-each-ref' command on refs/heads & return the result.
         """
-        # Format reference: https://git-scm.com/docs/git-for-each-ref#_field_names
-        formats = ["refname:short", "objectname", "upstream:short", "HEAD"]
-        cmd = [
-            "git",
-            "for-each-ref",
-            "--format=" + "%09".join("%({})".format(f) for f in formats),
-            "refs/heads/",
-        ]
-
-        code, output, error = await self.__execute(cmd, cwd=path)
-        if code != 0:
-            return {"code": code, "command": " ".join(cmd), "message": error}
+        refs = await self._list_refs(path)
+        if refs["code"] != 0:
+            return refs
 
-        current_branch = None
-        results = []
-        try:
-            for name, commit_sha, upstream_name, is_current_branch in (
-                line.split("\t") for line in output.splitlines()
-            ):
-                is_current_branch = bool(is_current_branch.strip())
-
-                branch = {
-                    "is_current_branch": is_current_branch,
-                    "is_remote_branch": False,
-                    "name": name,
-                    "upstream": upstream_name if upstream_name else None,
-                    "top_commit": commit_sha,
-                    "tag": None,
-                }
-                results.append(branch)
-                if is_current_branch:
-                    current_branch = branch
+        return {
+            "code": 0,
+            "branches": refs["heads"],
+            "current_branch": refs["current_branch"],
+        }
 
-            # Above can fail in certain cases, such as an empty repo with
-            # no commits. In that case, just fall back to determining
-            # current branch
-            if not current_branch:
-                current_name = await self.get_current_branch(path)
-                branch = {
-                    "is_current_branch": True,
-                    "is_remote_branch": False,
-                    "name": current_name,
-                    "upstream": None,
-                    "top_commit": None,
-                    "tag": None,
-                }
-                results.append(branch)
-                current_branch = branch
+    async def branch_remotes(self, path):
+        """
+        Execute 'git for-each-ref' command on refs/remotes & return the result.
+        """
+        refs = await self._list_refs(path)
+        if refs["code"] != 0:
+            return refs
 
-            return {
-                "code": code,
-                "branches": results,
-                "current_branch": current_branch,
-            }
+        return {"code": 0, "branches": refs["remotes"]}
 
-        except Exception as downstream_error:
-            return {
-                "code": -1,
-                "command": " ".join(cmd),
-                "message": str(downstream_error),
-            }
+    def local_path(self, root_dir: str, path: str) -> str:
+        """Get the local path of a server path relative to a contents root directory.
 
-    async def branch_remotes(self, path):
+        The resolution is cached per root directory and path.
         """
-        Execute 'git for-each-ref' command on refs/heads & return the result.
+        key = (root_dir, path)
+        local_path = self._local_paths.get(key)
+        if local_path is None:
+            local_path = self._local_paths[key] = os.path.join(
+                os.path.expanduser(root_dir), url2path(path)
+            )
+        return local_path
+
+    async def repository(self, root_dir: str, path: str) -> dict:
+        """Describe the repository containing a server path relative to a contents root directory.
+
+        The descriptor is cached per root directory and path, as the local path
+        and repository_info are.
+
+        Returns:
+            The repository_info response with its "local_path"
         """
-        # Format reference: https://git-scm.com/docs/git-for-each-ref#_field_names
-        formats = ["refname:short", "objectname"]
-        cmd = [
-            "git",
-            "for-each-ref",
-            "--format=" + "%09".join("%({})".format(f) for f in formats),
-            "refs/remotes/",
-        ]
+        local_path = self.local_path(root_dir, path)
+        info = await self.repository_info(local_path)
+        return {**info, "local_path": local_path}
 
-        code, output, error = await self.__execute(cmd, cwd=path)
-        if code != 0:
-            return {"code": code, "command": " ".join(cmd), "message": error}
+    async def repository_info(self, path):
+        """Describe the repository containing ``path`` with a single 'git rev-parse' call.
 
-        results = []
-        try:
-            for name, commit_sha in (line.split("\t") for line in output.splitlines()):
-                results.append(
-                    {
-                        "is_current_branch": False,
-                        "is_remote_branch": True,
-                        "name": name,
-                        "upstream": None,
-                        "top_commit": commit_sha,
-                        "tag": None,
-                    }
-                )
-            return {"code": code, "branches": results}
-        except Exception as downstream_error:
-            return {
-                "code": -1,
-                "command": " ".join(cmd),
-                "message": str(downstream_error),
+        The description is cached until a `.git` entry appears or disappears
+        in ``path`` or its parents. The reference ``HEAD`` points to is read
+        on every call as it changes with the checked out branch.
+
+        Args:
+            path: Directory path
+        Returns:
+            {
+                "code": int,
+                "top_level": str | None,  # None if not in a working tree
+                "prefix": str | None,  # Path of ``path`` relative to the top level
+                "git_dir": str | None,  # None if not in a repository
+                "common_dir": str | None,
+                "is_bare": bool,
+                "is_shallow": bool,
+                "head": str | None,  # Full reference name; None if detached
             }
+        """
+        state = get_dot_git_state(path)
+        cached = self._repository_cache.get(path)
+        if (
+            state is not None
+            and cached is not None
+            and cached[0] == state
+            # Fetching may deepen or unshallow the repository
+            and (
+                cached[1]["common_dir"] is None
+                or cached[1]["is_shallow"]
+                == os.path.exists(os.path.join(cached[1]["common_dir"], "shallow"))
+            )
+        ):
+            info = cached[1]
+        else:
+            # --show-toplevel is last as it fails outside of a working tree
+            cmd = [
+                "git",
+                "rev-parse",
+                "--git-dir",
+                "--git-common-dir",
+                "--is-bare-repository",
+                "--is-shallow-repository",
+                "--show-prefix",
+                "--show-toplevel",
+            ]
+            code, output, error = await self.__execute(cmd, cwd=path)
+            lower_error = error.lower()
+            if code != 0 and "fatal: not a git repository" in lower_error:
+                info = {
+                    "code": 0,
+                    "top_level": None,
+                    "prefix": None,
+                    "git_dir": None,
+                    "common_dir": None,
+                    "is_bare": False,
+                    "is_shallow": False,
+                }
+            elif code != 0 and "must be run in a work tree" not in lower_error:
+                return {"code": code, "command": " ".join(cmd), "message": error}
+            else:
+                lines = output.split("\n")
+                git_dir, common_dir, is_bare, is_shallow, prefix = lines[:5]
+                in_work_tree = code == 0
+                info = {
+                    "code": 0,
+                    "top_level": lines[5] if in_work_tree else None,
+                    "prefix": prefix if in_work_tree else None,
+                    "git_dir": os.path.normpath(os.path.join(path, git_dir)),
+                    "common_dir": os.path.normpath(os.path.join(path, common_dir)),
+                    "is_bare": is_bare == "true",
+                    "is_shallow": is_shallow == "true",
+                }
+            if state is not None:
+                self._repository_cache[path] = (state, info)
+
+        head = read_head(info["git_dir"]) if info["git_dir"] is not None else None
+        return {**info, "head": head}
 
     async def show_top_level(self, path):
         """
-        Execute git --show-toplevel command & return the result.
+        Get the repository top level directory & return the result.
         """
-        cmd = ["git", "rev-parse", "--show-toplevel"]
-        code, my_output, my_error = await self.__execute(
-            cmd,
-            cwd=path,
-        )
-        if code == 0:
-            return {"code": code, "path": my_output.strip("\n")}
-        else:
-            # Handle special case where cwd not inside a git repo
-            lower_error = my_error.lower()
-            if "fatal: not a git repository" in lower_error:
-                return {"code": 0, "path": None}
-
-            return {
-                "code": code,
-                "command": " ".join(cmd),
-                "message": my_error,
-            }
+        info = await self.repository_info(path)
+        if info["code"] != 0:
+            return info
+        return {"code": 0, "path": info["top_level"]}
 
     async def show_prefix(self, path, contents_manager):
         """
-        Execute git --show-prefix command & return the result.
+        Get the path prefix relative to the repository top level & return the result.
         """
-        cmd = ["git", "rev-parse", "--show-prefix"]
-        code, my_output, my_error = await self.__execute(
-            cmd,
-            cwd=path,
-        )
+        info = await self.repository_info(path)
+        if info["code"] != 0:
+            return info
 
-        if code == 0:
-            relative_git_path = my_output.strip("\n")
-            repository_path = (
-                path[: -len(relative_git_path)] if relative_git_path else path
+        relative_git_path = info["prefix"]
+        if relative_git_path is None:
+            return {"code": 0, "path": None}
+
+        repository_path = path[: -len(relative_git_path)] if relative_git_path else path
+        try:
+            # Raise an error is the repository_path is not a subpath of root_dir
+            Path(repository_path).absolute().relative_to(
+                Path(contents_manager.root_dir).absolute()
             )
-            try:
-                # Raise an error is the repository_path is not a subpath of root_dir
-                Path(repository_path).absolute().relative_to(
-                    Path(contents_manager.root_dir).absolute()
-                )
-            except ValueError:
-                return {
-                    "code": code,
-                    "path": None,
-                }
-            else:
-                result = {
-                    "code": code,
-                    "path": relative_git_path,
-                }
-                return result
+        except ValueError:
+            return {"code": 0, "path": None}
         else:
-            # Handle special case where cwd not inside a git repo
-            lower_error = my_error.lower()
-            if "fatal: not a git repository" in lower_error:
-                return {"code": 0, "path": None}
-
-            return {
-                "code": code,
-                "command": " ".join(cmd),
-                "message": my_error,
-            }
+            return {"code": 0, "path": relative_git_path}
 
     async def add(self, filename, path):
         """
@@ -1182,6 +3563,129 @@ class Git:
             return {"code": code, "command": " ".join(cmd), "message": error}
         return {"code": code, "message": output.strip()}
 
+    async def merge_preview(
+        self, path: str, operation: str, target: Optional[str] = None
+    ) -> dict:
+        """Predict the conflicts of a pull, a merge or a rebase.
+
+        The merges are computed with `git merge-tree --write-tree`; neither the
+        index nor the working tree are modified.
+
+        Args:
+            path: Git repository path
+            operation: "pull" to merge the current branch upstream as last
+                fetched, "merge" to merge target or "rebase" to rebase onto target
+            target: Branch to merge or to rebase onto; ignored for pull
+        Returns:
+            {
+                "code": int,
+                "conflict": bool,
+                "files": List[str],  # Conflicting paths
+                "commit": str,  # rebase only; first commit that would conflict
+            }
+            The rebase is predicted as a merge of the branches if git is older
+            than 2.40.
+        """
+        if operation not in MERGE_PREVIEW_OPERATIONS:
+            raise tornado.web.HTTPError(
+                400, "Unsupported operation '{}'.".format(operation)
+            )
+        if operation == "pull":
+            target = "@{upstream}"
+        elif not target:
+            raise tornado.web.HTTPError(400, "A target branch is required.")
+
+        git_version = await self._get_git_version()
+        if git_version is None or git_version < parse(MERGE_TREE_MIN_VERSION):
+            return {
+                "code": -1,
+                "message": "Predicting conflicts requires git {} or later.".format(
+                    MERGE_TREE_MIN_VERSION
+                ),
+            }
+
+        if operation == "rebase" and git_version >= parse(MERGE_TREE_BASE_MIN_VERSION):
+            return await self._rebase_preview(path, target)
+
+        code, _, files, error = await self._merge_tree(path, "HEAD", target)
+        if code > 1:
+            return {"code": code, "message": error.strip()}
+        return {"code": 0, "conflict": code == 1, "files": files}
+
+    async def _rebase_preview(self, path: str, onto: str) -> dict:
+        """Replay the commits rebased onto a branch until one conflicts.
+
+        Root commits are replayed with the empty tree as merge base.
+        """
+        cmd = [
+            "git",
+            "rev-list",
+            "--reverse",
+            "--no-merges",
+            "--right-only",
+            "--cherry-pick",
+            "--parents",
+            "--end-of-options",
+            "{}...HEAD".format(onto),
+        ]
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        tree = onto
+        empty_tree = None
+        for line in output.splitlines():
+            commit, *parents = line.split()
+            if parents:
+                base = parents[0]
+            else:
+                if empty_tree is None:
+                    # The empty tree name depends on the repository hash algorithm
+                    cmd = ["git", "hash-object", "-t", "tree", os.devnull]
+                    code, empty_tree, error = await self.__execute(cmd, cwd=path)
+                    if code != 0:
+                        return {
+                            "code": code,
+                            "command": " ".join(cmd),
+                            "message": error,
+                        }
+                    empty_tree = empty_tree.strip()
+                base = empty_tree
+            code, tree, files, error = await self._merge_tree(
+                path, tree, commit, base=base
+            )
+            if code == 1:
+                return {"code": 0, "conflict": True, "files": files, "commit": commit}
+            elif code != 0:
+                return {"code": code, "message": error.strip()}
+        return {"code": 0, "conflict": False, "files": []}
+
+    async def _merge_tree(
+        self, path: str, ours: str, theirs: str, base: Optional[str] = None
+    ) -> Tuple[int, str, List[str], str]:
+        """Merge two tree-ishes with `git merge-tree --write-tree`.
+
+        Returns:
+            (return code; 1 if there are conflicts, merged tree, conflicting paths, error)
+        """
+        cmd = [
+            "git",
+            "merge-tree",
+            "--write-tree",
+            "--name-only",
+            "--no-messages",
+            "-z",
+        ]
+        if base is not None:
+            cmd.append("--merge-base={}".format(base))
+        cmd.extend(["--end-of-options", ours, theirs])
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code > 1 or not output:
+            # Unknown references also exit with 1
+            return max(code, 128), "", [], error
+        tree, *files = strip_and_split(output)
+        return code, tree, sorted(set(files)), error
+
     async def commit(self, commit_msg, amend, path, author=None):
         """
         Execute git commit <filename> command & return the result.
@@ -1202,10 +3706,12 @@ class Git:
             return {"code": code, "command": " ".join(cmd), "message": error}
         return {"code": code}
 
-    async def pull(self, path, auth=None, cancel_on_conflict=False):
+    async def pull(self, path, auth=None, cancel_on_conflict=False, progress=None):
         """
         Execute git pull --no-commit.  Disables prompts for the password to avoid the terminal hanging while waiting
         for auth.
+
+        progress is an optional callback receiving the progress events; it is not supported with auth.
         """
         env = os.environ.copy()
         if auth:
@@ -1218,13 +3724,17 @@ class Git:
                 password=auth["password"],
                 cwd=path,
                 env=env,
+                exclusive=False,
             )
         else:
             env["GIT_TERMINAL_PROMPT"] = "0"
             code, output, error = await self.__execute(
-                ["git", "pull", "--no-commit"],
+                ["git", "pull", "--no-commit"]
+                + ([] if progress is None else ["--progress"]),
                 env=env,
                 cwd=path,
+                progress=progress,
+                exclusive=False,
             )
 
         response = {"code": code, "message": output.strip()}
@@ -1262,11 +3772,16 @@ class Git:
         set_upstream=False,
         force=False,
         tags=True,
+        progress=None,
     ):
         """
         Execute `git push $UPSTREAM $BRANCH`. The choice of upstream and branch is up to the caller.
+
+        progress is an optional callback receiving the progress events; it is not supported with auth.
         """
         command = ["git", "push"]
+        if progress is not None and not auth:
+            command.append("--progress")
         if tags:
             command.append("--tags")
         if force:
@@ -1286,6 +3801,7 @@ class Git:
                 password=auth["password"],
                 cwd=path,
                 env=env,
+                exclusive=False,
             )
         else:
             env["GIT_TERMINAL_PROMPT"] = "0"
@@ -1293,6 +3809,8 @@ class Git:
                 command,
                 env=env,
                 cwd=path,
+                progress=progress,
+                exclusive=False,
             )
 
         response = {"code": code, "message": output.strip()}
@@ -1366,11 +3884,18 @@ class Git:
         return branch_reference.startswith("refs/remotes/")
 
     async def get_current_branch(self, path):
-        """Use `symbolic-ref` to get the current branch name. In case of
+        """Read the current branch name from the ``HEAD`` file or use `symbolic-ref`. In case of
         failure, assume that the HEAD is currently detached or rebasing, and fall back
         to the `branch` command to get the name.
         See https://git-blame.blogspot.com/2013/06/checking-current-branch-programatically.html
         """
+        dirs = find_git_dirs(path)
+        if dirs is not None:
+            # Avoid spawning a process in the common case
+            head = read_head(dirs[0])
+            if head is not None and head.startswith("refs/heads/"):
+                return head[len("refs/heads/") :]
+
         command = ["git", "symbolic-ref", "--short", "HEAD"]
         code, output, error = await self.__execute(command, cwd=path)
         if code == 0:
@@ -1450,6 +3975,107 @@ class Git:
                 )
             )
 
+    async def conflicts(
+        self,
+        path: str,
+        filenames: Optional[List[str]] = None,
+        merge_decisions: bool = False,
+    ) -> dict:
+        """Get the base, ours and theirs versions of conflicted files.
+
+        The index stages of all the files are listed by a single
+        ``git ls-files -u`` and their blobs are read by a single process.
+
+        Args:
+            path: Git repository path
+            filenames: Conflicted files relative to the repository; default all of them
+            merge_decisions: Whether to compute the nbdime merge decisions of the notebooks
+        Returns:
+            {
+                "code": int,
+                "files": [
+                    {
+                        "filename": str,
+                        # None if the file does not exist at that stage
+                        "base": {"oid": str, "content": str, "binary": bool} | None,
+                        "ours": idem,  # HEAD version
+                        "theirs": idem,  # Version being merged
+                        # Only for notebooks if merge_decisions is set
+                        "merge"?: {"base": Dict, "merge_decisions": Dict},
+                        "message"?: str  # Error if the merge decisions failed
+                    }
+                ]
+            }
+            Binary contents are base64 encoded.
+        """
+        cmd = ["git", "ls-files", "-u", "-z"]
+        if filenames is not None:
+            if not filenames:
+                return {"code": 0, "files": []}
+            cmd.append("--")
+            cmd.extend(":(top,literal){}".format(name) for name in filenames)
+        code, output, error = await self.__execute(cmd, cwd=path)
+        if code != 0:
+            return {"code": code, "command": " ".join(cmd), "message": error}
+
+        files = OrderedDict()
+        for line in strip_and_split(output):
+            if not line:
+                continue
+            # Format: <mode> SP <object> SP <stage> TAB <file>
+            info, filename = line.split("\t", 1)
+            _, oid, stage = info.split()
+            entry = files.setdefault(
+                filename,
+                {"filename": filename, "base": None, "ours": None, "theirs": None},
+            )
+            entry[CONFLICT_STAGES[stage]] = {"oid": oid}
+
+        response = await self.read_blobs(
+            path,
+            list(
+                {
+                    entry[stage]["oid"]: None
+                    for entry in files.values()
+                    for stage in CONFLICT_STAGES.values()
+                    if entry[stage] is not None
+                }
+            ),
+        )
+        if response["code"] != 0:
+            return response
+        blobs = response["blobs"]
+        for entry in files.values():
+            for stage in CONFLICT_STAGES.values():
+                version = entry[stage]
+                if version is None:
+                    continue
+                data = blobs.get(version["oid"], b"")
+                version["binary"] = b"\0" in data[:BINARY_DETECTION_SIZE]
+                version["content"] = (
+                    base64.encodebytes(data).decode("ascii")
+                    if version["binary"]
+                    else data.decode("utf-8", errors="replace")
+                )
+
+            if merge_decisions and entry["filename"].endswith(".ipynb"):
+                try:
+                    entry["merge"] = await self.get_nbdiff(
+                        (entry["ours"] or {}).get("content", ""),
+                        (entry["theirs"] or {}).get("content", ""),
+                        # Files added on both sides are merged from an empty notebook
+                        (entry["base"] or {}).get("content")
+                        or nbformat.v4.new_notebook(),
+                    )
+                except Exception as e:
+                    get_logger().warning(
+                        "Fail to merge notebook {!s}".format(entry["filename"]),
+                        exc_info=True,
+                    )
+                    entry["message"] = str(e)
+
+        return {"code": 0, "files": list(files.values())}
+
     async def _get_base_ref(self, path, filename):
         """Get the object reference for an unmerged ``filename`` at base stage.
 
@@ -1662,6 +4288,127 @@ class Git:
 
         return response
 
+    async def remote_tracking_refs(self, path) -> Optional[Dict[str, str]]:
+        """Get the commit of each remote-tracking reference.
+
+        Args:
+            path (str): Git repository path
+        Returns:
+            Dict[str, str]: Commit SHA per reference name or None in case of error
+        """
+        code, output, _ = await self.__execute(
+            [
+                "git",
+                "for-each-ref",
+                "--format=%(refname)%09%(objectname)",
+                "refs/remotes/",
+            ],
+            cwd=path,
+        )
+        if code != 0:
+            return None
+        return dict(line.split("\t") for line in output.splitlines() if line)
+
+    async def _get_head_upstream(self, path) -> dict:
+        """Get the upstream of the current branch.
+
+        Returns:
+            {
+                "code": int,
+                # (remote name, reference on the remote, remote-tracking reference)
+                # or None if the current branch has no upstream
+                "upstream": Tuple[str, str, str] | None,
+            }
+        """
+        info = await self.repository_info(path)
+        if info["code"] != 0:
+            return info
+        head = info["head"]
+        if head is None:
+            return {"code": 0, "upstream": None}
+        code, output, _ = await self.__execute(
+            [
+                "git",
+                "for-each-ref",
+                "--format=%(upstream:remotename)%09%(upstream:remoteref)%09%(upstream)",
+                head,
+            ],
+            cwd=path,
+        )
+        fields = output.strip().split("\t")
+        if code != 0 or len(fields) != 3 or not all(fields):
+            return {"code": 0, "upstream": None}
+        return {"code": 0, "upstream": tuple(fields)}
+
+    async def remote_probe(self, path, upstream_only=False) -> dict:
+        """Check with `git ls-remote` whether a fetch would update the remote branches.
+
+        The branches tips on the remotes are compared with the local
+        remote-tracking references; this assumes the default fetch refspec
+        ``refs/heads/*:refs/remotes/<remote>/*``.
+
+        Args:
+            path (str): Git repository path
+            upstream_only (bool): Whether to only probe the upstream branch of the current branch
+        Returns:
+            {
+                "code": int,
+                "changes": List[str], # Remote-tracking references a fetch would update
+                "behind_remote": bool # Whether the current branch upstream would be updated
+            }
+        """
+        response = await self._get_head_upstream(path)
+        if response["code"] != 0:
+            return response
+        upstream = response["upstream"]
+        if upstream_only:
+            remotes = {} if upstream is None else {upstream[0]: [upstream[1]]}
+        else:
+            response = await self.remote_show(path)
+            if response["code"] != 0:
+                return response
+            remotes = {remote: [] for remote in response["remotes"]}
+
+        local_refs = await self.remote_tracking_refs(path) or {}
+        env = os.environ.copy()
+        env["GIT_TERMINAL_PROMPT"] = "0"
+        changes = []
+        for remote, branches in remotes.items():
+            cmd = ["git", "ls-remote", "--heads", remote, *branches]
+            code, output, error = await self.__execute(
+                cmd, cwd=path, env=env, exclusive=False
+            )
+            if code != 0:
+                return {"code": code, "command": " ".join(cmd), "message": error}
+
+            prefix = "refs/remotes/{}/".format(remote)
+            remote_tips = {}
+            for line in output.splitlines():
+                sha, _, ref = line.partition("\t")
+                if ref.startswith("refs/heads/"):
+                    remote_tips[prefix + ref[len("refs/heads/") :]] = sha
+            if branches:
+                local_tips = {upstream[2]: local_refs.get(upstream[2])}
+            else:
+                local_tips = {
+                    ref: sha
+                    for ref, sha in local_refs.items()
+                    if ref.startswith(prefix) and ref != prefix + "HEAD"
+                }
+            changes.extend(
+                sorted(
+                    ref
+                    for ref in remote_tips.keys() | local_tips.keys()
+                    if remote_tips.get(ref) != local_tips.get(ref)
+                )
+            )
+
+        return {
+            "code": 0,
+            "changes": changes,
+            "behind_remote": upstream is not None and upstream[2] in changes,
+        }
+
     async def remote_show(self, path, verbose=False):
         """Handle call to `git remote show` command.
         Args:
@@ -1801,27 +4548,50 @@ class Git:
 
         return None
 
-    async def tags(self, path):
+    async def _get_git_version(self):
+        """Get the parsed git version.
+
+        It is cached as the git executable is not expected to change while the server is running.
+        """
+        if self._git_version is None:
+            version = await self.version()
+            if version is not None:
+                self._git_version = parse(version)
+        return self._git_version
+
+    async def tags(self, path, pattern=None, sort=None, offset=0, limit=None):
         """List all tags of the git repository, including the commit each tag points to.
 
+        If any of ``pattern``, ``sort``, ``offset`` or ``limit`` is set, only the
+        requested page of tags is returned with a ``has_more`` flag.
+
         path: str
             Git path repository
+        pattern: str
+            Case insensitive sub-string the tag names must contain
+        sort: str
+            Sort key; "name" (default) or "date" (most recent first)
+        offset: int
+            Number of tags to skip
+        limit: int
+            Maximal number of tags to return
         """
-        formats = ["refname:short", "objectname"]
-        command = [
-            "git",
-            "for-each-ref",
-            "--format=" + "%09".join("%({})".format(f) for f in formats),
-            "refs/tags",
-        ]
-        code, output, error = await self.__execute(command, cwd=path)
-        if code != 0:
-            return {"code": code, "command": " ".join(command), "message": error}
-        tags = []
-        for tag_name, commit_id in (line.split("\t") for line in output.splitlines()):
-            tag = {"name": tag_name, "baseCommitId": commit_id}
-            tags.append(tag)
-        return {"code": code, "tags": tags}
+        if bool(pattern) or sort is not None or offset or limit is not None:
+            page = await self._list_refs_page(
+                path, ["refs/tags/"], pattern, sort, offset, limit
+            )
+            if page["code"] != 0:
+                return page
+            return {
+                "code": 0,
+                "tags": [tag for _, tag in page["refs"]],
+                "has_more": page["has_more"],
+            }
+
+        refs = await self._list_refs(path)
+        if refs["code"] != 0:
+            return refs
+        return {"code": 0, "tags": refs["tags"]}
 
     async def tag_checkout(self, path, tag):
         """Checkout the git repository at a given tag.
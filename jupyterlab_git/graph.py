@@ -0,0 +1,135 @@
+"""
+Module computing the commit graph layout displayed with the history
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# Default number of commits per graph page
+DEFAULT_GRAPH_PAGE = 500
+# Maximal number of commits per graph page
+MAX_GRAPH_PAGE = 5000
+# Maximal number of graph layouts kept
+MAX_CACHED_GRAPHS = 8
+
+# Route from a lateral offset to another one of a branch
+Route = Tuple[int, int, int]
+# Commit hash, lateral offset, branch and routes of a graph row
+Row = Tuple[str, int, int, Tuple[Route, ...]]
+
+
+class GraphLayout:
+    """Assign the lanes and routes of commits listed in topological order.
+
+    This is the algorithm of `src/generateGraphData.ts`; the commits are
+    added one at a time so that the layout can be extended with the next
+    commits. Only the branches of the commits still to come are remembered,
+    so the layout state stays small and can be serialized as a continuation.
+
+    Args:
+        state: Layout state returned by ``state()`` to continue from
+    """
+
+    def __init__(self, state: Optional[dict] = None):
+        state = state or {}
+        self.next_branch: int = state.get("next_branch", 0)
+        self.reserve: List[int] = list(state.get("reserve", []))
+        # Branch of the commits not yet added
+        self.branches: Dict[str, int] = dict(state.get("pending", {}))
+
+    def state(self) -> dict:
+        return {
+            "next_branch": self.next_branch,
+            "reserve": list(self.reserve),
+            "pending": dict(self.branches),
+        }
+
+    def add(self, sha: str, parents: List[str]) -> Row:
+        """Add the next commit and get its row."""
+        branch = self._get_branch(sha)
+        offset = self.reserve.index(branch)
+        routes = []
+
+        if len(parents) == 1:
+            if parents[0] in self.branches:
+                # Join the branch of the parent
+                for i, b in enumerate(self.reserve[offset + 1 :]):
+                    routes.append((i + offset + 1, i + offset, b))
+                for i, b in enumerate(self.reserve[:offset]):
+                    routes.append((i, i, b))
+                self.reserve.remove(branch)
+                routes.append(
+                    (offset, self.reserve.index(self.branches[parents[0]]), branch)
+                )
+            else:
+                # Straight
+                for i, b in enumerate(self.reserve):
+                    routes.append((i, i, b))
+                self.branches[parents[0]] = branch
+        elif len(parents) == 2:
+            # Merge
+            self.branches[parents[0]] = branch
+            for i, b in enumerate(self.reserve):
+                routes.append((i, i, b))
+            other = self._get_branch(parents[1])
+            routes.append((offset, self.reserve.index(other), other))
+
+        # Commits are listed after all their children
+        del self.branches[sha]
+        return sha, offset, branch, tuple(routes)
+
+    def _get_branch(self, sha: str) -> int:
+        if sha not in self.branches:
+            self.branches[sha] = self.next_branch
+            self.reserve.append(self.next_branch)
+            self.next_branch += 1
+        return self.branches[sha]
+
+
+class CommitGraph:
+    """Rows of the graph of the history of a commit, computed page after page.
+
+    Args:
+        tip: Commit whose history is laid out
+        start: Index of the first row
+        state: Layout state before the first row
+    """
+
+    def __init__(self, tip: str, start: int = 0, state: Optional[dict] = None):
+        self.tip = tip
+        self.start = start
+        self.rows: List[Row] = []
+        self.complete = False
+        self._layout = GraphLayout(state)
+        # Layout state after the rows, per row index
+        self._checkpoints: Dict[int, dict] = {start: self._layout.state()}
+
+    @property
+    def end(self) -> int:
+        """Index following the last row."""
+        return self.start + len(self.rows)
+
+    def extend(self, commits: List[List[str]]) -> None:
+        """Lay out the next commits given as [hash, *parents]."""
+        for sha, *parents in commits:
+            self.rows.append(self._layout.add(sha, parents))
+        self._checkpoints[self.end] = self._layout.state()
+
+    def continuation(self, index: int) -> Optional[dict]:
+        """State to continue the layout at a row index, if it was recorded."""
+        state = self._checkpoints.get(index)
+        if state is None:
+            return None
+        return {"tip": self.tip, "skip": index, **state}
+
+    def to_json(self, skip: int, count: int) -> List[dict]:
+        """Serialize the rows like the nodes of `src/generateGraphData.ts`."""
+        return [
+            {
+                "sha": sha,
+                "dot": {"lateralOffset": offset, "branch": branch},
+                "routes": [{"from": f, "to": t, "branch": b} for f, t, b in routes],
+            }
+            for sha, offset, branch, routes in self.rows[
+                skip - self.start : skip - self.start + count
+            ]
+        ]
@@ -2,18 +2,20 @@
 Module with all the individual handlers, which execute git commands and return the results to the frontend.
 """
 
+import fnmatch
 import functools
 import json
+import mimetypes
 import os
+import re
 from pathlib import Path
-from typing import Tuple, Union
+from typing import AsyncIterator, List, Optional, Tuple, Union
 
 import tornado
 from jupyter_server.base.handlers import APIHandler, path_regex
 from jupyter_server.services.contents.manager import ContentsManager
-from jupyter_server.utils import url2path, url_path_join, ensure_async
+from jupyter_server.utils import url_path_join, ensure_async
 from packaging.version import parse
-import fnmatch
 
 try:
     import hybridcontents
@@ -21,13 +23,102 @@ except ImportError:
     hybridcontents = None
 
 from ._version import __version__
-from .git import DEFAULT_REMOTE_NAME, Git, RebaseAction
+from .git import (
+    ARCHIVE_FORMATS,
+    DEFAULT_DIFF_CONTEXT,
+    DEFAULT_REMOTE_NAME,
+    Git,
+    RebaseAction,
+    STREAM_CHUNK_SIZE,
+)
+from .graph import DEFAULT_GRAPH_PAGE
+from .images import DEFAULT_PREVIEW_SIZE
 from .log import get_logger
+from .tables import DEFAULT_TABLE_CHANGES
 
 # Git configuration options exposed through the REST API
 ALLOWED_OPTIONS = ["user.name", "user.email"]
 # REST API namespace
 NAMESPACE = "/git"
+# Options of the fetch request limiting what is fetched
+FETCH_SCOPE_OPTIONS = (
+    "upstream_only",
+    "remotes",
+    "refspecs",
+    "tags",
+    "depth",
+    "shallow_since",
+)
+# Maximal number of seconds a client may wait for a background job progress
+MAX_JOB_WAIT_S = 30
+
+
+@functools.lru_cache(maxsize=8)
+def compile_excluded_paths(patterns: Tuple[str, ...]) -> Optional[re.Pattern]:
+    """Compile wildcard-style path patterns into a single matcher.
+
+    Returns None if there are no patterns.
+    """
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+def get_directories(data: Optional[dict]) -> List[str]:
+    """Get the non-empty list of directories of a request body."""
+    directories = (data or {}).get("directories")
+    if (
+        not isinstance(directories, list)
+        or not directories
+        or not all(isinstance(d, str) and d for d in directories)
+    ):
+        raise tornado.web.HTTPError(
+            400, "directories must be a non-empty list of paths."
+        )
+    return directories
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple]:
+    """Parse a single bytes `Range` header.
+
+    Returns:
+        None to send the whole content, () if the range cannot be satisfied
+        or (start, end) with end included
+    """
+    match = re.match(r"^bytes=(\d*)-(\d*)$", (header or "").strip())
+    if match is None or match.groups() == ("", ""):
+        # Missing, malformed and multiple ranges are ignored
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = size - 1 if last == "" else min(int(last), size - 1)
+    if start >= size or start > end:
+        return ()
+    return start, end
+
+
+async def file_chunks(filepath: str, start: int, end: int) -> AsyncIterator[bytes]:
+    """Stream the bytes start to end (included) of a file."""
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def get_top_level(info: dict) -> dict:
+    """Get the show_top_level response from a repository descriptor."""
+    if info["code"] != 0:
+        return {key: value for key, value in info.items() if key != "local_path"}
+    return {"code": 0, "path": info["top_level"]}
 
 
 class GitHandler(APIHandler):
@@ -44,19 +135,60 @@ class GitHandler(APIHandler):
         await ensure_async(super().prepare())
         path = self.path_kwargs.get("path")
         if path is not None:
-            excluded_paths = self.git.excluded_paths
-            for excluded_path in excluded_paths:
-                if fnmatch.fnmatchcase(path, excluded_path):
-                    raise tornado.web.HTTPError(404)
+            matcher = compile_excluded_paths(tuple(self.git.excluded_paths))
+            if matcher is not None and matcher.match(path):
+                raise tornado.web.HTTPError(404)
+
+    def start_job(self, kind: str, path: str, operation) -> None:
+        """Run a long operation in the background and reply with the job.
+
+        operation is called with the ``progress`` keyword argument.
+        """
+        job = self.git.jobs.start(
+            kind, path, lambda progress: operation(progress=progress)
+        )
+        self.set_status(202)
+        self.finish(json.dumps({"code": 0, "job": job.to_json()}))
+
+    def set_blob_cache_headers(self, oid: str, immutable: bool) -> bool:
+        """Set the cache headers of a content identified by its blob hash.
+
+        Args:
+            oid: Blob hash of the content, used as strong ETag
+            immutable: Whether the request addresses the content by its blob hash;
+                otherwise the client must revalidate its copy.
+        Returns:
+            Whether the client copy is still valid
+        """
+        self.set_header("Etag", '"{}"'.format(oid))
+        self.set_header(
+            "Cache-Control", self.git.blob_cache_control if immutable else "no-cache"
+        )
+        return self.check_etag_header()
 
-    @functools.lru_cache()
     def url2localpath(
         self, path: str, with_contents_manager: bool = False
     ) -> Union[str, Tuple[str, ContentsManager]]:
         """Get the local path from a JupyterLab server path.
 
         Optionally it can also return the contents manager for that path.
+
+        The resolution is cached by the Git instance per root directory and path.
         """
+        cm, path = self._resolve_contents_manager(path)
+        local_path = self.git.local_path(cm.root_dir, path)
+        return (local_path, cm) if with_contents_manager else local_path
+
+    async def repository(self, path: str) -> dict:
+        """Describe the repository containing a JupyterLab server path.
+
+        The descriptor is cached by the Git instance; see Git.repository.
+        """
+        cm, path = self._resolve_contents_manager(path)
+        return await self.git.repository(cm.root_dir, path)
+
+    def _resolve_contents_manager(self, path: str) -> Tuple[ContentsManager, str]:
+        """Get the contents manager of a server path and the path relative to it."""
         cm = self.contents_manager
 
         # Handle local manager of hybridcontents.HybridContentsManager
@@ -65,8 +197,7 @@ class GitHandler(APIHandler):
         ):
             _, cm, path = hybridcontents.hybridmanager._resolve_path(path, cm.managers)
 
-        local_path = os.path.join(os.path.expanduser(cm.root_dir), url2path(path))
-        return (local_path, cm) if with_contents_manager else local_path
+        return cm, path
 
 
 class GitCloneHandler(GitHandler):
@@ -86,17 +217,38 @@ class GitCloneHandler(GitHandler):
               # Whether to version the clone (True) or copy (False) it.
               OPTIONAL 'versioning': True,
               # Whether to clone the submodules or not.
-              OPTIONAL 'submodules': False
+              OPTIONAL 'submodules': False,
+              # Partial clone filter; e.g. 'blob:none' or 'tree:0'
+              OPTIONAL 'filter': None,
+              # Whether to only clone the remote HEAD branch history.
+              OPTIONAL 'single_branch': False,
+              # Directories to check out, the others are skipped.
+              OPTIONAL 'sparse': ['data/2024', 'src'],
+              # Branch or tag to check out instead of the remote HEAD.
+              OPTIONAL 'ref': None,
+              # Whether to run the clone in the background and return a job.
+              OPTIONAL 'background': False
             }
         """
         data = self.get_json_body()
-        response = await self.git.clone(
-            self.url2localpath(path),
+        local_path = self.url2localpath(path)
+        operation = functools.partial(
+            self.git.clone,
+            local_path,
             data["clone_url"],
             data.get("auth", None),
             data.get("versioning", True),
             data.get("submodules", False),
+            filter_spec=data.get("filter", None),
+            single_branch=data.get("single_branch", False),
+            sparse=data.get("sparse", None),
+            ref=data.get("ref", None),
         )
+        if data.get("background", False):
+            self.start_job("clone", local_path, operation)
+            return
+
+        response = await operation()
 
         if response["code"] != 0:
             self.set_status(500)
@@ -121,9 +273,10 @@ class GitAllHistoryHandler(GitHandler):
         """
         body = self.get_json_body()
         history_count = body["history_count"]
-        local_path = self.url2localpath(path)
+        info = await self.repository(path)
+        local_path = info["local_path"]
 
-        show_top_level = await self.git.show_top_level(local_path)
+        show_top_level = get_top_level(info)
         if show_top_level.get("path") is None:
             self.set_status(500)
             self.finish(json.dumps(show_top_level))
@@ -155,7 +308,8 @@ class GitShowTopLevelHandler(GitHandler):
         """
         POST request handler, displays the git root directory inside a repository.
         """
-        result = await self.git.show_top_level(self.url2localpath(path))
+        info = await self.repository(path)
+        result = get_top_level(info)
 
         if result["code"] != 0:
             self.set_status(500)
@@ -183,6 +337,66 @@ class GitShowPrefixHandler(GitHandler):
         self.finish(json.dumps(result))
 
 
+class GitRepositoryHandler(GitHandler):
+    """
+    Handler for 'git rev-parse' describing the repository containing a directory.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, describes the repository: top level directory,
+        prefix, git directories, whether it is bare or shallow and the
+        reference pointed by HEAD.
+        """
+        result = await self.repository(path)
+        result.pop("local_path", None)
+
+        if result["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(result))
+
+
+class GitArchiveHandler(GitHandler):
+    """
+    Handler for 'git archive' downloading the files of a reference.
+    """
+
+    @tornado.web.authenticated
+    async def get(self, path: str = ""):
+        """
+        GET request handler, streams a zip or tar archive of a reference.
+
+        Query arguments:
+            ref: Commit, branch or tag to archive; default HEAD
+            format: One of "zip", "tar" or "tar.gz"; default "zip"
+        """
+        ref = self.get_query_argument("ref", "HEAD")
+        archive_format = self.get_query_argument("format", "zip")
+        info = await self.repository(path)
+        local_path = info["local_path"]
+
+        chunks = await self.git.archive(local_path, ref, archive_format)
+
+        name = os.path.basename(info.get("top_level") or local_path.rstrip(os.sep))
+        filename = "{}-{}.{}".format(
+            name, re.sub(r"[^\w.\-]+", "-", ref), archive_format
+        )
+        self.set_header("Content-Type", ARCHIVE_FORMATS[archive_format])
+        self.set_header(
+            "Content-Disposition", 'attachment; filename="{}"'.format(filename)
+        )
+        try:
+            async for chunk in chunks:
+                self.write(chunk)
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            # The client went away; stop the archive
+            await chunks.aclose()
+            return
+        self.finish(set_content_type=ARCHIVE_FORMATS[archive_format])
+
+
 class GitFetchHandler(GitHandler):
     """
     Handler for 'git fetch'
@@ -192,11 +406,115 @@ class GitFetchHandler(GitHandler):
     async def post(self, path: str = ""):
         """
         POST request handler, fetch from remotes.
+
+        Without scope options, fetches of the same repository are shared between
+        clients, spaced out and, unless forced or authenticated, limited to the
+        scope configured by ``JupyterLabGit.fetch_scope``.
+
+        Input format:
+            {
+              OPTIONAL 'auth': {...},
+              # Whether to fetch even if the next scheduled fetch is not due.
+              OPTIONAL 'force': False,
+              # Remote references generation known by the client.
+              OPTIONAL 'generation': None,
+              # Scope options; see Git.fetch
+              OPTIONAL 'upstream_only': False,
+              OPTIONAL 'remotes': ['origin'],
+              OPTIONAL 'refspecs': ['refs/heads/main'],
+              OPTIONAL 'tags': True,
+              OPTIONAL 'depth': 1,
+              OPTIONAL 'shallow_since': '2024-01-01',
+              # Whether to run the fetch in the background and return a job.
+              OPTIONAL 'background': False
+            }
         """
         data = self.get_json_body()
-        result = await self.git.fetch(
-            self.url2localpath(path),
-            data.get("auth", None),
+        local_path = self.url2localpath(path)
+        scope = {key: data[key] for key in FETCH_SCOPE_OPTIONS if key in data}
+        operation = functools.partial(
+            self.git.fetch, local_path, data.get("auth", None), **scope
+        )
+        if data.get("background", False):
+            self.start_job("fetch", local_path, operation)
+            return
+
+        if scope:
+            result = await operation()
+        else:
+            result = await self.git.fetch_scheduler.fetch(
+                local_path,
+                data.get("auth", None),
+                force=data.get("force", False),
+                generation=data.get("generation", None),
+            )
+
+        if result["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(result))
+
+
+class GitSparseCheckoutHandler(GitHandler):
+    """
+    Handler for 'git sparse-checkout list'.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, describes the sparse-checkout: checked out
+        directories and number of skipped files.
+        """
+        result = await self.git.sparse_checkout(self.url2localpath(path))
+
+        if result["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(result))
+
+
+class GitSparseCheckoutAddHandler(GitHandler):
+    """
+    Handler for 'git sparse-checkout add'.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, checks out additional directories.
+
+        Input format:
+            {
+              'directories': ['data/2024']
+            }
+        """
+        directories = get_directories(self.get_json_body())
+        result = await self.git.sparse_checkout_add(
+            self.url2localpath(path), directories
+        )
+
+        if result["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(result))
+
+
+class GitSparseCheckoutRemoveHandler(GitHandler):
+    """
+    Handler for 'git sparse-checkout set' without some directories.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, removes directories from the worktree.
+
+        Input format:
+            {
+              'directories': ['data/2023']
+            }
+        """
+        directories = get_directories(self.get_json_body())
+        result = await self.git.sparse_checkout_remove(
+            self.url2localpath(path), directories
         )
 
         if result["code"] != 0:
@@ -245,6 +563,37 @@ class GitLogHandler(GitHandler):
         self.finish(json.dumps(result))
 
 
+class GitGraphHandler(GitHandler):
+    """
+    Handler laying out the commit graph of a reference history.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, returns a page of the commit graph lanes and routes.
+
+        Body: {
+            "ref"?: Reference whose history is laid out; default HEAD,
+            "skip"?: Index of the first row; default 0,
+            "count"?: Maximal number of rows,
+            "continuation"?: Continuation returned with the previous page
+        }
+        """
+        body = self.get_json_body()
+        result = await self.git.graph(
+            self.url2localpath(path),
+            body.get("ref", "HEAD"),
+            body.get("skip", 0),
+            body.get("count", DEFAULT_GRAPH_PAGE),
+            body.get("continuation"),
+        )
+
+        if result["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(result))
+
+
 class GitDetailedLogHandler(GitHandler):
     """
     Handler for 'git log -m --cc -1 --stat --numstat --oneline -z' command.
@@ -294,6 +643,213 @@ class GitDiffHandler(GitHandler):
         self.finish(my_output)
 
 
+class GitTextDiffHandler(GitHandler):
+    """
+    Handler for 'git diff' returning the hunks of a text file.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, computes the diff hunks of a file between two references.
+
+        Body: {
+            "filename": File path relative to the repository,
+            "previous": Previous reference; e.g. {"git": "HEAD"},
+            "current": Current reference; e.g. {"special": "WORKING"},
+            "context"?: Number of unchanged lines around the changes; default 3
+        }
+        """
+        data = self.get_json_body()
+        local_path, cm = self.url2localpath(path, with_contents_manager=True)
+        response = await self.git.text_diff(
+            local_path,
+            data["filename"],
+            data["previous"],
+            data["current"],
+            cm,
+            data.get("context", DEFAULT_DIFF_CONTEXT),
+        )
+
+        if response["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(response))
+
+
+class GitImageDiffHandler(GitHandler):
+    """
+    Handler comparing an image between two references with downscaled previews.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, computes the previews and the difference mask of an image.
+
+        Body: {
+            "filename": File path relative to the repository,
+            "previous": Previous reference; e.g. {"git": "HEAD"},
+            "current": Current reference; e.g. {"special": "WORKING"},
+            "size"?: Maximal size in pixels of the previews; default 512
+        }
+        """
+        data = self.get_json_body()
+        response = await self.git.image_diff(
+            self.url2localpath(path),
+            data["filename"],
+            data["previous"],
+            data["current"],
+            data.get("size", DEFAULT_PREVIEW_SIZE),
+        )
+
+        if response["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(response))
+
+
+class GitConflictsHandler(GitHandler):
+    """
+    Handler returning the base, ours and theirs versions of conflicted files.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, reads the index stages of the conflicted files.
+
+        Body: {
+            "filenames"?: Conflicted files relative to the repository; default all of them,
+            "merge_decisions"?: Whether to compute the nbdime merge decisions of the notebooks
+        }
+        """
+        data = self.get_json_body() or {}
+        filenames = data.get("filenames")
+        if filenames is not None and (
+            not isinstance(filenames, list)
+            or not all(isinstance(name, str) for name in filenames)
+        ):
+            raise tornado.web.HTTPError(
+                status_code=400, reason="filenames must be a list of strings."
+            )
+        merge_decisions = data.get("merge_decisions", False)
+        if not isinstance(merge_decisions, bool):
+            raise tornado.web.HTTPError(
+                status_code=400, reason="merge_decisions must be a boolean."
+            )
+
+        response = await self.git.conflicts(
+            self.url2localpath(path), filenames, merge_decisions
+        )
+
+        if response["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(response))
+
+
+class GitNotebookDiffsHandler(GitHandler):
+    """
+    Handler precomputing the diffs of all the notebooks changed by a commit.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, diffs the changed notebooks and caches the diffs.
+
+        Body: {
+            "commit": Commit whose changes are diffed,
+            "previous"?: Commit compared with; default the first parent of commit,
+            "background"?: Whether to run the diffs in the background and return a job
+        }
+        """
+        data = self.get_json_body()
+        commit = data.get("commit")
+        previous = data.get("previous")
+        if not isinstance(commit, str) or not isinstance(previous, (str, type(None))):
+            raise tornado.web.HTTPError(
+                status_code=400, reason="commit and previous must be strings."
+            )
+        local_path = self.url2localpath(path)
+        operation = functools.partial(
+            self.git.notebook_diffs, local_path, commit, previous
+        )
+        if data.get("background", False):
+            self.start_job("notebook_diffs", local_path, operation)
+            return
+
+        response = await operation()
+        if response["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(response))
+
+
+class GitTableDiffHandler(GitHandler):
+    """
+    Handler comparing the rows of a CSV or TSV file between two references.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, computes the added, removed and changed rows and cells of a table.
+
+        Body: {
+            "filename": File path relative to the repository,
+            "previous": Previous reference; e.g. {"git": "HEAD"},
+            "current": Current reference; e.g. {"special": "WORKING"},
+            "key"?: Names of the columns identifying a row; by default rows are matched by values,
+            "max_changes"?: Maximal number of row changes detailed; default 200,
+            "delimiter"?: Field delimiter; by default deduced from the file extension
+        }
+        """
+        data = self.get_json_body()
+        response = await self.git.table_diff(
+            self.url2localpath(path),
+            data["filename"],
+            data["previous"],
+            data["current"],
+            data.get("key"),
+            data.get("max_changes", DEFAULT_TABLE_CHANGES),
+            data.get("delimiter"),
+        )
+
+        if response["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(response))
+
+
+class GitTextLinesHandler(GitHandler):
+    """
+    Handler returning a range of lines of a text file; e.g. to expand a diff.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, returns the lines start to end (included) of a file.
+
+        Body: {
+            "filename": File path relative to the repository,
+            "reference": File reference; e.g. {"git": "HEAD"},
+            "start": Index of the first line, starting at 1,
+            "end": Index of the last line
+        }
+        """
+        data = self.get_json_body()
+        local_path, cm = self.url2localpath(path, with_contents_manager=True)
+        response = await self.git.text_lines(
+            local_path,
+            data["filename"],
+            data["reference"],
+            data.get("start"),
+            data.get("end"),
+            cm,
+        )
+        if response["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(response))
+
+
 class GitBranchHandler(GitHandler):
     """
     Handler for 'git branch -a'. Fetches list of all branches in current repository
@@ -303,8 +859,26 @@ class GitBranchHandler(GitHandler):
     async def post(self, path: str = ""):
         """
         POST request handler, fetches all branches in current repository.
+
+        Body: {
+            "ahead_behind"?: Whether to add ahead/behind counts to the local branches,
+            "base"?: Reference against which the ahead/behind counts are also computed,
+            "pattern"?: Case insensitive sub-string the branch names must contain,
+            "sort"?: Sort key "name" or "date",
+            "offset"?: Number of branches to skip,
+            "limit"?: Maximal number of branches to return
+        }
         """
-        result = await self.git.branch(self.url2localpath(path))
+        data = self.get_json_body() or {}
+        result = await self.git.branch(
+            self.url2localpath(path),
+            ahead_behind=data.get("ahead_behind", False),
+            base=data.get("base"),
+            pattern=data.get("pattern"),
+            sort=data.get("sort"),
+            offset=data.get("offset", 0),
+            limit=data.get("limit"),
+        )
 
         if result["code"] != 0:
             self.set_status(500)
@@ -550,6 +1124,31 @@ class GitMergeHandler(GitHandler):
         self.finish(json.dumps(body))
 
 
+class GitMergePreviewHandler(GitHandler):
+    """
+    Handler for 'git merge-tree' predicting the conflicts of a pull, merge or rebase.
+    """
+
+    @tornado.web.authenticated
+    async def post(self, path: str = ""):
+        """
+        POST request handler, lists the conflicting files without touching the worktree.
+
+        Body: {
+            "operation": "pull" | "merge" | "rebase",
+            "target"?: Branch to merge or to rebase onto
+        }
+        """
+        data = self.get_json_body()
+        body = await self.git.merge_preview(
+            self.url2localpath(path), data.get("operation"), data.get("target")
+        )
+
+        if body["code"] != 0:
+            self.set_status(500)
+        self.finish(json.dumps(body))
+
+
 class GitCommitHandler(GitHandler):
     """
     Handler for 'git commit -m <message>' and 'git commit --amend'. Commits files.
@@ -597,13 +1196,22 @@ class GitPullHandler(GitHandler):
     async def post(self, path: str = ""):
         """
         POST request handler, pulls files from a remote branch to your current branch.
+
+        If ``background`` is true in the body, the pull runs as a job.
         """
         data = self.get_json_body()
-        response = await self.git.pull(
-            self.url2localpath(path),
+        local_path = self.url2localpath(path)
+        operation = functools.partial(
+            self.git.pull,
+            local_path,
             data.get("auth", None),
             data.get("cancel_on_conflict", False),
         )
+        if data.get("background", False):
+            self.start_job("pull", local_path, operation)
+            return
+
+        response = await operation()
 
         if response["code"] != 0:
             self.set_status(500)
@@ -627,6 +1235,7 @@ class GitPushHandler(GitHandler):
         {
             remote?: string # Remote to push to; i.e. <remote_name> or <remote_name>/<branch>
             force: boolean # Whether or not to force the push
+            background?: boolean # Whether to run the push as a job
         }
         """
         local_path = self.url2localpath(path)
@@ -652,9 +1261,11 @@ class GitPushHandler(GitHandler):
                 "remote_short_name": remote_name,
             }
 
+        operation = None
         if current_upstream_branch["code"] == 0:
             branch = ":".join(["HEAD", current_upstream_branch["remote_branch"]])
-            response = await self.git.push(
+            operation = functools.partial(
+                self.git.push,
                 current_upstream_branch["remote_short_name"],
                 branch,
                 local_path,
@@ -680,7 +1291,8 @@ class GitPushHandler(GitHandler):
                 default_remote = remotes[0]
 
             if default_remote is not None:
-                response = await self.git.push(
+                operation = functools.partial(
+                    self.git.push,
                     default_remote,
                     current_local_branch,
                     local_path,
@@ -697,6 +1309,12 @@ class GitPushHandler(GitHandler):
                     "remotes": remotes,  # Returns the list of known remotes
                 }
 
+        if operation is not None:
+            if data.get("background", False):
+                self.start_job("push", local_path, operation)
+                return
+            response = await operation()
+
         if response["code"] != 0:
             self.set_status(500)
 
@@ -765,6 +1383,22 @@ class GitContentHandler(GitHandler):
     Handler to get file content at a certain git reference
     """
 
+    @tornado.web.authenticated
+    async def get(self, path: str = ""):
+        """
+        GET request handler, returns the content of a blob; it is cached as it never changes.
+
+        Query arguments:
+            oid: Blob hash; e.g. the ETag of the `content/raw` response for a file at a reference
+        """
+        oid = self.get_query_argument("oid")
+        if self.set_blob_cache_headers(oid, immutable=True):
+            self.set_status(304)
+            self.finish()
+            return
+        response = await self.git.blob_content(self.url2localpath(path), oid)
+        self.finish(json.dumps(response))
+
     @tornado.web.authenticated
     async def post(self, path: str = ""):
         data = self.get_json_body()
@@ -777,6 +1411,99 @@ class GitContentHandler(GitHandler):
         self.finish(json.dumps(response))
 
 
+class GitRawContentHandler(GitHandler):
+    """
+    Handler streaming the bytes of a file at a git reference.
+    """
+
+    @tornado.web.authenticated
+    async def head(self, path: str = ""):
+        """
+        HEAD request handler, returns the size and the type of the content.
+        """
+        await self._serve(path, include_body=False)
+
+    @tornado.web.authenticated
+    async def get(self, path: str = ""):
+        """
+        GET request handler, streams the content; a single `Range` of bytes is supported.
+
+        Query arguments:
+            filename: File path relative to the repository
+            ref: Commit; default HEAD
+            special: "INDEX" or "WORKING" to get the staged or the working content
+            oid: Blob hash, instead of ref or special; the response is then cached
+
+        The blob hash of the content is returned as ETag.
+        """
+        await self._serve(path, include_body=True)
+
+    async def _serve(self, path: str, include_body: bool) -> None:
+        filename = self.get_query_argument("filename")
+        oid = self.get_query_argument("oid", None)
+        special = self.get_query_argument("special", None)
+        if oid is not None:
+            reference = {"oid": oid}
+        elif special is not None:
+            reference = {"special": special}
+        else:
+            reference = {"git": self.get_query_argument("ref", "HEAD")}
+        content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        local_path = self.url2localpath(path)
+
+        if oid is not None and self.set_blob_cache_headers(oid, immutable=True):
+            # The content of a blob never changes; no need to look for it
+            self.set_status(304)
+            self.finish(set_content_type=content_type)
+            return
+
+        info = await self.git.blob_info(local_path, filename, reference)
+        if info["code"] != 0:
+            self.set_status(500)
+            self.finish(json.dumps(info))
+            return
+
+        if "oid" in info and self.set_blob_cache_headers(info["oid"], oid is not None):
+            self.set_status(304)
+            self.finish(set_content_type=content_type)
+            return
+
+        size = info["size"]
+        self.set_header("Content-Type", content_type)
+        self.set_header("Accept-Ranges", "bytes")
+
+        start, end = 0, size - 1
+        requested = parse_range(self.request.headers.get("Range"), size)
+        if requested is not None:
+            if requested == ():
+                self.set_status(416)
+                self.set_header("Content-Range", "bytes */{}".format(size))
+                self.finish(set_content_type=content_type)
+                return
+            start, end = requested
+            self.set_status(206)
+            self.set_header("Content-Range", "bytes {}-{}/{}".format(start, end, size))
+        self.set_header("Content-Length", end - start + 1)
+
+        if not include_body or end < start:
+            self.finish(set_content_type=content_type)
+            return
+
+        if "file" in info:
+            chunks = file_chunks(info["file"], start, end)
+        else:
+            chunks = self.git.blob_chunks(local_path, info["oid"], start, end)
+        try:
+            async for chunk in chunks:
+                self.write(chunk)
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            # The client went away; stop reading
+            await chunks.aclose()
+            return
+        self.finish(set_content_type=content_type)
+
+
 class GitDiffNotebookHandler(GitHandler):
     """
     Returns nbdime diff of given notebook base content and remote content
@@ -793,10 +1520,23 @@ class GitDiffNotebookHandler(GitHandler):
             raise tornado.web.HTTPError(
                 status_code=400, reason=f"Missing POST key: {e}"
             )
+        base_content = data.get("baseContent")
+        ignored = {
+            name: data.get(name, False)
+            for name in ("ignore_outputs", "ignore_metadata", "ignore_execution_count")
+        }
+        if not all(isinstance(value, bool) for value in ignored.values()):
+            raise tornado.web.HTTPError(
+                status_code=400, reason="Ignore options must be booleans."
+            )
+        if base_content and any(ignored.values()):
+            raise tornado.web.HTTPError(
+                status_code=400,
+                reason="Notebook parts cannot be ignored for a merge.",
+            )
         try:
-            base_content = data.get("baseContent")
             content = await self.git.get_nbdiff(
-                prev_content, curr_content, base_content
+                prev_content, curr_content, base_content, **ignored
             )
         except Exception as e:
             get_logger().error(f"Error computing notebook diff.", exc_info=e)
@@ -807,6 +1547,72 @@ class GitDiffNotebookHandler(GitHandler):
         self.finish(json.dumps(content))
 
 
+class GitDiffNotebookSummaryHandler(GitHandler):
+    """
+    Returns the alignment of the cells of two notebooks; first phase of a cell-lazy notebook diff
+    """
+
+    @tornado.web.authenticated
+    async def post(self):
+        """
+        POST request handler, compares the cells of two notebooks through hashes.
+
+        Body: {
+            "previousContent": Notebook previous content,
+            "currentContent": Notebook current content
+        }
+        """
+        data = self.get_json_body()
+        try:
+            prev_content = data["previousContent"]
+            curr_content = data["currentContent"]
+        except KeyError as e:
+            raise tornado.web.HTTPError(
+                status_code=400, reason=f"Missing POST key: {e}"
+            )
+        try:
+            content = await self.git.notebook_cells(prev_content, curr_content)
+        except (ValueError, KeyError) as e:
+            raise tornado.web.HTTPError(
+                status_code=400, reason=f"Invalid notebook: {e}."
+            ) from e
+        self.finish(json.dumps(content))
+
+
+class GitDiffNotebookCellsHandler(GitHandler):
+    """
+    Returns nbdime diff of some cells of two notebooks; second phase of a cell-lazy notebook diff
+    """
+
+    @tornado.web.authenticated
+    async def post(self):
+        """
+        POST request handler, diffs the requested cells; e.g. when they scroll into view.
+
+        Body: {
+            "previous": Previous notebook key returned by the summary,
+            "current": Current notebook key returned by the summary,
+            "cells": List of [previous index, current index]; index is null for an added or removed cell,
+            "ignore_outputs"?: Whether to ignore the outputs,
+            "ignore_metadata"?: Whether to ignore the metadata,
+            "ignore_execution_count"?: Whether to ignore the execution counts
+        }
+        """
+        data = self.get_json_body()
+        ignored = {
+            name: data.get(name, False)
+            for name in ("ignore_outputs", "ignore_metadata", "ignore_execution_count")
+        }
+        if not all(isinstance(value, bool) for value in ignored.values()):
+            raise tornado.web.HTTPError(
+                status_code=400, reason="Ignore options must be booleans."
+            )
+        content = await self.git.notebook_cell_diffs(
+            data.get("previous"), data.get("current"), data.get("cells"), **ignored
+        )
+        self.finish(json.dumps(content))
+
+
 class GitIgnoreHandler(GitHandler):
     """
     Handler to manage .gitignore
@@ -874,6 +1680,59 @@ class GitSettingsHandler(GitHandler):
         )
 
 
+class GitJobsHandler(GitHandler):
+    """
+    Handler listing the background git operations.
+    """
+
+    @tornado.web.authenticated
+    async def get(self):
+        self.finish(
+            json.dumps(
+                {"code": 0, "jobs": [job.to_json() for job in self.git.jobs.list()]}
+            )
+        )
+
+
+class GitJobHandler(GitHandler):
+    """
+    Handler following or cancelling a background git operation.
+    """
+
+    @tornado.web.authenticated
+    async def get(self, job_id: str):
+        """
+        GET request handler, returns the job with its progress events.
+
+        Query arguments:
+            since: Index of the first progress event to return; default 0
+            wait: Maximal number of seconds to wait for a new event or the job end; default 0
+        """
+        try:
+            since = int(self.get_query_argument("since", "0"))
+            wait = float(self.get_query_argument("wait", "0"))
+        except ValueError:
+            raise tornado.web.HTTPError(400, "since and wait must be numbers.")
+
+        job = self.git.jobs.get(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404, "Unknown job {}".format(job_id))
+
+        await job.wait(since, min(wait, MAX_JOB_WAIT_S))
+        self.finish(json.dumps({"code": 0, "job": job.to_json(since)}))
+
+    @tornado.web.authenticated
+    async def delete(self, job_id: str):
+        """
+        DELETE request handler, cancels the job and kills its git process.
+        """
+        job = self.git.jobs.cancel(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404, "Unknown job {}".format(job_id))
+
+        self.finish(json.dumps({"code": 0, "job": job.to_json()}))
+
+
 class GitTagHandler(GitHandler):
     """
     Handler for 'git for-each-ref refs/tags'. Fetches list of all tags in current repository
@@ -883,8 +1742,22 @@ class GitTagHandler(GitHandler):
     async def post(self, path: str = ""):
         """
         POST request handler, fetches all tags in current repository.
+
+        Body: {
+            "pattern"?: Case insensitive sub-string the tag names must contain,
+            "sort"?: Sort key "name" or "date",
+            "offset"?: Number of tags to skip,
+            "limit"?: Maximal number of tags to return
+        }
         """
-        result = await self.git.tags(self.url2localpath(path))
+        data = self.get_json_body() or {}
+        result = await self.git.tags(
+            self.url2localpath(path),
+            pattern=data.get("pattern"),
+            sort=data.get("sort"),
+            offset=data.get("offset", 0),
+            limit=data.get("limit"),
+        )
 
         if result["code"] != 0:
             self.set_status(500)
@@ -1076,6 +1949,7 @@ def setup_handlers(web_app):
         ("/add_all_unstaged", GitAddAllUnstagedHandler),
         ("/add_all_untracked", GitAddAllUntrackedHandler),
         ("/all_history", GitAllHistoryHandler),
+        ("/archive", GitArchiveHandler),
         ("/branch/delete", GitBranchDeleteHandler),
         ("/branch", GitBranchHandler),
         ("/changed_files", GitChangedFilesHandler),
@@ -1083,22 +1957,35 @@ def setup_handlers(web_app):
         ("/clone", GitCloneHandler),
         ("/commit", GitCommitHandler),
         ("/config", GitConfigHandler),
+        ("/conflicts", GitConflictsHandler),
+        ("/content/raw", GitRawContentHandler),
         ("/content", GitContentHandler),
         ("/delete_commit", GitDeleteCommitHandler),
         ("/detailed_log", GitDetailedLogHandler),
+        ("/diff/image", GitImageDiffHandler),
+        ("/diff/notebooks", GitNotebookDiffsHandler),
+        ("/diff/table", GitTableDiffHandler),
+        ("/diff/text/lines", GitTextLinesHandler),
+        ("/diff/text", GitTextDiffHandler),
         ("/diff", GitDiffHandler),
+        ("/graph", GitGraphHandler),
         ("/init", GitInitHandler),
         ("/log", GitLogHandler),
+        ("/merge/preview", GitMergePreviewHandler),
         ("/merge", GitMergeHandler),
         ("/pull", GitPullHandler),
         ("/push", GitPushHandler),
         ("/remote/add", GitRemoteAddHandler),
         ("/remote/fetch", GitFetchHandler),
         ("/remote/show", GitRemoteDetailsShowHandler),
+        ("/repository", GitRepositoryHandler),
         ("/reset", GitResetHandler),
         ("/reset_to_commit", GitResetToCommitHandler),
         ("/show_prefix", GitShowPrefixHandler),
         ("/show_top_level", GitShowTopLevelHandler),
+        ("/sparse_checkout/add", GitSparseCheckoutAddHandler),
+        ("/sparse_checkout/remove", GitSparseCheckoutRemoveHandler),
+        ("/sparse_checkout", GitSparseCheckoutHandler),
         ("/status", GitStatusHandler),
         ("/upstream", GitUpstreamHandler),
         ("/ignore", GitIgnoreHandler),
@@ -1113,8 +2000,12 @@ def setup_handlers(web_app):
     ]
 
     handlers = [
+        ("/diffnotebook/summary", GitDiffNotebookSummaryHandler),
+        ("/diffnotebook/cells", GitDiffNotebookCellsHandler),
         ("/diffnotebook", GitDiffNotebookHandler),
         ("/settings", GitSettingsHandler),
+        ("/jobs", GitJobsHandler),
+        (r"/jobs/(?P<job_id>\w+)", GitJobHandler),
     ]
 
     # add the baseurl to our paths
@@ -0,0 +1,114 @@
+"""
+Module computing the previews displayed by the image diff
+"""
+
+import base64
+import io
+from typing import Optional
+
+try:
+    from PIL import Image, ImageChops
+except ImportError:
+    Image = None
+
+# Default size in pixels of the largest side of the image previews
+DEFAULT_PREVIEW_SIZE = 512
+# Maximal size in pixels of the largest side of the image previews
+MAX_PREVIEW_SIZE = 2048
+# Maximal number of image diffs kept
+MAX_CACHED_IMAGE_DIFFS = 32
+
+
+def _encode_png(image: "Image.Image") -> str:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _preview(image: "Image.Image", size: int) -> "Image.Image":
+    preview = image.copy()
+    preview.thumbnail((size, size), Image.LANCZOS)
+    return preview
+
+
+def image_diff(previous: Optional[bytes], current: Optional[bytes], size: int) -> dict:
+    """Compare two images and get their downscaled previews.
+
+    The images are compared pixel by pixel aligned on their top-left corner;
+    the changed pixels are opaque in the difference mask. A missing image
+    (e.g. for an added file) is None.
+
+    Args:
+        previous: Content of the previous image
+        current: Content of the current image
+        size: Maximal size in pixels of the largest side of the previews
+    Returns:
+        {
+            "previous": {"width": int, "height": int, "size": int, "format": str, "preview": str} | None,
+            "current": idem,
+            "mask": str | None,  # PNG difference mask at the previews scale
+            "changed": int  # Number of changed pixels at full resolution
+        }
+        The previews and the mask are base64 encoded PNG images.
+    Raises:
+        OSError: if a content is not an image
+    """
+    images = []
+    result = {}
+    for key, data in (("previous", previous), ("current", current)):
+        if data is None:
+            images.append(None)
+            result[key] = None
+            continue
+        image = Image.open(io.BytesIO(data))
+        image_format = image.format
+        # Decode the first frame only
+        image = image.convert("RGBA")
+        images.append(image)
+        result[key] = {
+            "width": image.width,
+            "height": image.height,
+            "size": len(data),
+            "format": image_format,
+            "preview": _encode_png(_preview(image, size)),
+        }
+
+    old, new = images
+    if old is None or new is None:
+        result["mask"] = None
+        result["changed"] = (old or new).width * (old or new).height
+        return result
+
+    # Compare on the canvas enclosing both images
+    canvas = (max(old.width, new.width), max(old.height, new.height))
+    if old.size != canvas:
+        old = _on_canvas(old, canvas)
+    if new.size != canvas:
+        new = _on_canvas(new, canvas)
+    difference = ImageChops.difference(old, new)
+    # A pixel is changed if any of its channels is
+    mask = Image.new("L", canvas)
+    for band in difference.split():
+        mask = ImageChops.lighter(mask, band.point(lambda v: 255 if v else 0))
+    result["changed"] = mask.histogram()[255]
+    if result["changed"] == 0:
+        result["mask"] = None
+    else:
+        result["mask"] = _encode_png(_mask_preview(mask, size))
+    return result
+
+
+def _mask_preview(mask: "Image.Image", size: int) -> "Image.Image":
+    # Halve the mask until it fits, so that isolated changed pixels stay visible
+    while max(mask.size) > size:
+        width, height = mask.size
+        scale = max(0.5, size / max(width, height))
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+        mask = mask.resize(target, Image.BOX).point(lambda v: 255 if v else 0)
+    return mask
+
+
+def _on_canvas(image: "Image.Image", canvas: tuple) -> "Image.Image":
+    background = Image.new("RGBA", canvas)
+    background.paste(image, (0, 0))
+    return background
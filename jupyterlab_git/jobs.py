@@ -0,0 +1,173 @@
+"""
+Module running long git operations (clone, fetch, pull, push, notebook diffs) in the background
+"""
+
+import asyncio
+import datetime
+import time
+import traceback
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import tornado.locks
+
+from .log import get_logger
+
+# Default delay in seconds during which finished jobs are kept
+DEFAULT_JOB_RETENTION_S = 300.0
+# Maximal number of progress events kept per job
+MAX_JOB_EVENTS = 1000
+
+
+class JobStatus:
+    """Background job status."""
+
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Job:
+    """Git operation running in the background.
+
+    Args:
+        kind: Operation name; e.g. "clone"
+        path: Local path on which the operation is executed
+    """
+
+    def __init__(self, kind: str, path: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.path = path
+        self.status = JobStatus.RUNNING
+        self.result: Optional[dict] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        # Progress events and index of the first kept event
+        self.events: List[dict] = []
+        self.events_offset = 0
+        self._changed = tornado.locks.Condition()
+        self._task: Optional[asyncio.Future] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status != JobStatus.RUNNING
+
+    def add_event(self, event: dict) -> None:
+        """Record a progress event and wake up the clients waiting for it."""
+        self.events.append(event)
+        if len(self.events) > MAX_JOB_EVENTS:
+            dropped = len(self.events) - MAX_JOB_EVENTS
+            del self.events[:dropped]
+            self.events_offset += dropped
+        self._changed.notify_all()
+
+    def finish(self, status: str, result: dict) -> None:
+        self.status = status
+        self.result = result
+        self.finished = time.time()
+        self._changed.notify_all()
+
+    async def wait(self, since: int = 0, timeout: float = 0) -> None:
+        """Wait at most timeout seconds for an event after index since or the job end."""
+        if (
+            timeout > 0
+            and not self.done
+            and since >= self.events_offset + len(self.events)
+        ):
+            await self._changed.wait(timeout=datetime.timedelta(seconds=timeout))
+
+    def to_json(self, since: int = 0) -> dict:
+        """Serialize the job with the progress events starting at index since."""
+        start = max(since - self.events_offset, 0)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created": self.created,
+            "finished": self.finished,
+            "events": self.events[start:],
+            "next": self.events_offset + len(self.events),
+            "result": self.result,
+        }
+
+
+class JobManager:
+    """Start, track and cancel background git operations.
+
+    Finished jobs are forgotten after ``retention`` seconds.
+    """
+
+    def __init__(self, retention: float = DEFAULT_JOB_RETENTION_S):
+        self.retention = retention
+        self._jobs: Dict[str, Job] = {}
+
+    def start(
+        self,
+        kind: str,
+        path: str,
+        operation: Callable[[Callable[[dict], None]], Awaitable[dict]],
+    ) -> Job:
+        """Start an operation in the background.
+
+        Args:
+            kind: Operation name
+            path: Local path on which the operation is executed
+            operation: Coroutine function called with the progress callback and
+                returning the operation response
+        Returns:
+            The started job
+        """
+        self._expire()
+        job = Job(kind, path)
+        self._jobs[job.id] = job
+        job._task = asyncio.ensure_future(self._run(job, operation))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        self._expire()
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a running job; its git process group is killed.
+
+        Returns:
+            The job or None if it is unknown
+        """
+        job = self.get(job_id)
+        if job is not None and not job.done and job._task is not None:
+            job._task.cancel()
+        return job
+
+    async def _run(self, job: Job, operation) -> None:
+        try:
+            result = await operation(job.add_event)
+        except asyncio.CancelledError:
+            job.finish(
+                JobStatus.CANCELLED,
+                {"code": -1, "message": "{} cancelled".format(job.kind)},
+            )
+        except Exception:
+            get_logger().warning("Job {} failed".format(job.kind), exc_info=True)
+            job.finish(
+                JobStatus.FAILED, {"code": -1, "message": traceback.format_exc()}
+            )
+        else:
+            job.finish(
+                JobStatus.SUCCEEDED if result["code"] == 0 else JobStatus.FAILED,
+                result,
+            )
+
+    def _expire(self) -> None:
+        limit = time.time() - self.retention
+        for job_id in [
+            job.id
+            for job in self._jobs.values()
+            if job.finished is not None and job.finished < limit
+        ]:
+            del self._jobs[job_id]
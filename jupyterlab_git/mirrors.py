@@ -0,0 +1,221 @@
+"""
+Module sharing the objects of repeatedly cloned repositories through local mirrors
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import subprocess
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from .log import get_logger
+
+# Default disk quota in bytes of the mirrors directory
+DEFAULT_MIRROR_QUOTA = 10 * 1024**3
+# Default minimal delay in seconds between two refreshes of a mirror
+DEFAULT_MIRROR_REFRESH_INTERVAL_S = 600.0
+# References fetched by the mirrors in addition to the tags
+MIRROR_REFSPEC = "+refs/heads/*:refs/heads/*"
+
+
+def mirror_key(repo_url: str) -> str:
+    """Identifier of the mirror of a remote URL."""
+    url = unquote(repo_url).strip().rstrip("/")
+    if url.endswith(".git"):
+        url = url[: -len(".git")]
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+async def run_git(cmd: List[str], cwd: str) -> Tuple[int, str]:
+    """Run a git command maintaining the mirrors.
+
+    The mirrors are only used by the clones as references, so their
+    maintenance does not take the lock of the git commands run on the
+    repositories. Prompts are disabled; the process group is terminated
+    if the calling task is cancelled.
+
+    Returns:
+        (return code, standard error)
+    """
+    from .git import kill_process_group
+
+    env = os.environ.copy()
+    env["GIT_TERMINAL_PROMPT"] = "0"
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+    try:
+        _, error = await process.communicate()
+    except asyncio.CancelledError:
+        kill_process_group(process.pid)
+        await process.wait()
+        raise
+    return process.returncode, error.decode("utf-8", errors="replace")
+
+
+def directory_size(path: str) -> int:
+    """Size in bytes of the files in a directory tree."""
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+class MirrorCache:
+    """Bare mirrors of remote repositories used as clone references.
+
+    A clone of a remote with a mirror borrows its objects through
+    `git clone --reference-if-able` and only downloads the missing ones. The
+    first clone of a remote creates its mirror in the background and does not
+    wait for it; the mirrors are then refreshed in the background at most every
+    ``refresh_interval`` seconds when used. Mirrors only fetch the remote
+    branches and tags, not the other references like the pull requests ones.
+
+    Only remotes cloned without credentials are mirrored. When the mirrors
+    take more than ``quota`` bytes, the least recently used ones are deleted.
+    Clones using a mirror should be dissociated from it to survive its eviction.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        quota: int = DEFAULT_MIRROR_QUOTA,
+        refresh_interval: float = DEFAULT_MIRROR_REFRESH_INTERVAL_S,
+    ):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.quota = quota
+        self.refresh_interval = refresh_interval
+        # Last refresh time per mirror key
+        self._refreshed: Dict[str, float] = {}
+        # Creation or refresh running per mirror key
+        self._tasks: Dict[str, asyncio.Future] = {}
+
+    def path(self, repo_url: str) -> str:
+        """Mirror directory of a remote URL."""
+        return os.path.join(self.root, mirror_key(repo_url) + ".git")
+
+    async def reference(
+        self, repo_url: str, auth: Optional[dict] = None
+    ) -> Optional[str]:
+        """Get the mirror to use as reference to clone a remote.
+
+        A missing mirror is created and an outdated one is refreshed in the
+        background.
+
+        Args:
+            repo_url: Remote URL
+            auth: Clone credentials; the remotes requiring some are not mirrored
+        Returns:
+            The mirror directory or None if the remote is not mirrored yet
+        """
+        key = mirror_key(repo_url)
+        mirror = self.path(repo_url)
+        if os.path.isdir(mirror):
+            # The directory modification time orders the eviction
+            try:
+                os.utime(mirror)
+            except OSError:
+                pass
+            refreshed = self._refreshed.get(key)
+            if (
+                refreshed is None
+                or time.monotonic() >= refreshed + self.refresh_interval
+            ):
+                self._schedule(key, self._refresh(key, mirror))
+            return mirror
+
+        if not auth and urlsplit(unquote(repo_url)).password is None:
+            self._schedule(key, self._create(key, repo_url, mirror))
+        return None
+
+    async def wait(self) -> None:
+        """Wait for the running mirror creations and refreshes."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def _schedule(self, key: str, operation) -> asyncio.Future:
+        """Run the operation on a mirror unless another one is running; return the running one."""
+        if key in self._tasks:
+            operation.close()
+            return self._tasks[key]
+        task = self._tasks[key] = asyncio.ensure_future(operation)
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return task
+
+    async def _create(self, key: str, repo_url: str, mirror: str) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        # Clone next to the mirror and move it once complete
+        temporary = "{}.{}.tmp".format(mirror, uuid.uuid4().hex)
+        code, error = await run_git(
+            ["git", "clone", "--bare", "--quiet", unquote(repo_url), temporary],
+            cwd=self.root,
+        )
+        if code == 0:
+            # Bare clones do not record the refspec used by the refreshes
+            code, error = await run_git(
+                ["git", "config", "remote.origin.fetch", MIRROR_REFSPEC],
+                cwd=temporary,
+            )
+        if code == 0:
+            try:
+                os.rename(temporary, mirror)
+                self._refreshed[key] = time.monotonic()
+            except OSError:
+                # Created concurrently by another server
+                pass
+        else:
+            get_logger().warning(
+                "Fail to mirror {}: {}".format(repo_url, error.strip())
+            )
+        shutil.rmtree(temporary, ignore_errors=True)
+
+        await asyncio.get_running_loop().run_in_executor(None, self._evict, mirror)
+
+    async def _refresh(self, key: str, mirror: str) -> None:
+        code, error = await run_git(
+            ["git", "fetch", "--prune", "--tags", "--quiet", "origin"], cwd=mirror
+        )
+        # Do not retry failing refreshes before the next interval either
+        self._refreshed[key] = time.monotonic()
+        if code != 0:
+            get_logger().warning(
+                "Fail to refresh mirror {}: {}".format(mirror, error.strip())
+            )
+
+        await asyncio.get_running_loop().run_in_executor(None, self._evict, mirror)
+
+    def _evict(self, keep: str) -> None:
+        """Delete the least recently used mirrors exceeding the quota, except keep."""
+        mirrors = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not name.endswith(".git") or not os.path.isdir(path):
+                continue
+            try:
+                used = os.stat(path).st_mtime
+            except OSError:
+                continue
+            mirrors.append((used, path, directory_size(path)))
+
+        total = sum(size for _, _, size in mirrors)
+        for _, path, size in sorted(mirrors):
+            if total <= self.quota:
+                break
+            if path == keep:
+                continue
+            get_logger().info("Evict mirror {}".format(path))
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -0,0 +1,300 @@
+"""
+Module preparing the notebooks compared by the notebook diff
+"""
+
+import copy
+import difflib
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import nbformat
+from nbdime.diffing.notebooks import diff, notebook_config
+
+# Maximal number of notebooks kept for the cell diffs
+MAX_CACHED_NOTEBOOKS = 16
+# Maximal number of notebook diffs kept per pair of blob hashes
+MAX_CACHED_NOTEBOOK_DIFFS = 64
+# Maximal total size in bytes of the kept notebook diffs, measured as JSON
+MAX_CACHED_NOTEBOOK_DIFFS_SIZE = 64 * 1024 * 1024
+# Maximal number of notebook diffs of a commit computed concurrently
+MAX_NOTEBOOK_DIFF_WORKERS = 4
+# Minimal similarity of the sources of a modified cell
+CELL_SIMILARITY = 0.6
+# Maximal number of cell comparisons to pair the modified cells of a changed block
+MAX_CELL_COMPARISONS = 10000
+# Parts of a cell compared by the cells summary
+CELL_PARTS = ("source", "outputs", "metadata", "execution_count")
+# Notebook metadata kept when the metadata are ignored; they tell the language
+NOTEBOOK_METADATA_KEPT = ("kernelspec", "language_info")
+
+
+def content_hash(value: Any) -> str:
+    """Hash of a JSON value; equal values have the same hash."""
+    serialized = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+
+def blob_hash(content: str) -> str:
+    """Git blob hash (SHA-1) of a text content."""
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def strip_notebook(
+    notebook: dict,
+    outputs: bool = False,
+    metadata: bool = False,
+    execution_count: bool = False,
+) -> Dict[str, Any]:
+    """Remove the parts of a notebook ignored by a diff.
+
+    The notebook is modified in place.
+
+    Args:
+        notebook: Notebook
+        outputs: Whether to remove the outputs of the code cells
+        metadata: Whether to remove the notebook and the cells metadata; the
+            notebook kernelspec and language_info are kept
+        execution_count: Whether to remove the execution counts of the code cells and their results
+    Returns:
+        Hash of the removed outputs and metadata per cell index and of the removed
+        notebook metadata; e.g.
+        {"outputs": {0: "<hash>"}, "metadata": {0: "<hash>", 2: "<hash>"}, "notebook_metadata": "<hash>"}
+        Cells without outputs or metadata are not listed, nor is the notebook
+        metadata if nothing is removed.
+    """
+    omitted = {}
+    if outputs:
+        omitted["outputs"] = {}
+    if metadata:
+        omitted["metadata"] = {}
+        removed = {
+            key: value
+            for key, value in notebook.get("metadata", {}).items()
+            if key not in NOTEBOOK_METADATA_KEPT
+        }
+        if removed:
+            omitted["notebook_metadata"] = content_hash(removed)
+        notebook["metadata"] = {
+            key: value
+            for key, value in notebook.get("metadata", {}).items()
+            if key in NOTEBOOK_METADATA_KEPT
+        }
+
+    for index, cell in enumerate(notebook.get("cells", [])):
+        if cell.get("cell_type") == "code":
+            if execution_count:
+                cell["execution_count"] = None
+                for output in cell.get("outputs", []):
+                    if "execution_count" in output:
+                        output["execution_count"] = None
+            if outputs:
+                if cell.get("outputs"):
+                    omitted["outputs"][index] = content_hash(cell["outputs"])
+                cell["outputs"] = []
+        if metadata:
+            if cell.get("metadata"):
+                omitted["metadata"][index] = content_hash(cell["metadata"])
+            cell["metadata"] = {}
+
+    return omitted
+
+
+def remove_cell_ids(notebook: dict) -> dict:
+    """Remove the cell ids of a notebook in place; they are random for new cells."""
+    for cell in notebook.get("cells", []):
+        cell.pop("id", None)
+    return notebook
+
+
+def read_notebook(content: Union[str, dict, None]) -> dict:
+    """Read a notebook in the format version 4 without validating it.
+
+    The content may be the notebook JSON or, from a contents model, its dict;
+    an empty content is read as an empty notebook.
+    """
+    if not content:
+        return nbformat.v4.new_notebook()
+    if isinstance(content, str):
+        content = json.loads(content)
+    version = content.get("nbformat", nbformat.current_nbformat)
+    notebook = nbformat.versions[version].nbjson.JSONReader().to_notebook(content)
+    if version != 4:
+        notebook = nbformat.convert(notebook, 4)
+    return notebook
+
+
+def cell_digest(cell: dict) -> Dict[str, Optional[str]]:
+    """Hash of the parts of a cell; hashes of equal parts are equal.
+
+    The source is kept as "text" to compare the similarity of modified cells.
+    """
+    return {
+        "cell_type": cell.get("cell_type"),
+        "id": cell.get("id"),
+        "text": cell.get("source", ""),
+        "source": content_hash(cell.get("source", "")),
+        "outputs": content_hash(cell.get("outputs", [])),
+        "metadata": content_hash(cell.get("metadata", {})),
+        "execution_count": cell.get("execution_count"),
+    }
+
+
+def align_cells(
+    previous: List[dict], current: List[dict]
+) -> List[Tuple[Optional[int], Optional[int]]]:
+    """Align the cells of two notebooks from their digests.
+
+    If all cells have an id and some ids are shared, the cells are aligned by id.
+    Otherwise they are aligned by their type and source; the unmatched cells
+    between two matched cells are paired as modified if they have the same type
+    and similar sources.
+
+    Args:
+        previous: Digests of the previous cells
+        current: Digests of the current cells
+    Returns:
+        Pairs of previous and current cell indices in the notebooks order;
+        the index is None for added or removed cells.
+    """
+    by_id = all(d["id"] for d in previous + current) and not {
+        d["id"] for d in previous
+    }.isdisjoint(d["id"] for d in current)
+    if by_id:
+        old_keys = [d["id"] for d in previous]
+        new_keys = [d["id"] for d in current]
+    else:
+        old_keys = [(d["cell_type"], d["source"]) for d in previous]
+        new_keys = [(d["cell_type"], d["source"]) for d in current]
+
+    pairs = []
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            pairs.extend(zip(range(i1, i2), range(j1, j2)))
+            continue
+        i, j = i1, j1
+        if not by_id and (i2 - i1) * (j2 - j1) <= MAX_CELL_COMPARISONS:
+            # Pair the cells whose source changed
+            while i < i2 and j < j2:
+                match = next(
+                    (k for k in range(j, j2) if _similar(previous[i], current[k])),
+                    None,
+                )
+                if match is None:
+                    pairs.append((i, None))
+                else:
+                    pairs.extend((None, k) for k in range(j, match))
+                    pairs.append((i, match))
+                    j = match + 1
+                i += 1
+        pairs.extend((index, None) for index in range(i, i2))
+        pairs.extend((None, index) for index in range(j, j2))
+    return pairs
+
+
+def _similar(old: dict, new: dict) -> bool:
+    return (
+        old["cell_type"] == new["cell_type"]
+        and difflib.SequenceMatcher(None, old["text"], new["text"]).quick_ratio()
+        >= CELL_SIMILARITY
+    )
+
+
+def cells_summary(previous: dict, current: dict) -> dict:
+    """Summarize the cell changes between two notebooks without diffing them.
+
+    Args:
+        previous: Previous notebook
+        current: Current notebook
+    Returns:
+        {
+            "cells": [
+                {
+                    "status": "unchanged" | "modified" | "added" | "removed",
+                    "previous": int | None,  # Cell index in the previous notebook
+                    "current": int | None,  # Cell index in the current notebook
+                    "cell_type": str,
+                    "changes": List[str]  # Changed parts of a modified cell among CELL_PARTS
+                }
+            ],
+            "metadata": bool  # Whether the notebook metadata changed
+        }
+    """
+    old = [cell_digest(cell) for cell in previous.get("cells", [])]
+    new = [cell_digest(cell) for cell in current.get("cells", [])]
+    cells = []
+    for i, j in align_cells(old, new):
+        if i is None or j is None:
+            cells.append(
+                {
+                    "status": "added" if i is None else "removed",
+                    "previous": i,
+                    "current": j,
+                    "cell_type": (old[i] if j is None else new[j])["cell_type"],
+                    "changes": [],
+                }
+            )
+            continue
+        changes = [part for part in CELL_PARTS if old[i][part] != new[j][part]]
+        if old[i]["cell_type"] != new[j]["cell_type"]:
+            changes.insert(0, "cell_type")
+        cells.append(
+            {
+                "status": "modified" if changes else "unchanged",
+                "previous": i,
+                "current": j,
+                "cell_type": new[j]["cell_type"],
+                "changes": changes,
+            }
+        )
+    return {
+        "cells": cells,
+        "metadata": content_hash(previous.get("metadata", {}))
+        != content_hash(current.get("metadata", {})),
+    }
+
+
+def cell_diffs(
+    previous: dict,
+    current: dict,
+    pairs: List[Tuple[Optional[int], Optional[int]]],
+    **ignored: bool,
+) -> List[dict]:
+    """Diff cells of two notebooks like nbdime diffs them in a notebook diff.
+
+    The cell ids are not compared.
+
+    Args:
+        previous: Previous notebook
+        current: Current notebook
+        pairs: Previous and current cell indices; None for an added or removed cell
+        ignored: Parts of the cells ignored as for strip_notebook
+    Returns:
+        [
+            {
+                "previous": int | None,
+                "current": int | None,
+                "base": dict | None,  # Previous cell
+                "diff": List | None,  # Diff from the previous to the current cell
+                "remote"?: dict  # Current cell; only for an added cell
+            }
+        ]
+    """
+    result = []
+    for i, j in pairs:
+        base = None if i is None else previous["cells"][i]
+        remote = None if j is None else current["cells"][j]
+        base, remote = copy.deepcopy(base), copy.deepcopy(remote)
+        cells = {"cells": [cell for cell in (base, remote) if cell is not None]}
+        remove_cell_ids(cells)
+        if any(ignored.values()):
+            strip_notebook(cells, **ignored)
+        entry = {"previous": i, "current": j, "base": base, "diff": None}
+        if base is not None and remote is not None:
+            entry["diff"] = diff(base, remote, path="/cells/*", config=notebook_config)
+        elif remote is not None:
+            entry["remote"] = remote
+        result.append(entry)
+    return result
@@ -0,0 +1,170 @@
+"""
+Module sharing the remote fetches of a repository between all clients
+"""
+
+import asyncio
+import random
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from .git import Git
+
+# Default minimal delay in seconds between two fetches of the same repository
+DEFAULT_FETCH_INTERVAL_S = 30.0
+# Default maximal delay in seconds between two fetches after failures
+DEFAULT_FETCH_MAX_BACKOFF_S = 600.0
+# Relative random extension of the delay between fetches
+FETCH_JITTER = 0.1
+# Default remote branches probed with `git ls-remote` before fetching
+DEFAULT_FETCH_PROBE = "heads"
+# Default scope of the scheduled fetches; see Git.fetch
+DEFAULT_FETCH_SCOPE = {"upstream_only": True, "tags": False}
+
+
+class _RepositoryFetch:
+    """Fetch state of a repository."""
+
+    def __init__(self):
+        self.in_flight: Optional[asyncio.Future] = None
+        self.result: Optional[dict] = None
+        self.due = 0.0
+        self.failures = 0
+        # Remote-tracking references and their counter of changes
+        self.remote_refs: Optional[Dict[str, str]] = None
+        self.generation = 0
+
+
+class FetchScheduler:
+    """Deduplicate and space out the fetches of a repository.
+
+    A fetch requested while another one is running for the same repository
+    shares its result, unless it is forced or has credentials; it then runs
+    after it. Until the next fetch is due, the last result is
+    returned without contacting the remotes. The delay between fetches is
+    ``interval`` seconds extended by a random jitter and doubled after each
+    consecutive failure up to ``max_backoff`` seconds.
+
+    Every time a fetch changes the remote-tracking references, the repository
+    generation is incremented so that clients know when to refresh.
+
+    If ``probe`` is "heads" (all remote branches) or "upstream" (the current
+    branch upstream only), the remote branches tips are first compared with
+    `git ls-remote` and the fetch only runs if they differ. The probes are
+    spaced out like the fetches, as both contact the remotes.
+
+    ``scope`` holds the keyword arguments limiting what Git.fetch retrieves
+    for the scheduled fetches; if it is limited to the upstream, so is the
+    probe. Forced fetches and fetches with credentials, requested by the
+    user, fetch all the remotes.
+    """
+
+    def __init__(
+        self,
+        git: "Git",
+        interval: float = DEFAULT_FETCH_INTERVAL_S,
+        max_backoff: float = DEFAULT_FETCH_MAX_BACKOFF_S,
+        probe: str = DEFAULT_FETCH_PROBE,
+        scope: Optional[dict] = None,
+    ):
+        self._git = git
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.probe = probe
+        self.scope = DEFAULT_FETCH_SCOPE if scope is None else scope
+        self._repositories: Dict[str, _RepositoryFetch] = {}
+
+    async def fetch(
+        self,
+        path: str,
+        auth: Optional[dict] = None,
+        force: bool = False,
+        generation: Optional[int] = None,
+    ) -> dict:
+        """Fetch the remotes of the repository containing path if it is due.
+
+        Args:
+            path: Repository path
+            auth: Credentials; a fetch with credentials always runs its own git fetch
+            force: Whether to fetch even if the next fetch is not yet due
+            generation: Remote references generation known by the caller
+        Returns:
+            The fetch response with the extra fields:
+            - fetched: whether this call waited for a fetch
+            - generation: the current remote references generation
+            - changed: whether the generation differs from the caller one or,
+              if unknown, whether the fetch changed the remote references
+            - behind_remote: if the remotes were probed, whether the current
+              branch upstream was outdated
+        """
+        info = await self._git.repository_info(path)
+        key = info.get("common_dir") or path
+        state = self._repositories.setdefault(key, _RepositoryFetch())
+
+        previous = state.generation
+        # Forced fetches retrieve more than the scheduled ones they cannot share
+        if state.in_flight is not None and not (auth or force):
+            fetched = True
+            result = await asyncio.shield(state.in_flight)
+        elif auth or force or state.result is None or time.monotonic() >= state.due:
+            fetched = True
+            while state.in_flight is not None:
+                await asyncio.shield(state.in_flight)
+                previous = state.generation
+            in_flight = state.in_flight = asyncio.ensure_future(
+                self._fetch(path, auth, force, state)
+            )
+            try:
+                result = await asyncio.shield(in_flight)
+            finally:
+                if state.in_flight is in_flight:
+                    state.in_flight = None
+        else:
+            fetched = False
+            result = state.result
+
+        if generation is None:
+            changed = fetched and state.generation != previous
+        else:
+            changed = state.generation != generation
+        return {
+            **result,
+            "fetched": fetched,
+            "generation": state.generation,
+            "changed": changed,
+        }
+
+    async def _fetch(
+        self, path: str, auth: Optional[dict], force: bool, state: _RepositoryFetch
+    ):
+        probing = self.probe != "none" and not (auth or force)
+        probe = None
+        if probing:
+            probe = await self._git.remote_probe(
+                path,
+                upstream_only=self.probe == "upstream"
+                or self.scope.get("upstream_only", False),
+            )
+
+        if probe is not None and probe["code"] == 0 and not probe["changes"]:
+            result = {"code": 0}
+        else:
+            if state.remote_refs is None:
+                state.remote_refs = await self._git.remote_tracking_refs(path)
+            # Fetch also if the probe failed to report the same error
+            scope = {} if auth or force else self.scope
+            result = await self._git.fetch(path, auth, **scope)
+            if result["code"] == 0:
+                remote_refs = await self._git.remote_tracking_refs(path)
+                if remote_refs != state.remote_refs:
+                    state.remote_refs = remote_refs
+                    state.generation += 1
+
+        if probe is not None and probe["code"] == 0:
+            result = {**result, "behind_remote": probe["behind_remote"]}
+        state.failures = 0 if result["code"] == 0 else state.failures + 1
+
+        delay = min(self.interval * 2**state.failures, self.max_backoff)
+        state.due = time.monotonic() + delay * random.uniform(1, 1 + FETCH_JITTER)
+        state.result = result
+        return result
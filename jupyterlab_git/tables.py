@@ -0,0 +1,287 @@
+"""
+Module comparing the rows of two versions of a CSV or TSV table
+"""
+
+import contextlib
+import csv
+import heapq
+import os
+import tempfile
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+
+# Default maximal number of row changes detailed in a table diff
+DEFAULT_TABLE_CHANGES = 200
+# Maximal number of row changes detailed in a table diff
+MAX_TABLE_CHANGES = 10000
+# Size in bytes of the table data compared in memory at once
+TABLE_PARTITION_SIZE = 4 * 1024**2
+# Maximal number of partitions the tables are split in
+MAX_TABLE_PARTITIONS = 256
+# Size in bytes of the rows buffered before being appended to the partitions
+TABLE_PARTITION_BUFFER_SIZE = 1024**2
+# Table file extensions and their delimiter
+TABLE_DELIMITERS = {".csv": ",", ".tsv": "\t", ".tab": "\t"}
+
+# Index of a row (starting at 1) and its values
+Row = Tuple[int, List[str]]
+
+
+def table_delimiter(filename: str) -> Optional[str]:
+    """Get the delimiter of a table file from its extension or None if it is not a table."""
+    return TABLE_DELIMITERS.get(os.path.splitext(filename)[1].lower())
+
+
+class _Partitions:
+    """Rows of a table split by hash of their key in temporary files.
+
+    The rows are buffered and appended to the files by batches, so that a
+    single file is open at once whatever the number of partitions.
+    """
+
+    def __init__(self, directory: Optional[str], name: str, count: int):
+        self._paths = (
+            []
+            if directory is None
+            else [
+                os.path.join(directory, "{}-{}.csv".format(name, index))
+                for index in range(count)
+            ]
+        )
+        self._rows: List[List[Row]] = [[] for _ in range(count)]
+        self._buffered = 0
+
+    def add(self, partition: int, index: int, row: List[str]) -> None:
+        self._rows[partition].append((index, row))
+        if self._paths:
+            self._buffered += sum(len(value) + 1 for value in row)
+            if self._buffered >= TABLE_PARTITION_BUFFER_SIZE:
+                self.flush()
+
+    def flush(self) -> None:
+        """Append the buffered rows to the partitions files."""
+        for path, rows in zip(self._paths, self._rows):
+            if rows:
+                with open(path, "a", newline="", encoding="utf-8") as f:
+                    csv.writer(f).writerows([index, *row] for index, row in rows)
+                rows.clear()
+        self._buffered = 0
+
+    def rows(self, partition: int) -> Iterable[Row]:
+        if not self._paths:
+            return self._rows[partition]
+        self.flush()
+        return _read_partition(self._paths[partition])
+
+
+def _read_partition(path: str) -> Iterable[Row]:
+    if not os.path.exists(path):
+        return
+    with open(path, newline="", encoding="utf-8") as f:
+        for index, *row in csv.reader(f):
+            yield int(index), row
+
+
+def _read(stream: TextIO, delimiter: str) -> Tuple[List[str], Iterable[List[str]]]:
+    reader = csv.reader(stream, delimiter=delimiter)
+    return next(reader, []), reader
+
+
+def table_diff(
+    open_previous: Callable[[], Optional[TextIO]],
+    open_current: Callable[[], Optional[TextIO]],
+    delimiter: str = ",",
+    key: Optional[List[str]] = None,
+    max_changes: int = DEFAULT_TABLE_CHANGES,
+    size: int = 0,
+) -> dict:
+    """Compare the rows of two versions of a table whose first row is the header.
+
+    The rows are matched by the values of the key columns; a row whose key is
+    matched but whose values differ is changed. Without key, the rows are
+    matched by their values; a row is then either added or removed.
+
+    Both tables are read as streams. If they are bigger than ``TABLE_PARTITION_SIZE``,
+    their rows are first split in temporary files by hash of their key, so
+    that only a partition of the rows is held in memory at once.
+
+    Args:
+        open_previous: Open the previous table; returns None if it does not exist
+        open_current: Open the current table; returns None if it does not exist
+        delimiter: Field delimiter
+        key: Names of the columns identifying a row
+        max_changes: Maximal number of row changes detailed; the first rows are kept
+        size: Total size in bytes of both tables; to choose the number of partitions
+    Returns:
+        {
+            "columns": {"added": List[str], "removed": List[str], "common": List[str]},
+            "rows": {"added": int, "removed": int, "changed": int, "unchanged": int},
+            "cells": {<column>: int},  # Number of changed cells per common column
+            "changes": [
+                {
+                    "type": "added" | "removed" | "changed",
+                    "previous_row": int | None,  # Row index, starting at 1 after the header
+                    "current_row": int | None,
+                    "values": List[str],  # Row values; of the current row if it exists
+                    "cells": {<column>: [str, str]}  # Changed cells; only for changed rows
+                }
+            ],  # Sorted by row index
+            "truncated": bool  # Whether there are more changes than max_changes
+        }
+    Raises:
+        ValueError: if a key column is missing in a table
+    """
+    previous = open_previous()
+    current = open_current()
+    try:
+        old_header, old_rows = _read(previous, delimiter) if previous else ([], [])
+        new_header, new_rows = _read(current, delimiter) if current else ([], [])
+        for name, header, exists in (
+            ("previous", old_header, previous),
+            ("current", new_header, current),
+        ):
+            missing = [column for column in key or [] if column not in header]
+            if exists and missing:
+                raise ValueError(
+                    "Key columns {} are missing in the {} table.".format(missing, name)
+                )
+
+        common = [column for column in new_header if column in old_header]
+        old_positions = [old_header.index(column) for column in common]
+        new_positions = [new_header.index(column) for column in common]
+        # A missing table has no rows to match
+        old_key = [old_header.index(c) for c in key or [] if c in old_header]
+        new_key = [new_header.index(c) for c in key or [] if c in new_header]
+
+        count = min(max(1, -(-size // TABLE_PARTITION_SIZE)), MAX_TABLE_PARTITIONS)
+        # Small tables are compared in memory
+        spill = (
+            tempfile.TemporaryDirectory(prefix="jupyterlab-git-")
+            if count > 1
+            else contextlib.nullcontext()
+        )
+        with spill as directory:
+            partitions = []
+            for name, rows, positions, key_positions in (
+                ("previous", old_rows, old_positions, old_key),
+                ("current", new_rows, new_positions, new_key),
+            ):
+                store = _Partitions(directory, name, count)
+                partitions.append(store)
+                for index, row in enumerate(rows, start=1):
+                    row_key = tuple(_value(row, i) for i in key_positions or positions)
+                    store.add(hash(row_key) % count, index, row)
+
+            return _compare(
+                partitions,
+                count,
+                (old_positions, new_positions),
+                (old_key, new_key),
+                common,
+                max_changes,
+                {
+                    "added": [c for c in new_header if c not in old_header],
+                    "removed": [c for c in old_header if c not in new_header],
+                    "common": common,
+                },
+            )
+    finally:
+        for stream in (previous, current):
+            if stream is not None:
+                stream.close()
+
+
+def _value(row: List[str], position: int) -> str:
+    return row[position] if position < len(row) else ""
+
+
+def _compare(
+    partitions: List[_Partitions],
+    count: int,
+    positions: Tuple[List[int], List[int]],
+    keys: Tuple[List[int], List[int]],
+    common: List[str],
+    max_changes: int,
+    columns: dict,
+) -> dict:
+    old_store, new_store = partitions
+    old_positions, new_positions = positions
+    old_key, new_key = keys
+    stats = {"added": 0, "removed": 0, "changed": 0, "unchanged": 0}
+    cells = {column: 0 for column in common}
+    # Heap of the first changes by row index; sorted by the opposite index
+    changes = []
+    ordinal = 0
+
+    def record(change: dict) -> None:
+        nonlocal ordinal
+        stats[change["type"]] += 1
+        row = change["current_row"] or change["previous_row"]
+        ordinal += 1
+        entry = (-row, -ordinal, change)
+        if len(changes) < max_changes:
+            heapq.heappush(changes, entry)
+        elif max_changes > 0 and entry > changes[0]:
+            heapq.heapreplace(changes, entry)
+
+    for partition in range(count):
+        # Previous rows of the partition per key
+        pending: Dict[tuple, List[Row]] = defaultdict(list)
+        for index, row in old_store.rows(partition):
+            row_key = tuple(_value(row, i) for i in old_key or old_positions)
+            pending[row_key].append((index, row))
+
+        for index, row in new_store.rows(partition):
+            row_key = tuple(_value(row, i) for i in new_key or new_positions)
+            matches = pending.get(row_key)
+            if not matches:
+                record(
+                    {
+                        "type": "added",
+                        "previous_row": None,
+                        "current_row": index,
+                        "values": row,
+                    }
+                )
+                continue
+            old_index, old_row = matches.pop(0)
+            if not matches:
+                del pending[row_key]
+            changed = {}
+            for column, i, j in zip(common, old_positions, new_positions):
+                old_value, new_value = _value(old_row, i), _value(row, j)
+                if old_value != new_value:
+                    changed[column] = [old_value, new_value]
+                    cells[column] += 1
+            if changed:
+                record(
+                    {
+                        "type": "changed",
+                        "previous_row": old_index,
+                        "current_row": index,
+                        "values": row,
+                        "cells": changed,
+                    }
+                )
+            else:
+                stats["unchanged"] += 1
+
+        for matches in pending.values():
+            for old_index, old_row in matches:
+                record(
+                    {
+                        "type": "removed",
+                        "previous_row": old_index,
+                        "current_row": None,
+                        "values": old_row,
+                    }
+                )
+
+    total = stats["added"] + stats["removed"] + stats["changed"]
+    return {
+        "columns": columns,
+        "rows": stats,
+        "cells": cells,
+        "changes": [change for _, _, change in sorted(changes, reverse=True)],
+        "truncated": total > len(changes),
+    }
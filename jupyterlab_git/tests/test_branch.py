@@ -1,9 +1,14 @@
+import asyncio
+import os
+import subprocess
+import time
 from pathlib import Path
 from unittest.mock import call, patch
 
 import pytest
+import tornado
 
-from jupyterlab_git.git import Git
+from jupyterlab_git.git import MAX_AHEAD_BEHIND_WORKERS, Git
 
 from .testutils import maybe_future
 
@@ -696,21 +701,18 @@ async def test_no_tags():
 async def test_branch_success():
     with patch("jupyterlab_git.git.execute") as mock_execute:
         # Given
-        process_output_heads = [
-            "feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/feature-foo\t*",
-            "main\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/main\t ",
-            "feature-bar\t01234567899999abcdefghijklmnopqrstuvwxyz\t\t ",
-        ]
-        process_output_remotes = [
-            "origin/feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123",
-            "origin/main\tabcdefghijklmnopqrstuvwxyz01234567890123",
+        process_output_refs = [
+            "refs/heads/feature-foo\tfeature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/feature-foo\t*",
+            "refs/heads/main\tmain\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/main\t ",
+            "refs/heads/feature-bar\tfeature-bar\t01234567899999abcdefghijklmnopqrstuvwxyz\t\t ",
+            "refs/remotes/origin/feature-foo\torigin/feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123\t\t ",
+            "refs/remotes/origin/main\torigin/main\tabcdefghijklmnopqrstuvwxyz01234567890123\t\t ",
+            "refs/tags/v1.0.0\tv1.0.0\tabcdefghijklmnopqrstuvwxyz01234567890123\t\t ",
         ]
 
         mock_execute.side_effect = [
-            # Response for get all refs/heads
-            maybe_future((0, "\n".join(process_output_heads), "")),
-            # Response for get all refs/remotes
-            maybe_future((0, "\n".join(process_output_remotes), "")),
+            # Response for get all refs
+            maybe_future((0, "\n".join(process_output_refs), "")),
         ]
 
         expected_response = {
@@ -773,28 +775,15 @@ async def test_branch_success():
         # Then
         mock_execute.assert_has_calls(
             [
-                # call to get refs/heads
+                # call to get all refs
                 call(
                     [
                         "git",
                         "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
+                        "--format=%(refname)%09%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
                         "refs/heads/",
-                    ],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    timeout=20,
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
-                # call to get refs/remotes
-                call(
-                    [
-                        "git",
-                        "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)",
                         "refs/remotes/",
+                        "refs/tags/",
                     ],
                     cwd=str(Path("/bin") / "test_curr_path"),
                     timeout=20,
@@ -817,8 +806,10 @@ async def test_branch_failure():
         expected_cmd = [
             "git",
             "for-each-ref",
-            "--format=%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
+            "--format=%(refname)%09%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
             "refs/heads/",
+            "refs/remotes/",
+            "refs/tags/",
         ]
         mock_execute.return_value = maybe_future(
             (
@@ -854,11 +845,9 @@ async def test_branch_failure():
 async def test_branch_success_detached_head():
     with patch("jupyterlab_git.git.execute") as mock_execute:
         # Given
-        process_output_heads = [
-            "main\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/main\t "
-        ]
-        process_output_remotes = [
-            "origin/feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123"
+        process_output_refs = [
+            "refs/heads/main\tmain\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/main\t ",
+            "refs/remotes/origin/feature-foo\torigin/feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123\t\t ",
         ]
         detached_head_output = [
             "* (HEAD detached at origin/feature-foo)",
@@ -867,14 +856,12 @@ async def test_branch_success_detached_head():
         ]
 
         mock_execute.side_effect = [
-            # Response for get all refs/heads
-            maybe_future((0, "\n".join(process_output_heads), "")),
+            # Response for get all refs
+            maybe_future((0, "\n".join(process_output_refs), "")),
             # Response for get current branch
             maybe_future((128, "", "fatal: ref HEAD is not a symbolic ref")),
             # Response for get current branch detached
             maybe_future((0, "\n".join(detached_head_output), "")),
-            # Response for get all refs/remotes
-            maybe_future((0, "\n".join(process_output_remotes), "")),
         ]
 
         expected_response = {
@@ -921,13 +908,15 @@ async def test_branch_success_detached_head():
         # Then
         mock_execute.assert_has_calls(
             [
-                # call to get refs/heads
+                # call to get all refs
                 call(
                     [
                         "git",
                         "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
+                        "--format=%(refname)%09%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
                         "refs/heads/",
+                        "refs/remotes/",
+                        "refs/tags/",
                     ],
                     cwd=str(Path("/bin") / "test_curr_path"),
                     timeout=20,
@@ -956,21 +945,6 @@ async def test_branch_success_detached_head():
                     password=None,
                     is_binary=False,
                 ),
-                # call to get refs/remotes
-                call(
-                    [
-                        "git",
-                        "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)",
-                        "refs/remotes/",
-                    ],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    timeout=20,
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
             ],
             any_order=False,
         )
@@ -982,12 +956,10 @@ async def test_branch_success_detached_head():
 async def test_branch_success_rebasing():
     with patch("jupyterlab_git.git.execute") as mock_execute:
         # Given
-        process_output_heads = [
-            "main\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/main\t ",
-            "feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/feature-foo\t ",
-        ]
-        process_output_remotes = [
-            "origin/feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123"
+        process_output_refs = [
+            "refs/heads/main\tmain\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/main\t ",
+            "refs/heads/feature-foo\tfeature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123\torigin/feature-foo\t ",
+            "refs/remotes/origin/feature-foo\torigin/feature-foo\tabcdefghijklmnopqrstuvwxyz01234567890123\t\t ",
         ]
         detached_head_output = [
             "* (no branch, rebasing feature-foo)",
@@ -997,14 +969,12 @@ async def test_branch_success_rebasing():
         ]
 
         mock_execute.side_effect = [
-            # Response for get all refs/heads
-            maybe_future((0, "\n".join(process_output_heads), "")),
+            # Response for get all refs
+            maybe_future((0, "\n".join(process_output_refs), "")),
             # Response for get current branch
             maybe_future((128, "", "fatal: ref HEAD is not a symbolic ref")),
             # Response for get current branch detached
             maybe_future((0, "\n".join(detached_head_output), "")),
-            # Response for get all refs/remotes
-            maybe_future((0, "\n".join(process_output_remotes), "")),
         ]
 
         expected_response = {
@@ -1059,13 +1029,15 @@ async def test_branch_success_rebasing():
         # Then
         mock_execute.assert_has_calls(
             [
-                # call to get refs/heads
+                # call to get all refs
                 call(
                     [
                         "git",
                         "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
+                        "--format=%(refname)%09%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
                         "refs/heads/",
+                        "refs/remotes/",
+                        "refs/tags/",
                     ],
                     cwd=str(Path("/bin") / "test_curr_path"),
                     timeout=20,
@@ -1094,23 +1066,272 @@ async def test_branch_success_rebasing():
                     password=None,
                     is_binary=False,
                 ),
-                # call to get refs/remotes
-                call(
-                    [
-                        "git",
-                        "for-each-ref",
-                        "--format=%(refname:short)%09%(objectname)",
-                        "refs/remotes/",
-                    ],
-                    cwd=str(Path("/bin") / "test_curr_path"),
-                    timeout=20,
-                    env=None,
-                    username=None,
-                    password=None,
-                    is_binary=False,
-                ),
             ],
             any_order=False,
         )
 
         assert expected_response == actual_response
+
+
+def age_git_directory(repository: Path, seconds: float = 60) -> None:
+    """Move the timestamps of the git directory content in the past."""
+    past = time.time() - seconds
+    for root, dirs, files in os.walk(repository / ".git"):
+        for name in dirs + files:
+            os.utime(os.path.join(root, name), (past, past))
+        os.utime(root, (past, past))
+
+
+@pytest.mark.asyncio
+async def test_branch_and_tags_cached_by_ref_state(tmp_path):
+    # Given
+    repository = tmp_path / "repo"
+    repository.mkdir()
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "commit", "--allow-empty", "-m", "init"],
+        ["git", "tag", "v1.0.0"],
+    ):
+        subprocess.check_call(command, cwd=repository)
+    age_git_directory(repository)
+    git = Git()
+    branches = await git.branch(str(repository))
+
+    # When
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        cached_branches = await git.branch(str(repository))
+        tags = await git.tags(str(repository))
+
+        # Then
+        mock_execute.assert_not_called()
+    assert cached_branches == branches
+    assert branches["current_branch"]["name"] == "main"
+    assert [t["name"] for t in tags["tags"]] == ["v1.0.0"]
+
+    # When
+    subprocess.check_call(["git", "branch", "feature"], cwd=repository)
+    updated_branches = await git.branch(str(repository))
+
+    # Then
+    assert [b["name"] for b in updated_branches["branches"]] == ["feature", "main"]
+
+
+@pytest.mark.asyncio
+async def test_branch_ahead_behind(tmp_path):
+    # Given
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    repository = tmp_path / "repo"
+    for command, cwd in (
+        (["git", "init", "-b", "main"], origin),
+        (["git", "config", "user.name", "JupyterLab Git"], origin),
+        (["git", "config", "user.email", "jlab.git@py.test"], origin),
+        (["git", "commit", "--allow-empty", "-m", "first"], origin),
+        (["git", "clone", str(origin), str(repository)], tmp_path),
+        (["git", "config", "user.name", "JupyterLab Git"], repository),
+        (["git", "config", "user.email", "jlab.git@py.test"], repository),
+        (["git", "commit", "--allow-empty", "-m", "local"], repository),
+        (["git", "checkout", "-b", "feature"], repository),
+        (["git", "commit", "--allow-empty", "-m", "feature 1"], repository),
+        (["git", "commit", "--allow-empty", "-m", "feature 2"], repository),
+        (["git", "commit", "--allow-empty", "-m", "second"], origin),
+        (["git", "fetch"], repository),
+    ):
+        subprocess.check_call(command, cwd=cwd)
+
+    # When
+    result = await Git().branch(str(repository), ahead_behind=True, base="main")
+
+    # Then
+    assert result["code"] == 0
+    branches = {b["name"]: b for b in result["branches"]}
+    assert branches["main"]["ahead"] == 1
+    assert branches["main"]["behind"] == 1
+    assert branches["main"]["base_ahead"] == 0
+    assert branches["main"]["base_behind"] == 0
+    assert branches["feature"]["ahead"] is None
+    assert branches["feature"]["behind"] is None
+    assert branches["feature"]["base_ahead"] == 2
+    assert branches["feature"]["base_behind"] == 0
+    assert "ahead" not in branches["origin/main"]
+    assert result["current_branch"]["base_ahead"] == 2
+
+
+@pytest.mark.asyncio
+async def test_branch_ahead_behind_field():
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        # Given
+        mock_execute.side_effect = [
+            maybe_future((0, "{}\n".format("1" * 40), "")),
+            maybe_future((0, "git version 2.42.0", "")),
+            maybe_future(
+                (
+                    0,
+                    "\n".join(
+                        [
+                            "refs/heads/feature\tfeature\trefs/remotes/origin/feature\tahead 3, behind 1\t4 2",
+                            "refs/heads/old\told\trefs/remotes/origin/old\tgone\t0 7",
+                        ]
+                    ),
+                    "",
+                )
+            ),
+        ]
+
+        # When
+        actual_response = await Git().branch_ahead_behind("test_curr_path", "main")
+
+        # Then
+        mock_execute.assert_called_with(
+            [
+                "git",
+                "for-each-ref",
+                "--format=%(refname)%09%(refname:short)%09%(upstream)%09%(upstream:track,nobracket)%09%(ahead-behind:{})".format(
+                    "1" * 40
+                ),
+                "refs/heads/",
+            ],
+            cwd="test_curr_path",
+            timeout=20,
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
+        )
+        assert actual_response == {
+            "code": 0,
+            "branches": {
+                "feature": {
+                    "ahead": 3,
+                    "behind": 1,
+                    "base_ahead": 4,
+                    "base_behind": 2,
+                },
+                "old": {
+                    "ahead": None,
+                    "behind": None,
+                    "base_ahead": 0,
+                    "base_behind": 7,
+                },
+            },
+        }
+
+
+@pytest.mark.asyncio
+async def test_branch_ahead_behind_concurrent_rev_list():
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        # Given
+        running = 0
+        concurrency = []
+
+        async def execute(cmdline, **kwargs):
+            nonlocal running
+            if cmdline[1] == "rev-parse":
+                return 0, "{}\n".format("1" * 40), ""
+            if cmdline[1] == "--version":
+                return 0, "git version 2.40.0", ""
+            if cmdline[1] == "for-each-ref":
+                return (
+                    0,
+                    "\n".join("refs/heads/b{0}\tb{0}\t\t".format(i) for i in range(20)),
+                    "",
+                )
+            running += 1
+            concurrency.append(running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return 0, "1\t{}\n".format(cmdline[-1][-1]), ""
+
+        mock_execute.side_effect = execute
+
+        # When
+        actual_response = await Git().branch_ahead_behind("test_curr_path", "main")
+
+        # Then
+        assert 1 < max(concurrency) <= MAX_AHEAD_BEHIND_WORKERS
+        rev_list_calls = [
+            c for c in mock_execute.call_args_list if c.args[0][1] == "rev-list"
+        ]
+        assert len(rev_list_calls) == 20
+        assert all(c.kwargs["locked"] is False for c in rev_list_calls)
+        assert actual_response["branches"]["b13"] == {
+            "ahead": None,
+            "behind": None,
+            "base_ahead": 3,
+            "base_behind": 1,
+        }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("base", ["unknown", "--output=x", 42])
+async def test_branch_ahead_behind_invalid_base(tmp_path, base):
+    repository = tmp_path / "repo"
+    repository.mkdir()
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "commit", "--allow-empty", "-m", "init"],
+    ):
+        subprocess.check_call(command, cwd=repository)
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().branch_ahead_behind(str(repository), base)
+
+    assert error.value.status_code == 400
+    assert not (repository / "x").exists()
+
+
+@pytest.mark.asyncio
+async def test_branch_page(tmp_path):
+    # Given
+    repository = tmp_path / "repo"
+    repository.mkdir()
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "commit", "--allow-empty", "-m", "init"],
+        ["git", "branch", "feature/Alpha"],
+        ["git", "branch", "feature/beta"],
+        ["git", "branch", "team/x/feature-gamma"],
+        ["git", "branch", "fix"],
+    ):
+        subprocess.check_call(command, cwd=repository)
+
+    # When
+    first_page = await Git().branch(str(repository), pattern="FEATURE", limit=2)
+    second_page = await Git().branch(
+        str(repository), pattern="FEATURE", offset=2, limit=2
+    )
+
+    # Then
+    assert [b["name"] for b in first_page["branches"]] == [
+        "feature/Alpha",
+        "feature/beta",
+    ]
+    assert first_page["has_more"]
+    assert [b["name"] for b in second_page["branches"]] == ["team/x/feature-gamma"]
+    assert not second_page["has_more"]
+    assert second_page["current_branch"]["name"] == "main"
+    assert second_page["current_branch"]["is_current_branch"]
+
+
+@pytest.mark.asyncio
+async def test_branch_page_unknown_sort():
+    with pytest.raises(tornado.web.HTTPError):
+        await Git().branch("test_curr_path", sort="size")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "page",
+    [{"offset": "2"}, {"offset": -1}, {"limit": 0}, {"limit": 1.5}, {"limit": True}],
+)
+async def test_branch_page_invalid(page):
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().branch("test_curr_path", **page)
+
+    assert error.value.status_code == 400
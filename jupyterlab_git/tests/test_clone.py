@@ -1,8 +1,11 @@
 import os
+import subprocess
+import tarfile
 from pathlib import Path
 from unittest.mock import call, patch
 
 import pytest
+import tornado
 
 from jupyterlab_git import JupyterLabGit
 from jupyterlab_git.git import Git
@@ -32,44 +35,129 @@ async def test_git_clone_success():
                 username=None,
                 password=None,
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 0, "message": output} == actual_response
 
 
+def init_origin(path):
+    for folder in ("data", "src"):
+        (path / folder).mkdir(parents=True)
+        (path / folder / "file.txt").write_text(folder)
+    (path / "README.md").write_text("readme")
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "add", "."],
+        ["git", "commit", "-m", "init"],
+        ["git", "tag", "v1"],
+    ):
+        subprocess.check_call(command, cwd=path)
+    (path / "README.md").write_text("updated")
+    subprocess.check_call(["git", "commit", "-am", "update"], cwd=path)
+    return path
+
+
 @pytest.mark.asyncio
 async def test_git_download_success(tmp_path):
-    with patch("os.environ", {"TEST": "test"}):
-        with patch("jupyterlab_git.git.execute") as mock_execute:
-            # Given
-            output = "output"
-            git_folder = tmp_path / "dummy-repo" / ".git"
+    # Given
+    origin = init_origin(tmp_path / "origin.git")
+    target = tmp_path / "target"
+    target.mkdir()
+    (target / "unrelated").mkdir()
 
-            def create_fake_git_repo(*args, **kwargs):
-                git_folder.mkdir(parents=True)
-                return maybe_future((0, output, "error"))
+    # When
+    response = await Git().clone(str(target), origin.as_uri(), versioning=False)
 
-            mock_execute.side_effect = create_fake_git_repo
+    # Then
+    assert response == {"code": 0, "message": ""}
+    snapshot = target / "origin"
+    assert (snapshot / "README.md").read_text() == "updated"
+    assert (snapshot / "data" / "file.txt").exists()
+    # Check no repository has been created
+    assert not (snapshot / ".git").exists()
+    assert sorted(os.listdir(target)) == ["origin", "unrelated"]
 
-            # When
-            await Git().clone(
-                path=str(tmp_path), repo_url="ghjkhjkl", auth=None, versioning=False
-            )
 
-            # Then
-            mock_execute.assert_called_once_with(
-                ["git", "clone", "--depth=1", "ghjkhjkl"],  # to be update
-                cwd=str(tmp_path),  # to be udpated
-                timeout=20,
-                env={"TEST": "test", "GIT_TERMINAL_PROMPT": "0"},
-                username=None,
-                password=None,
-                is_binary=False,
-            )
+@pytest.mark.asyncio
+async def test_git_download_ref_sparse(tmp_path):
+    # Given
+    origin = init_origin(tmp_path / "origin")
+    target = tmp_path / "target"
+    target.mkdir()
+
+    # When
+    response = await Git().clone(
+        str(target), origin.as_uri(), versioning=False, sparse=["src"], ref="v1"
+    )
+
+    # Then
+    assert response["code"] == 0
+    snapshot = target / "origin"
+    assert sorted(os.listdir(snapshot)) == ["README.md", "src"]
+    assert (snapshot / "README.md").read_text() == "readme"
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not hasattr(tarfile, "data_filter"), reason="Links are only checked by tar filters"
+)
+async def test_git_download_escaping_link(tmp_path):
+    # Given
+    origin = init_origin(tmp_path / "origin")
+    (origin / "zlink").symlink_to("/etc/hostname")
+    (origin / "zz").mkdir()
+    (origin / "zz" / "b.txt").write_text("b")
+    subprocess.check_call(["git", "add", "."], cwd=origin)
+    subprocess.check_call(["git", "commit", "-m", "link"], cwd=origin)
+    target = tmp_path / "target"
+    target.mkdir()
+
+    # When
+    response = await Git().clone(str(target), origin.as_uri(), versioning=False)
+
+    # Then
+    assert response["code"] != 0
+    assert "zlink" in response["message"]
+    # No truncated snapshot is left
+    assert os.listdir(target) == []
+
 
-            # Check the repository folder has been created
-            assert git_folder.parent.exists()
-            # Check the `.git` folder has been removed.
-            assert not git_folder.exists()
+@pytest.mark.asyncio
+async def test_git_download_existing_destination(tmp_path):
+    # Given
+    origin = init_origin(tmp_path / "origin")
+    target = tmp_path / "target"
+    (target / "origin").mkdir(parents=True)
+    (target / "origin" / "notes.txt").write_text("notes")
+
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        # When
+        response = await Git().clone(str(target), origin.as_uri(), versioning=False)
+
+        # Then
+        assert response["code"] == 128
+        assert "already exists" in response["message"]
+        mock_execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_git_download_unknown_ref(tmp_path):
+    # Given
+    origin = init_origin(tmp_path / "origin")
+    target = tmp_path / "target"
+    target.mkdir()
+
+    # When
+    response = await Git().clone(
+        str(target), origin.as_uri(), versioning=False, ref="unknown"
+    )
+
+    # Then
+    assert response["code"] != 0
+    assert "unknown" in response["message"]
+    assert os.listdir(target) == []
 
 
 @pytest.mark.asyncio
@@ -96,6 +184,7 @@ async def test_git_submodules_success(tmp_path):
                 username=None,
                 password=None,
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 0, "message": output} == actual_response
 
@@ -128,6 +217,7 @@ async def test_git_clone_failure_from_git():
                 username=None,
                 password=None,
                 is_binary=False,
+                exclusive=False,
             )
             assert {
                 "code": 128,
@@ -158,6 +248,7 @@ async def test_git_clone_with_auth_success():
                 username="asdf",
                 password="qwerty",
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 0, "message": output} == actual_response
 
@@ -191,6 +282,7 @@ async def test_git_clone_with_auth_wrong_repo_url_failure_from_git():
                 username="asdf",
                 password="qwerty",
                 is_binary=False,
+                exclusive=False,
             )
             assert {
                 "code": 128,
@@ -231,6 +323,7 @@ async def test_git_clone_with_auth_auth_failure_from_git():
                 username="asdf",
                 password="qwerty",
                 is_binary=False,
+                exclusive=False,
             )
             assert {
                 "code": 128,
@@ -303,6 +396,7 @@ async def test_git_clone_with_auth_and_cache_credentials():
                         username="asdf",
                         password="qwerty",
                         is_binary=False,
+                        exclusive=False,
                     ),
                 ]
             )
@@ -347,7 +441,64 @@ async def test_git_clone_with_auth_and_cache_credentials_and_existing_credential
                     username="asdf",
                     password="qwerty",
                     is_binary=False,
+                    exclusive=False,
                 ),
             ]
         )
         assert {"code": 0, "message": ""} == actual_response
+
+
+@pytest.mark.asyncio
+async def test_git_clone_partial_sparse(tmp_path):
+    # Given
+    origin = tmp_path / "origin"
+    for folder in ("data", "src"):
+        (origin / folder).mkdir(parents=True)
+        (origin / folder / "file.txt").write_text(folder)
+    (origin / "README.md").write_text("readme")
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "config", "uploadpack.allowFilter", "true"],
+        ["git", "add", "."],
+        ["git", "commit", "-m", "init"],
+        ["git", "branch", "other"],
+    ):
+        subprocess.check_call(command, cwd=origin)
+    target = tmp_path / "target"
+    target.mkdir()
+
+    # When
+    response = await Git().clone(
+        str(target),
+        origin.as_uri(),
+        filter_spec="blob:none",
+        single_branch=True,
+        sparse=["src"],
+    )
+
+    # Then
+    assert response["code"] == 0
+    clone = target / "origin"
+    assert (clone / "README.md").exists()
+    assert (clone / "src" / "file.txt").exists()
+    assert not (clone / "data").exists()
+    config = subprocess.check_output(
+        ["git", "config", "remote.origin.partialclonefilter"], cwd=clone, text=True
+    )
+    assert config.strip() == "blob:none"
+    branches = subprocess.check_output(
+        ["git", "branch", "-r", "--format=%(refname:short)"], cwd=clone, text=True
+    )
+    assert "origin/other" not in branches.split()
+
+
+@pytest.mark.asyncio
+async def test_git_clone_invalid_filter():
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        with pytest.raises(tornado.web.HTTPError) as error:
+            await Git().clone("test_path", "ghjkhjkl", filter_spec="sparse:oid=1234")
+
+        assert error.value.status_code == 400
+        mock_execute.assert_not_called()
@@ -0,0 +1,155 @@
+import json
+import subprocess
+
+import nbformat
+import pytest
+import tornado
+
+from jupyterlab_git.git import Git, parse_cat_file_batch
+from jupyterlab_git.handlers import NAMESPACE
+
+
+def write_notebook(path, source):
+    nb = nbformat.v4.new_notebook()
+    cell = nbformat.v4.new_code_cell(source)
+    cell.id = "cell-0"
+    nb.cells.append(cell)
+    nbformat.write(nb, path)
+
+
+def git(path, *args, check=True):
+    process = subprocess.run(
+        ["git", *args], cwd=path, capture_output=True, text=True, check=check
+    )
+    return process.stdout.strip()
+
+
+def init_conflicts(path):
+    """Repository in the middle of a merge with conflicts."""
+    path.mkdir(parents=True)
+    (path / "text.txt").write_text("line\n")
+    (path / "clean.txt").write_text("clean\n")
+    write_notebook(path / "notebook.ipynb", "a = 1")
+    git(path, "init", "-b", "main")
+    git(path, "config", "user.name", "JupyterLab Git")
+    git(path, "config", "user.email", "jlab.git@py.test")
+    git(path, "add", ".")
+    git(path, "commit", "-m", "init")
+
+    git(path, "checkout", "-b", "other")
+    (path / "text.txt").write_text("theirs\n")
+    (path / "both.bin").write_bytes(b"\0theirs")
+    write_notebook(path / "notebook.ipynb", "a = 3")
+    git(path, "add", ".")
+    git(path, "commit", "-m", "other")
+
+    git(path, "checkout", "main")
+    (path / "text.txt").write_text("ours\n")
+    (path / "both.bin").write_bytes(b"\0ours")
+    write_notebook(path / "notebook.ipynb", "a = 2")
+    git(path, "add", ".")
+    git(path, "commit", "-m", "main")
+    git(path, "merge", "other", check=False)
+    return path
+
+
+def test_parse_cat_file_batch():
+    output = b"aaa blob 3\nx\ny\nbbb missing\nccc blob 0\n\n"
+
+    assert parse_cat_file_batch(output) == {"aaa": b"x\ny", "ccc": b""}
+
+
+@pytest.mark.asyncio
+async def test_conflicts(tmp_path):
+    # Given
+    repository = init_conflicts(tmp_path / "repo")
+
+    # When
+    response = await Git().conflicts(str(repository))
+
+    # Then
+    assert response["code"] == 0
+    files = {f["filename"]: f for f in response["files"]}
+    assert sorted(files) == ["both.bin", "notebook.ipynb", "text.txt"]
+    text = files["text.txt"]
+    assert [text[stage]["content"] for stage in ("base", "ours", "theirs")] == [
+        "line\n",
+        "ours\n",
+        "theirs\n",
+    ]
+    assert text["ours"]["oid"] == git(repository, "rev-parse", "HEAD:text.txt")
+    assert not text["ours"]["binary"]
+    assert files["both.bin"]["base"] is None
+    assert files["both.bin"]["ours"]["binary"]
+    assert files["both.bin"]["ours"]["content"] == "AG91cnM=\n"
+    assert "merge" not in files["notebook.ipynb"]
+
+
+@pytest.mark.asyncio
+async def test_conflicts_merge_decisions(tmp_path):
+    # Given
+    repository = init_conflicts(tmp_path / "repo")
+
+    # When
+    response = await Git().conflicts(
+        str(repository), ["notebook.ipynb", "text.txt"], merge_decisions=True
+    )
+
+    # Then
+    notebook, text = response["files"]
+    assert notebook["filename"] == "notebook.ipynb"
+    assert notebook["merge"]["base"]["cells"][0]["source"] == "a = 1"
+    assert any(d["conflict"] for d in notebook["merge"]["merge_decisions"])
+    assert text["filename"] == "text.txt"
+    assert "merge" not in text
+
+
+@pytest.mark.asyncio
+async def test_conflicts_without_conflict(tmp_path):
+    repository = init_conflicts(tmp_path / "repo")
+
+    response = await Git().conflicts(str(repository), ["clean.txt"])
+
+    assert response == {"code": 0, "files": []}
+
+
+@pytest.mark.asyncio
+async def test_read_blobs_failure(tmp_path):
+    response = await Git().read_blobs(str(tmp_path), ["0" * 40])
+
+    assert response["code"] != 0
+    assert response["command"] == "git cat-file --batch"
+    assert response["message"]
+
+
+async def test_conflicts_handler(jp_fetch, jp_root_dir):
+    # Given
+    init_conflicts(jp_root_dir / "repo")
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "conflicts",
+        body=json.dumps({"filenames": ["text.txt"]}),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    [entry] = json.loads(response.body)["files"]
+    assert entry["theirs"]["content"] == "theirs\n"
+
+
+@pytest.mark.parametrize(
+    "body", [{"filenames": "text.txt"}, {"merge_decisions": "yes"}]
+)
+async def test_conflicts_handler_invalid(jp_fetch, jp_root_dir, body):
+    init_conflicts(jp_root_dir / "repo")
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            NAMESPACE, "repo", "conflicts", body=json.dumps(body), method="POST"
+        )
+
+    assert error.value.code == 400
@@ -2,7 +2,7 @@ import json
 import nbformat
 from pathlib import Path
 from subprocess import CalledProcessError
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 
 import pytest
 import tornado
@@ -307,3 +307,114 @@ async def test_Git_get_nbdiff_no_content():
         "base": nbformat.versions[nbformat.current_nbformat].new_notebook(),
         "diff": [],
     }
+
+
+def code_cell(source, outputs, execution_count, metadata=None):
+    cell = nbformat.v4.new_code_cell(
+        source, execution_count=execution_count, outputs=outputs
+    )
+    # Stable cell ids; the sources of the tests have different lengths
+    cell.id = "cell-{}".format(len(source))
+    cell.metadata = metadata or {}
+    return cell
+
+
+@pytest.mark.asyncio
+async def test_Git_get_nbdiff_ignore_outputs_and_execution_count():
+    # Given
+    prev_nb = nbformat.v4.new_notebook(
+        cells=[
+            code_cell("a = 1", [], 1),
+            code_cell("a", [nbformat.v4.new_output("stream", text="1\n")], 2),
+        ]
+    )
+    curr_nb = nbformat.v4.new_notebook(
+        cells=[
+            code_cell("a = 1", [], 5),
+            code_cell("a", [nbformat.v4.new_output("stream", text="2\n")], 6),
+        ]
+    )
+
+    # When
+    result = await Git().get_nbdiff(
+        nbformat.writes(prev_nb),
+        nbformat.writes(curr_nb),
+        ignore_outputs=True,
+        ignore_execution_count=True,
+    )
+
+    # Then
+    assert result["diff"] == []
+    assert result["base"]["cells"][1]["outputs"] == []
+    omitted = result["omitted"]
+    assert omitted["outputs"] and omitted["execution_count"]
+    assert not omitted["metadata"]
+    # Outputs differ for the second cell
+    assert list(omitted["previous"]["outputs"]) == [1]
+    assert omitted["previous"]["outputs"][1] != omitted["current"]["outputs"][1]
+
+
+@pytest.mark.asyncio
+async def test_Git_get_nbdiff_ignore_metadata():
+    # Given
+    kernelspec = {"name": "python3", "display_name": "Python 3"}
+    prev_nb = nbformat.v4.new_notebook(
+        cells=[code_cell("a = 1", [], 1, {"collapsed": True})],
+        metadata={"kernelspec": kernelspec, "toc": {"number_sections": True}},
+    )
+    curr_nb = nbformat.v4.new_notebook(
+        cells=[code_cell("a = 2", [], 1)], metadata={"kernelspec": kernelspec}
+    )
+
+    # When
+    result = await Git().get_nbdiff(
+        nbformat.writes(prev_nb), nbformat.writes(curr_nb), ignore_metadata=True
+    )
+
+    # Then
+    assert [d["key"] for d in result["diff"]] == ["cells"]
+    assert result["base"]["metadata"] == {"kernelspec": kernelspec}
+    assert list(result["omitted"]["previous"]["metadata"]) == [0]
+    assert result["omitted"]["previous"]["notebook_metadata"]
+    assert result["omitted"]["current"] == {"metadata": {}}
+
+
+@pytest.mark.asyncio
+async def test_Git_get_nbdiff_ignore_for_merge():
+    with pytest.raises(ValueError):
+        await Git().get_nbdiff("", "", "base", ignore_outputs=True)
+
+
+async def test_diffnotebook_handler_ignore_outputs(jp_fetch):
+    # Given
+    HERE = Path(__file__).parent.resolve()
+    body = {
+        "previousContent": (HERE / "samples" / "ipynb_base.json").read_text(),
+        "currentContent": (HERE / "samples" / "ipynb_remote.json").read_text(),
+        "ignore_outputs": True,
+    }
+
+    # When
+    response = await jp_fetch(
+        "git", "diffnotebook", body=json.dumps(body), method="POST"
+    )
+
+    # Then
+    payload = json.loads(response.body)
+    assert payload["omitted"]["outputs"]
+    assert payload["omitted"]["previous"] == {"outputs": {"2": ANY}}
+    assert all(cell.get("outputs", []) == [] for cell in payload["base"]["cells"])
+
+
+async def test_diffnotebook_handler_ignore_for_merge(jp_fetch):
+    body = {
+        "previousContent": "",
+        "currentContent": "",
+        "baseContent": "base",
+        "ignore_metadata": True,
+    }
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch("git", "diffnotebook", body=json.dumps(body), method="POST")
+
+    assert error.value.code == 400
@@ -0,0 +1,105 @@
+import io
+import subprocess
+import tarfile
+import zipfile
+
+import pytest
+import tornado
+
+from jupyterlab_git.git import Git
+from jupyterlab_git.handlers import NAMESPACE
+
+from .testutils import assert_http_error
+
+
+def init_repository(path):
+    (path / "src").mkdir(parents=True)
+    (path / "src" / "main.py").write_text("print('v1')\n")
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "add", "."],
+        ["git", "commit", "-m", "init"],
+        ["git", "tag", "v1"],
+    ):
+        subprocess.check_call(command, cwd=path)
+    (path / "src" / "main.py").write_text("print('v2')\n")
+    subprocess.check_call(["git", "commit", "-am", "v2"], cwd=path)
+    return path
+
+
+@pytest.mark.asyncio
+async def test_archive_tar(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+
+    # When
+    chunks = await Git().archive(str(repository), "v1", "tar.gz")
+    content = b"".join([chunk async for chunk in chunks])
+
+    # Then
+    with tarfile.open(fileobj=io.BytesIO(content), mode="r:gz") as archive:
+        assert archive.extractfile("repo/src/main.py").read() == b"print('v1')\n"
+
+
+@pytest.mark.asyncio
+async def test_archive_stop_streaming(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    chunks = await Git().archive(str(repository))
+
+    # When
+    await chunks.__anext__()
+    await chunks.aclose()
+
+    # Then
+    with pytest.raises(StopAsyncIteration):
+        await chunks.__anext__()
+
+
+@pytest.mark.asyncio
+async def test_archive_unknown_ref(tmp_path):
+    repository = init_repository(tmp_path / "repo")
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().archive(str(repository), "unknown")
+
+    assert error.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_archive_invalid_format(tmp_path):
+    repository = init_repository(tmp_path / "repo")
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().archive(str(repository), "HEAD", "rar")
+
+    assert error.value.status_code == 400
+
+
+async def test_archive_handler(jp_fetch, jp_root_dir):
+    # Given
+    init_repository(jp_root_dir / "repo")
+
+    # When
+    response = await jp_fetch(NAMESPACE, "repo", "archive", params={"ref": "main"})
+
+    # Then
+    assert response.code == 200
+    assert response.headers["Content-Type"] == "application/zip"
+    assert (
+        response.headers["Content-Disposition"]
+        == 'attachment; filename="repo-main.zip"'
+    )
+    with zipfile.ZipFile(io.BytesIO(response.body)) as archive:
+        assert archive.read("repo/src/main.py") == b"print('v2')\n"
+
+
+async def test_archive_handler_unknown_ref(jp_fetch, jp_root_dir):
+    init_repository(jp_root_dir / "repo")
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(NAMESPACE, "repo", "archive", params={"ref": "unknown"})
+
+    assert_http_error(error, 404)
@@ -1,3 +1,6 @@
+import asyncio
+import sys
+
 import pytest
 from unittest.mock import patch
 
@@ -25,3 +28,51 @@ async def test_execute_waits_on_index_lock(tmp_path):
 
         assert not lock_file.exists()
         assert sleep.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_non_exclusive_skips_global_lock(tmp_path):
+    # Given
+    await execution_lock.acquire()
+    try:
+        # When
+        code, output, _ = await execute(
+            [sys.executable, "-c", "print('network')"],
+            cwd=str(tmp_path),
+            timeout=1,
+            exclusive=False,
+        )
+    finally:
+        execution_lock.release()
+
+    # Then
+    assert code == 0
+    assert output.strip() == "network"
+
+
+@pytest.mark.asyncio
+async def test_execute_cancel_kills_process(tmp_path):
+    # Given
+    marker = tmp_path / "marker"
+    task = asyncio.ensure_future(
+        execute(
+            [
+                sys.executable,
+                "-c",
+                "import time; time.sleep(2); open({!r}, 'w').close()".format(
+                    str(marker)
+                ),
+            ],
+            cwd=str(tmp_path),
+        )
+    )
+    await asyncio.sleep(0.5)
+
+    # When
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.sleep(2.5)
+
+    # Then
+    assert not marker.exists()
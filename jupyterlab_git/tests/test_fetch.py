@@ -1,10 +1,15 @@
+import asyncio
 import os
-from unittest.mock import call, patch
+import subprocess
+import time
+from unittest.mock import Mock, call, patch
 
 import pytest
+import tornado
 
 from jupyterlab_git import JupyterLabGit
 from jupyterlab_git.git import Git
+from jupyterlab_git.scheduler import FETCH_JITTER
 
 from .testutils import maybe_future
 
@@ -27,6 +32,7 @@ async def test_git_fetch_success():
             username=None,
             password=None,
             is_binary=False,
+            exclusive=False,
         )
         assert {"code": 0} == actual_response
 
@@ -49,6 +55,7 @@ async def test_git_fetch_fail():
             username=None,
             password=None,
             is_binary=False,
+            exclusive=False,
         )
         assert {
             "code": 1,
@@ -78,6 +85,7 @@ async def test_git_fetch_with_auth_success():
             username="test_user",
             password="test_pass",
             is_binary=False,
+            exclusive=False,
         )
         assert {"code": 0} == actual_response
 
@@ -109,6 +117,7 @@ async def test_git_fetch_with_auth_fail():
             username="test_user",
             password="test_pass",
             is_binary=False,
+            exclusive=False,
         )
         assert {
             "code": 128,
@@ -180,6 +189,7 @@ async def test_git_fetch_with_auth_and_cache_credentials():
                         username="test_user",
                         password="test_pass",
                         is_binary=False,
+                        exclusive=False,
                     ),
                 ]
             )
@@ -228,7 +238,367 @@ async def test_git_fetch_with_auth_and_cache_credentials_and_existing_credential
                     username="test_user",
                     password="test_pass",
                     is_binary=False,
+                    exclusive=False,
                 ),
             ]
         )
         assert {"code": 0} == actual_response
+
+
+def scheduled_git(fetch_results, remote_refs, probe=None):
+    """Git instance whose fetch, probe and remote-tracking references are mocked."""
+    git = Git()
+
+    async def remote_probe(path, upstream_only=False):
+        return probe or {
+            "code": 0,
+            "changes": ["refs/remotes/origin/main"],
+            "behind_remote": True,
+        }
+
+    async def repository_info(path):
+        return {"code": 0, "common_dir": path + "/.git"}
+
+    async def fetch(path, auth=None, **scope):
+        await asyncio.sleep(0.01)
+        return fetch_results.pop(0)
+
+    async def remote_tracking_refs(path):
+        return remote_refs.pop(0)
+
+    git.repository_info = repository_info
+    git.fetch = Mock(side_effect=fetch)
+    git.remote_tracking_refs = remote_tracking_refs
+    git.remote_probe = Mock(side_effect=remote_probe)
+    return git
+
+
+@pytest.mark.asyncio
+async def test_fetch_scheduler_shares_concurrent_fetches():
+    # Given
+    git = scheduled_git(
+        [{"code": 0}],
+        [{"refs/remotes/origin/main": "a"}, {"refs/remotes/origin/main": "b"}],
+    )
+
+    # When
+    responses = await asyncio.gather(
+        *(git.fetch_scheduler.fetch("repo") for _ in range(3))
+    )
+
+    # Then
+    git.fetch.assert_called_once_with("repo", None, upstream_only=True, tags=False)
+    assert (
+        responses
+        == [
+            {
+                "code": 0,
+                "behind_remote": True,
+                "fetched": True,
+                "generation": 1,
+                "changed": True,
+            }
+        ]
+        * 3
+    )
+
+
+@pytest.mark.asyncio
+async def test_fetch_scheduler_forced_fetch_does_not_share_scheduled_one():
+    # Given
+    git = scheduled_git(
+        [{"code": 0}, {"code": 0}],
+        [{"refs/remotes/origin/main": "a"}] * 3,
+    )
+    scheduled = asyncio.ensure_future(git.fetch_scheduler.fetch("repo"))
+    await asyncio.sleep(0)
+
+    # When
+    forced = await git.fetch_scheduler.fetch("repo", force=True)
+
+    # Then
+    assert scheduled.done()
+    assert git.fetch.call_args_list == [
+        call("repo", None, upstream_only=True, tags=False),
+        call("repo", None),
+    ]
+    assert forced["fetched"] is True
+
+
+@pytest.mark.asyncio
+async def test_fetch_scheduler_honours_interval():
+    # Given
+    git = scheduled_git(
+        [{"code": 0}, {"code": 0}],
+        [{"refs/remotes/origin/main": "a"}] * 3,
+    )
+    await git.fetch_scheduler.fetch("repo")
+
+    # When
+    skipped = await git.fetch_scheduler.fetch("repo", generation=0)
+    forced = await git.fetch_scheduler.fetch("repo", force=True)
+
+    # Then
+    assert git.fetch.call_count == 2
+    # Forced fetches are not limited to the scheduled fetches scope
+    git.fetch.assert_called_with("repo", None)
+    assert skipped == {
+        "code": 0,
+        "behind_remote": True,
+        "fetched": False,
+        "generation": 0,
+        "changed": False,
+    }
+    assert forced == {"code": 0, "fetched": True, "generation": 0, "changed": False}
+
+
+@pytest.mark.asyncio
+async def test_fetch_scheduler_backoff_on_failure():
+    # Given
+    git = scheduled_git(
+        [{"code": 128, "message": "fatal"}, {"code": 128, "message": "fatal"}],
+        [{}],
+    )
+    scheduler = git.fetch_scheduler
+    scheduler.probe = "none"
+    scheduler.interval = 10
+    scheduler.max_backoff = 30
+
+    # When
+    start = time.monotonic()
+    await scheduler.fetch("repo")
+    first_delay = scheduler._repositories["repo/.git"].due - start
+    await scheduler.fetch("repo", force=True)
+    second_delay = scheduler._repositories["repo/.git"].due - start
+
+    # Then
+    assert 20 <= first_delay <= 20 * (1 + FETCH_JITTER)
+    assert 30 <= second_delay <= 30 * (1 + FETCH_JITTER)
+    response = await scheduler.fetch("repo")
+    assert response["fetched"] is False
+    assert response["code"] == 128
+
+
+@pytest.mark.asyncio
+async def test_remote_tracking_refs():
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = maybe_future(
+            (0, "refs/remotes/origin/main\tabc\nrefs/remotes/origin/dev\tdef\n", "")
+        )
+
+        # When
+        refs = await Git().remote_tracking_refs("test_path")
+
+        # Then
+        mock_execute.assert_called_once_with(
+            [
+                "git",
+                "for-each-ref",
+                "--format=%(refname)%09%(objectname)",
+                "refs/remotes/",
+            ],
+            cwd="test_path",
+            timeout=20,
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
+        )
+        assert refs == {
+            "refs/remotes/origin/main": "abc",
+            "refs/remotes/origin/dev": "def",
+        }
+
+
+@pytest.mark.asyncio
+async def test_fetch_scheduler_probe_unchanged():
+    # Given
+    git = scheduled_git(
+        [],
+        [],
+        probe={"code": 0, "changes": [], "behind_remote": False},
+    )
+    scheduler = git.fetch_scheduler
+    scheduler.probe = "upstream"
+    scheduler.interval = 5
+
+    # When
+    start = time.monotonic()
+    response = await scheduler.fetch("repo")
+
+    # Then
+    git.remote_probe.assert_called_once_with("repo", upstream_only=True)
+    git.fetch.assert_not_called()
+    assert response == {
+        "code": 0,
+        "behind_remote": False,
+        "fetched": True,
+        "generation": 0,
+        "changed": False,
+    }
+    assert (
+        5 <= scheduler._repositories["repo/.git"].due - start <= 5 * (1 + FETCH_JITTER)
+    )
+
+
+@pytest.mark.asyncio
+async def test_remote_probe(tmp_path):
+    # Given
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "commit", "--allow-empty", "-m", "init"],
+    ):
+        subprocess.check_call(command, cwd=origin)
+    clone = tmp_path / "clone"
+    subprocess.check_call(["git", "clone", str(origin), str(clone)])
+    git = Git()
+    assert await git.remote_probe(str(clone)) == {
+        "code": 0,
+        "changes": [],
+        "behind_remote": False,
+    }
+
+    # When
+    subprocess.check_call(["git", "commit", "--allow-empty", "-m", "new"], cwd=origin)
+    subprocess.check_call(["git", "branch", "feature"], cwd=origin)
+
+    # Then
+    assert await git.remote_probe(str(clone)) == {
+        "code": 0,
+        "changes": ["refs/remotes/origin/feature", "refs/remotes/origin/main"],
+        "behind_remote": True,
+    }
+    assert await git.remote_probe(str(clone), upstream_only=True) == {
+        "code": 0,
+        "changes": ["refs/remotes/origin/main"],
+        "behind_remote": True,
+    }
+    subprocess.check_call(["git", "fetch"], cwd=clone)
+    assert await git.remote_probe(str(clone)) == {
+        "code": 0,
+        "changes": [],
+        "behind_remote": False,
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "scope, upstream, expected",
+    (
+        ({}, None, ["git", "fetch", "--all", "--prune"]),
+        (
+            {"upstream_only": True, "tags": False},
+            ("origin", "refs/heads/main", "refs/remotes/origin/main"),
+            [
+                "git",
+                "fetch",
+                "--prune",
+                "--no-tags",
+                "--",
+                "origin",
+                "refs/heads/main",
+            ],
+        ),
+        (
+            {"upstream_only": True},
+            None,
+            ["git", "fetch", "--all", "--prune"],
+        ),
+        (
+            {"remotes": ["origin", "upstream"], "depth": 1},
+            None,
+            [
+                "git",
+                "fetch",
+                "--prune",
+                "--depth=1",
+                "--multiple",
+                "--",
+                "origin",
+                "upstream",
+            ],
+        ),
+        (
+            {
+                "remotes": ["origin"],
+                "refspecs": ["+refs/heads/dev:refs/remotes/origin/dev"],
+                "shallow_since": "2024-01-01",
+            },
+            None,
+            [
+                "git",
+                "fetch",
+                "--prune",
+                "--shallow-since=2024-01-01",
+                "--",
+                "origin",
+                "+refs/heads/dev:refs/remotes/origin/dev",
+            ],
+        ),
+    ),
+)
+async def test_git_fetch_scope(scope, upstream, expected):
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        with patch.object(
+            Git,
+            "_get_head_upstream",
+            return_value=maybe_future({"code": 0, "upstream": upstream}),
+        ):
+            # Given
+            mock_execute.return_value = maybe_future((0, "", ""))
+
+            # When
+            actual_response = await Git().fetch(path="test_path", **scope)
+
+            # Then
+            mock_execute.assert_called_once_with(
+                expected,
+                cwd="test_path",
+                timeout=20,
+                env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+                username=None,
+                password=None,
+                is_binary=False,
+                exclusive=False,
+            )
+            assert {"code": 0} == actual_response
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "scope",
+    (
+        {"upstream_only": True, "remotes": ["origin"]},
+        {"refspecs": ["refs/heads/main"]},
+        {"remotes": ["origin", "upstream"], "refspecs": ["refs/heads/main"]},
+        {"depth": 0},
+    ),
+)
+async def test_git_fetch_scope_invalid(scope):
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        with pytest.raises(tornado.web.HTTPError) as error:
+            await Git().fetch(path="test_path", **scope)
+
+        assert error.value.status_code == 400
+        mock_execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_git_fetch_upstream_only_repository_error():
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        # Given
+        mock_execute.return_value = maybe_future((128, "", "fatal: error"))
+
+        # When
+        actual_response = await Git().fetch(path="test_path", upstream_only=True)
+
+        # Then
+        assert actual_response["code"] == 128
+        assert actual_response["message"] == "fatal: error"
+        assert actual_response["command"].startswith("git rev-parse")
+        mock_execute.assert_called_once()
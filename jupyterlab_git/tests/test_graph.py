@@ -0,0 +1,161 @@
+import json
+import subprocess
+
+import pytest
+import tornado
+
+from jupyterlab_git.git import Git
+from jupyterlab_git.graph import GraphLayout
+from jupyterlab_git.handlers import NAMESPACE
+
+
+def run(path, *commands):
+    for command in commands:
+        subprocess.check_call(command, cwd=path)
+
+
+def init_repository(path):
+    """Create a history with a merged feature branch:
+
+    *   merge
+    |\\
+    | * feature
+    * | main
+    |/
+    * init
+    """
+    path.mkdir(parents=True)
+    run(
+        path,
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "commit", "--allow-empty", "-m", "init"],
+        ["git", "checkout", "-q", "-b", "feature"],
+        ["git", "commit", "--allow-empty", "-m", "feature"],
+        ["git", "checkout", "-q", "main"],
+        ["git", "commit", "--allow-empty", "-m", "main"],
+        ["git", "merge", "--no-ff", "-m", "merge", "feature"],
+    )
+    return path
+
+
+def rev_list(path):
+    output = subprocess.check_output(
+        ["git", "rev-list", "--topo-order", "--parents", "HEAD"], cwd=path, text=True
+    )
+    return [line.split() for line in output.splitlines()]
+
+
+def test_graph_layout():
+    # Given
+    layout = GraphLayout()
+
+    # When
+    rows = [
+        layout.add("m", ["a", "f"]),
+        layout.add("f", ["i"]),
+        layout.add("a", ["i"]),
+        layout.add("i", []),
+    ]
+
+    # Then
+    assert rows == [
+        ("m", 0, 0, ((0, 0, 0), (0, 1, 1))),
+        ("f", 1, 1, ((0, 0, 0), (1, 1, 1))),
+        ("a", 0, 0, ((1, 0, 1), (0, 0, 0))),
+        ("i", 0, 1, ()),
+    ]
+    # Only the branches of the commits to come are kept
+    assert layout.state() == {"next_branch": 2, "reserve": [1], "pending": {}}
+
+
+def test_graph_layout_continuation():
+    commits = [["m", "a", "f"], ["f", "i"], ["a", "i"], ["i"]]
+    layout = GraphLayout()
+    expected = [layout.add(sha, parents) for sha, *parents in commits]
+
+    first = GraphLayout()
+    rows = [first.add(sha, parents) for sha, *parents in commits[:2]]
+    second = GraphLayout(json.loads(json.dumps(first.state())))
+    rows += [second.add(sha, parents) for sha, *parents in commits[2:]]
+
+    assert rows == expected
+
+
+@pytest.mark.asyncio
+async def test_graph_pages(tmp_path):
+    # Given
+    repository = str(init_repository(tmp_path / "repo"))
+    commits = rev_list(repository)
+    git = Git()
+
+    # When
+    first = await git.graph(repository, count=3)
+    second = await git.graph(repository, skip=3, count=3)
+    # The layout is not cached by another server
+    restored = await Git().graph(
+        repository, skip=3, count=3, continuation=first["continuation"]
+    )
+
+    # Then
+    assert first["code"] == 0
+    assert first["tip"] == commits[0][0]
+    assert [row["sha"] for row in first["rows"]] == [c[0] for c in commits[:3]]
+    assert first["rows"][0] == {
+        "sha": commits[0][0],
+        "dot": {"lateralOffset": 0, "branch": 0},
+        "routes": [
+            {"from": 0, "to": 0, "branch": 0},
+            {"from": 0, "to": 1, "branch": 1},
+        ],
+    }
+    assert not first["complete"]
+    assert second["rows"] == restored["rows"]
+    assert [row["sha"] for row in second["rows"]] == [commits[3][0]]
+    assert second["complete"]
+
+
+@pytest.mark.asyncio
+async def test_graph_cached_per_tip(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    git = Git()
+    await git.graph(str(repository))
+
+    # When
+    run(repository, ["git", "commit", "--allow-empty", "-m", "new"])
+    response = await git.graph(str(repository), count=1)
+
+    # Then
+    assert response["tip"] == rev_list(repository)[0][0]
+    assert len(git._graph_cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_graph_invalid_count(tmp_path):
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().graph(str(tmp_path), count=0)
+
+    assert error.value.status_code == 400
+
+
+async def test_graph_handler(jp_fetch, jp_root_dir):
+    # Given
+    init_repository(jp_root_dir / "repo")
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "graph",
+        body=json.dumps({"ref": "feature", "count": 10}),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    payload = json.loads(response.body)
+    assert len(payload["rows"]) == 2
+    assert payload["complete"]
+    assert payload["continuation"]["skip"] == 2
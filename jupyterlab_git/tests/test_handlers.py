@@ -1,11 +1,17 @@
 import json
+import os
 from unittest.mock import ANY, MagicMock, Mock, call, patch
 
 import pytest
 import tornado
 
 from jupyterlab_git.git import Git
-from jupyterlab_git.handlers import NAMESPACE, setup_handlers, GitHandler
+from jupyterlab_git.handlers import (
+    NAMESPACE,
+    setup_handlers,
+    GitHandler,
+    compile_excluded_paths,
+)
 
 from .testutils import assert_http_error, maybe_future
 from tornado.httpclient import HTTPClientError
@@ -13,6 +19,33 @@ from tornado.httpclient import HTTPClientError
 from pathlib import Path
 
 
+REV_PARSE_REPOSITORY = [
+    "git",
+    "rev-parse",
+    "--git-dir",
+    "--git-common-dir",
+    "--is-bare-repository",
+    "--is-shallow-repository",
+    "--show-prefix",
+    "--show-toplevel",
+]
+
+
+def rev_parse_output(top_level, prefix):
+    """Output of REV_PARSE_REPOSITORY for a directory in a working tree."""
+    git_dir = os.path.join(top_level, ".git")
+    return "\n".join([git_dir, git_dir, "false", "false", prefix, top_level]) + "\n"
+
+
+def patch_git(handler):
+    """Patch the Git instance of a handler, keeping its path resolution."""
+    return patch(
+        "jupyterlab_git.handlers.{}.git".format(handler),
+        spec=Git,
+        **{"local_path.side_effect": Git().local_path},
+    )
+
+
 def test_mapping_added():
     mock_web_app = Mock()
     mock_web_app.settings = {"base_url": "nb_base_url"}
@@ -37,7 +70,39 @@ def test_GitHandler_url2localpath(path, with_cm, jp_web_app, jp_root_dir):
         assert str(jp_root_dir / path) == handler.url2localpath(path, with_cm)
 
 
-@patch("jupyterlab_git.handlers.GitAllHistoryHandler.git", spec=Git)
+def test_GitHandler_url2localpath_shared_cache(jp_web_app, jp_root_dir):
+    req = tornado.httputil.HTTPServerRequest()
+    req.connection = MagicMock()
+    first = GitHandler(jp_web_app, req)
+    second = GitHandler(jp_web_app, req)
+
+    assert first.url2localpath("shared/path") == str(jp_root_dir / "shared/path")
+    with patch("jupyterlab_git.git.url2path") as mock_url2path:
+        assert second.url2localpath("shared/path") == str(jp_root_dir / "shared/path")
+        mock_url2path.assert_not_called()
+    assert first.git is second.git
+    assert (first.contents_manager.root_dir, "shared/path") in first.git._local_paths
+
+
+@pytest.mark.parametrize(
+    "patterns, path, excluded",
+    (
+        (("ignored-path/*",), "ignored-path/subdir", True),
+        (("ignored-path/*",), "ignored-path", False),
+        (("a/*", "b?c"), "bxc", True),
+        (("a/*", "b?c"), "bxxc", False),
+        (("Upper*",), "upper", False),
+    ),
+)
+def test_compile_excluded_paths(patterns, path, excluded):
+    assert bool(compile_excluded_paths(patterns).match(path)) == excluded
+
+
+def test_compile_excluded_paths_empty():
+    assert compile_excluded_paths(()) is None
+
+
+@patch_git("GitAllHistoryHandler")
 async def test_all_history_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     # Given
     show_top_level = {"code": 0, "path": "foo"}
@@ -47,7 +112,9 @@ async def test_all_history_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
 
     local_path = jp_root_dir / "test_path"
 
-    mock_git.show_top_level.return_value = maybe_future(show_top_level)
+    mock_git.repository.return_value = maybe_future(
+        {"code": 0, "top_level": "foo", "local_path": str(local_path)}
+    )
     mock_git.branch.return_value = maybe_future(branch)
     mock_git.log.return_value = maybe_future(log)
     mock_git.status.return_value = maybe_future(status)
@@ -59,7 +126,7 @@ async def test_all_history_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     )
 
     # Then
-    mock_git.show_top_level.assert_called_with(str(local_path))
+    mock_git.repository.assert_called_with(str(jp_root_dir), "/test_path")
     mock_git.branch.assert_called_with(str(local_path))
     mock_git.log.assert_called_with(str(local_path), 25)
     mock_git.status.assert_called_with(str(local_path))
@@ -84,7 +151,9 @@ async def test_git_show_prefix(mock_execute, jp_fetch, jp_root_dir):
 
     local_path = jp_root_dir / "test_path"
 
-    mock_execute.return_value = maybe_future((0, str(path), ""))
+    mock_execute.return_value = maybe_future(
+        (0, rev_parse_output(str(jp_root_dir / "repo"), str(path)), "")
+    )
 
     # When
     response = await jp_fetch(
@@ -102,7 +171,7 @@ async def test_git_show_prefix(mock_execute, jp_fetch, jp_root_dir):
     mock_execute.assert_has_calls(
         [
             call(
-                ["git", "rev-parse", "--show-prefix"],
+                REV_PARSE_REPOSITORY,
                 cwd=str(local_path / "subfolder"),
                 timeout=20,
                 env=None,
@@ -116,7 +185,9 @@ async def test_git_show_prefix(mock_execute, jp_fetch, jp_root_dir):
 
 @patch("jupyterlab_git.git.execute")
 async def test_git_show_prefix_nested_directory(mock_execute, jp_fetch, jp_root_dir):
-    mock_execute.return_value = maybe_future((0, f"{jp_root_dir.name}/", ""))
+    mock_execute.return_value = maybe_future(
+        (0, rev_parse_output(str(jp_root_dir.parent), f"{jp_root_dir.name}/"), "")
+    )
     # When
     response = await jp_fetch(
         NAMESPACE,
@@ -131,7 +202,7 @@ async def test_git_show_prefix_nested_directory(mock_execute, jp_fetch, jp_root_
     mock_execute.assert_has_calls(
         [
             call(
-                ["git", "rev-parse", "--show-prefix"],
+                REV_PARSE_REPOSITORY,
                 cwd=str(jp_root_dir) + "/",
                 timeout=20,
                 env=None,
@@ -185,7 +256,7 @@ async def test_git_show_prefix_not_a_git_repo(mock_execute, jp_fetch, jp_root_di
     mock_execute.assert_has_calls(
         [
             call(
-                ["git", "rev-parse", "--show-prefix"],
+                REV_PARSE_REPOSITORY,
                 cwd=str(local_path / "subfolder"),
                 timeout=20,
                 env=None,
@@ -204,7 +275,9 @@ async def test_git_show_top_level(mock_execute, jp_fetch, jp_root_dir):
 
     local_path = jp_root_dir / "test_path"
 
-    mock_execute.return_value = maybe_future((0, str(path), ""))
+    mock_execute.return_value = maybe_future(
+        (0, rev_parse_output(str(path), "subfolder/"), "")
+    )
 
     # When
     response = await jp_fetch(
@@ -222,7 +295,7 @@ async def test_git_show_top_level(mock_execute, jp_fetch, jp_root_dir):
     mock_execute.assert_has_calls(
         [
             call(
-                ["git", "rev-parse", "--show-toplevel"],
+                REV_PARSE_REPOSITORY,
                 cwd=str(local_path / "subfolder"),
                 timeout=20,
                 env=None,
@@ -259,7 +332,7 @@ async def test_git_show_top_level_not_a_git_repo(mock_execute, jp_fetch, jp_root
     mock_execute.assert_has_calls(
         [
             call(
-                ["git", "rev-parse", "--show-toplevel"],
+                REV_PARSE_REPOSITORY,
                 cwd=str(local_path / "subfolder"),
                 timeout=20,
                 env=None,
@@ -271,7 +344,7 @@ async def test_git_show_top_level_not_a_git_repo(mock_execute, jp_fetch, jp_root
     )
 
 
-@patch("jupyterlab_git.handlers.GitBranchHandler.git", spec=Git)
+@patch_git("GitBranchHandler")
 async def test_branch_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -329,14 +402,47 @@ async def test_branch_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     )
 
     # Then
-    mock_git.branch.assert_called_with(str(local_path))
+    mock_git.branch.assert_called_with(
+        str(local_path),
+        ahead_behind=False,
+        base=None,
+        pattern=None,
+        sort=None,
+        offset=0,
+        limit=None,
+    )
 
     assert response.code == 200
     payload = json.loads(response.body)
     assert payload == {"code": 0, "branches": branch["branches"]}
 
 
-@patch("jupyterlab_git.handlers.GitLogHandler.git", spec=Git)
+@patch_git("GitBranchHandler")
+async def test_branch_handler_ahead_behind(mock_git, jp_fetch, jp_root_dir):
+    # Given
+    local_path = jp_root_dir / "test_path"
+    mock_git.branch.return_value = maybe_future({"code": 0, "branches": []})
+
+    # When
+    body = {"ahead_behind": True, "base": "main"}
+    response = await jp_fetch(
+        NAMESPACE, local_path.name, "branch", body=json.dumps(body), method="POST"
+    )
+
+    # Then
+    mock_git.branch.assert_called_with(
+        str(local_path),
+        ahead_behind=True,
+        base="main",
+        pattern=None,
+        sort=None,
+        offset=0,
+        limit=None,
+    )
+    assert response.code == 200
+
+
+@patch_git("GitLogHandler")
 async def test_log_handler(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -357,7 +463,7 @@ async def test_log_handler(mock_git, jp_fetch, jp_root_dir):
     assert payload == log
 
 
-@patch("jupyterlab_git.handlers.GitLogHandler.git", spec=Git)
+@patch_git("GitLogHandler")
 async def test_log_handler_no_history_count(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -377,7 +483,7 @@ async def test_log_handler_no_history_count(mock_git, jp_fetch, jp_root_dir):
     assert payload == log
 
 
-@patch("jupyterlab_git.handlers.GitPushHandler.git", spec=Git)
+@patch_git("GitPushHandler")
 async def test_push_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -404,7 +510,7 @@ async def test_push_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     assert payload == {"code": 0}
 
 
-@patch("jupyterlab_git.handlers.GitPushHandler.git", spec=Git)
+@patch_git("GitPushHandler")
 async def test_push_handler_remotebranch(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -439,7 +545,7 @@ async def test_push_handler_remotebranch(mock_git, jp_fetch, jp_root_dir):
     assert payload == {"code": 0}
 
 
-@patch("jupyterlab_git.handlers.GitPushHandler.git", spec=Git)
+@patch_git("GitPushHandler")
 async def test_push_handler_noupstream(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -476,7 +582,7 @@ async def test_push_handler_noupstream(mock_git, jp_fetch, jp_root_dir):
     }
 
 
-@patch("jupyterlab_git.handlers.GitPushHandler.git", spec=Git)
+@patch_git("GitPushHandler")
 async def test_push_handler_multipleupstream(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -509,7 +615,7 @@ async def test_push_handler_multipleupstream(mock_git, jp_fetch, jp_root_dir):
     }
 
 
-@patch("jupyterlab_git.handlers.GitPushHandler.git", spec=Git)
+@patch_git("GitPushHandler")
 async def test_push_handler_noupstream_unique_remote(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -545,7 +651,7 @@ async def test_push_handler_noupstream_unique_remote(mock_git, jp_fetch, jp_root
     assert payload == {"code": 0}
 
 
-@patch("jupyterlab_git.handlers.GitPushHandler.git", spec=Git)
+@patch_git("GitPushHandler")
 async def test_push_handler_noupstream_pushdefault(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -583,7 +689,7 @@ async def test_push_handler_noupstream_pushdefault(mock_git, jp_fetch, jp_root_d
     assert payload == {"code": 0}
 
 
-@patch("jupyterlab_git.handlers.GitPushHandler.git", spec=Git)
+@patch_git("GitPushHandler")
 async def test_push_handler_noupstream_pass_remote_nobranch(
     mock_git, jp_fetch, jp_root_dir
 ):
@@ -618,7 +724,7 @@ async def test_push_handler_noupstream_pass_remote_nobranch(
     assert payload == {"code": 0}
 
 
-@patch("jupyterlab_git.handlers.GitPushHandler.git", spec=Git)
+@patch_git("GitPushHandler")
 async def test_push_handler_noupstream_pass_remote_branch(
     mock_git, jp_fetch, jp_root_dir
 ):
@@ -654,7 +760,7 @@ async def test_push_handler_noupstream_pass_remote_branch(
     assert payload == {"code": 0}
 
 
-@patch("jupyterlab_git.handlers.GitUpstreamHandler.git", spec=Git)
+@patch_git("GitUpstreamHandler")
 async def test_upstream_handler_forward_slashes(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -680,7 +786,7 @@ async def test_upstream_handler_forward_slashes(mock_git, jp_fetch, jp_root_dir)
     assert payload == upstream
 
 
-@patch("jupyterlab_git.handlers.GitUpstreamHandler.git", spec=Git)
+@patch_git("GitUpstreamHandler")
 async def test_upstream_handler_localbranch(mock_git, jp_fetch, jp_root_dir):
     # Given
     local_path = jp_root_dir / "test_path"
@@ -1089,3 +1195,27 @@ async def test_content_getcontent_deleted_file(mock_execute, jp_fetch, jp_root_d
     assert response.code == 200
     payload = json.loads(response.body)
     assert payload["content"] == ""
+
+
+@patch_git("GitFetchHandler")
+async def test_fetch_handler_scope(mock_git, jp_fetch, jp_root_dir):
+    # Given
+    local_path = jp_root_dir / "test_path"
+    mock_git.fetch.return_value = maybe_future({"code": 0})
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        local_path.name,
+        "remote",
+        "fetch",
+        body=json.dumps({"remotes": ["origin"], "tags": False}),
+        method="POST",
+    )
+
+    # Then
+    mock_git.fetch.assert_called_once_with(
+        str(local_path), None, remotes=["origin"], tags=False
+    )
+    assert response.code == 200
+    assert json.loads(response.body) == {"code": 0}
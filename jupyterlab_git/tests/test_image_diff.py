@@ -0,0 +1,151 @@
+import base64
+import io
+import json
+import subprocess
+from unittest.mock import patch
+
+import pytest
+import tornado
+
+from jupyterlab_git.git import Git
+from jupyterlab_git.handlers import NAMESPACE
+from jupyterlab_git.images import image_diff
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def png(width, height, changed=()):
+    image = Image.new("RGB", (width, height), "white")
+    for xy in changed:
+        image.putpixel(xy, (255, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def decode(data):
+    return Image.open(io.BytesIO(base64.b64decode(data)))
+
+
+def init_repository(path):
+    path.mkdir(parents=True)
+    (path / "plot.png").write_bytes(png(1000, 500))
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "add", "."],
+        ["git", "commit", "-m", "init"],
+    ):
+        subprocess.check_call(command, cwd=path)
+    return path
+
+
+def test_image_diff_mask_keeps_isolated_pixels():
+    result = image_diff(png(1000, 500), png(1000, 500, [(999, 499)]), 64)
+
+    assert result["previous"]["width"] == 1000
+    assert result["previous"]["format"] == "PNG"
+    assert decode(result["current"]["preview"]).size == (64, 32)
+    assert result["changed"] == 1
+    mask = decode(result["mask"])
+    assert mask.size == (64, 32)
+    assert mask.getpixel((63, 31)) == 255
+    assert mask.getpixel((0, 0)) == 0
+
+
+def test_image_diff_different_sizes():
+    result = image_diff(png(10, 10), png(20, 5), 512)
+
+    # Compared on a 20x10 canvas; pixels covered by a single image changed
+    assert result["changed"] == 10 * 5 + 10 * 5
+    assert decode(result["mask"]).size == (20, 10)
+
+
+def test_image_diff_added_image():
+    result = image_diff(None, png(10, 10), 512)
+
+    assert result["previous"] is None
+    assert result["mask"] is None
+    assert result["changed"] == 100
+
+
+@pytest.mark.asyncio
+async def test_image_diff_working_cached(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    (repository / "plot.png").write_bytes(png(1000, 500, [(10, 10)]))
+    git = Git()
+    head = subprocess.check_output(
+        ["git", "rev-parse", "HEAD:plot.png"], cwd=repository, text=True
+    ).strip()
+
+    # When
+    response = await git.image_diff(
+        str(repository), "plot.png", {"git": "HEAD"}, {"special": "WORKING"}, 100
+    )
+    with patch("jupyterlab_git.git.image_diff") as mock_diff:
+        cached = await git.image_diff(
+            str(repository), "plot.png", {"git": "HEAD"}, {"special": "WORKING"}, 100
+        )
+
+    # Then
+    assert response["code"] == 0
+    assert response["previous"]["oid"] == head
+    assert response["current"]["oid"] != head
+    assert response["current"]["size"] == (repository / "plot.png").stat().st_size
+    assert response["changed"] == 1
+    assert cached == response
+    mock_diff.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_image_diff_not_an_image(tmp_path):
+    repository = init_repository(tmp_path / "repo")
+    (repository / "plot.png").write_text("not an image")
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().image_diff(
+            str(repository), "plot.png", {"git": "HEAD"}, {"special": "WORKING"}
+        )
+
+    assert error.value.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_image_diff_invalid_size(tmp_path):
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().image_diff(
+            str(tmp_path), "plot.png", {"git": "HEAD"}, {"special": "WORKING"}, 0
+        )
+
+    assert error.value.status_code == 400
+
+
+async def test_image_diff_handler(jp_fetch, jp_root_dir):
+    # Given
+    repository = init_repository(jp_root_dir / "repo")
+    (repository / "plot.png").unlink()
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "diff",
+        "image",
+        body=json.dumps(
+            {
+                "filename": "plot.png",
+                "previous": {"git": "HEAD"},
+                "current": {"special": "WORKING"},
+            }
+        ),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    payload = json.loads(response.body)
+    assert payload["current"] is None
+    assert payload["previous"]["height"] == 500
+    assert decode(payload["previous"]["preview"]).size == (512, 256)
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+import tornado
+
+from jupyterlab_git.git import Git, execute
+from jupyterlab_git.handlers import NAMESPACE
+from jupyterlab_git.jobs import JobManager, JobStatus
+
+from .testutils import assert_http_error
+
+
+def init_origin(path):
+    path.mkdir()
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+    ):
+        subprocess.check_call(command, cwd=path)
+    for index in range(3):
+        (path / "file{}.txt".format(index)).write_text("content {}\n".format(index))
+        subprocess.check_call(["git", "add", "."], cwd=path)
+        subprocess.check_call(["git", "commit", "-m", str(index)], cwd=path)
+    return path
+
+
+@pytest.mark.asyncio
+async def test_job_succeeded():
+    # Given
+    manager = JobManager()
+
+    async def operation(progress):
+        progress({"phase": "Receiving objects", "percent": 50, "done": 1, "total": 2})
+        progress({"phase": "Receiving objects", "percent": 100, "done": 2, "total": 2})
+        return {"code": 0, "message": "done"}
+
+    # When
+    job = manager.start("fetch", "repo", operation)
+    await job._task
+
+    # Then
+    payload = manager.get(job.id).to_json(since=1)
+    assert payload["status"] == JobStatus.SUCCEEDED
+    assert payload["result"] == {"code": 0, "message": "done"}
+    assert payload["events"] == [
+        {"phase": "Receiving objects", "percent": 100, "done": 2, "total": 2}
+    ]
+    assert payload["next"] == 2
+
+
+@pytest.mark.asyncio
+async def test_job_failed():
+    # Given
+    manager = JobManager()
+
+    async def operation(progress):
+        return {"code": 128, "message": "fatal: unable to access"}
+
+    # When
+    job = manager.start("pull", "repo", operation)
+    await job._task
+
+    # Then
+    assert job.status == JobStatus.FAILED
+    assert job.result == {"code": 128, "message": "fatal: unable to access"}
+
+
+@pytest.mark.asyncio
+async def test_job_cancel_kills_process(tmp_path):
+    # Given
+    manager = JobManager()
+
+    async def operation(progress):
+        return await execute(
+            [sys.executable, "-c", "import time; time.sleep(60)"],
+            cwd=str(tmp_path),
+            progress=progress,
+        )
+
+    job = manager.start("clone", str(tmp_path), operation)
+    await asyncio.sleep(0.5)
+
+    # When
+    start = time.monotonic()
+    manager.cancel(job.id)
+    await job._task
+
+    # Then
+    assert time.monotonic() - start < 10
+    assert job.status == JobStatus.CANCELLED
+    assert job.result["code"] == -1
+
+
+@pytest.mark.asyncio
+async def test_job_expired():
+    # Given
+    manager = JobManager(retention=0)
+
+    async def operation(progress):
+        return {"code": 0}
+
+    job = manager.start("fetch", "repo", operation)
+    await job._task
+    time.sleep(0.01)
+
+    # When/Then
+    assert manager.get(job.id) is None
+    assert manager.list() == []
+
+
+@pytest.mark.asyncio
+async def test_clone_progress(tmp_path):
+    # Given
+    origin = init_origin(tmp_path / "origin")
+    target = tmp_path / "target"
+    target.mkdir()
+    events = []
+
+    # When
+    response = await Git().clone(str(target), origin.as_uri(), progress=events.append)
+
+    # Then
+    assert response["code"] == 0
+    assert (target / "origin" / "file2.txt").exists()
+    receiving = [e for e in events if e["phase"] == "Receiving objects"]
+    assert receiving
+    assert receiving[-1]["percent"] == 100
+    assert receiving[-1]["done"] == receiving[-1]["total"]
+
+
+async def test_clone_handler_background(jp_fetch, jp_root_dir, tmp_path):
+    # Given
+    origin = init_origin(tmp_path / "origin")
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "clone",
+        body=json.dumps({"clone_url": origin.as_uri(), "background": True}),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 202
+    job = json.loads(response.body)["job"]
+    assert job["kind"] == "clone"
+    assert job["status"] == JobStatus.RUNNING
+
+    for _ in range(20):
+        response = await jp_fetch(
+            NAMESPACE, "jobs", job["id"], params={"since": 0, "wait": 1}
+        )
+        job = json.loads(response.body)["job"]
+        if job["status"] != JobStatus.RUNNING:
+            break
+
+    assert job["status"] == JobStatus.SUCCEEDED
+    assert job["result"]["code"] == 0
+    assert any(event["percent"] == 100 for event in job["events"])
+    assert (jp_root_dir / "origin" / "file2.txt").exists()
+
+
+async def test_job_handler_unknown(jp_fetch):
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(NAMESPACE, "jobs", "unknown", method="DELETE")
+
+    assert_http_error(error, 404)
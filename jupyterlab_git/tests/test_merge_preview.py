@@ -0,0 +1,204 @@
+import json
+import os
+import subprocess
+from unittest.mock import patch
+
+import pytest
+import tornado
+from packaging.version import parse
+
+from jupyterlab_git.git import Git
+from jupyterlab_git.handlers import NAMESPACE
+
+from .testutils import assert_http_error, maybe_future
+
+
+def run(path, *commands):
+    for command in commands:
+        subprocess.check_call(command, cwd=path)
+
+
+def init_repository(path):
+    path.mkdir(parents=True)
+    (path / "shared.txt").write_text("base\n")
+    (path / "other.txt").write_text("base\n")
+    run(
+        path,
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "add", "."],
+        ["git", "commit", "-m", "init"],
+        ["git", "branch", "feature"],
+        ["git", "branch", "clean"],
+    )
+    (path / "shared.txt").write_text("main\n")
+    run(path, ["git", "commit", "-am", "main"], ["git", "checkout", "-q", "feature"])
+    (path / "shared.txt").write_text("feature\n")
+    run(path, ["git", "commit", "-am", "feature"], ["git", "checkout", "-q", "clean"])
+    (path / "other.txt").write_text("clean\n")
+    run(path, ["git", "commit", "-am", "clean"], ["git", "checkout", "-q", "main"])
+    return path
+
+
+def status(path):
+    return subprocess.check_output(["git", "status", "--porcelain"], cwd=path)
+
+
+@pytest.mark.asyncio
+async def test_merge_preview_conflict(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+
+    # When
+    conflicting = await Git().merge_preview(str(repository), "merge", "feature")
+    clean = await Git().merge_preview(str(repository), "merge", "clean")
+
+    # Then
+    assert conflicting == {"code": 0, "conflict": True, "files": ["shared.txt"]}
+    assert clean == {"code": 0, "conflict": False, "files": []}
+    assert status(repository) == b""
+    assert (repository / "shared.txt").read_text() == "main\n"
+
+
+@pytest.mark.asyncio
+async def test_merge_preview_pull(tmp_path):
+    # Given
+    origin = init_repository(tmp_path / "origin")
+    run(tmp_path, ["git", "clone", "-q", origin.as_uri(), "clone"])
+    clone = tmp_path / "clone"
+    run(
+        clone,
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+    )
+    (clone / "shared.txt").write_text("local\n")
+    run(clone, ["git", "commit", "-qam", "local"])
+    (origin / "shared.txt").write_text("remote\n")
+    run(origin, ["git", "commit", "-qam", "remote"])
+    run(clone, ["git", "fetch", "-q"])
+
+    # When
+    response = await Git().merge_preview(str(clone), "pull")
+
+    # Then
+    assert response == {"code": 0, "conflict": True, "files": ["shared.txt"]}
+    assert status(clone) == b""
+
+
+@pytest.mark.asyncio
+async def test_merge_preview_unknown_branch(tmp_path):
+    repository = init_repository(tmp_path / "repo")
+
+    response = await Git().merge_preview(str(repository), "merge", "unknown")
+
+    assert response["code"] == 128
+    assert "unknown" in response["message"]
+
+
+@pytest.mark.asyncio
+async def test_merge_preview_rebase_replays_commits():
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        # Given
+        git = Git()
+        git._git_version = parse("2.40.0")
+        mock_execute.side_effect = [
+            maybe_future((0, "c1 p1\nc2 c1\n", "")),
+            maybe_future((0, "t1\x00", "")),
+            maybe_future((1, "t2\x00b.txt\x00a.txt\x00a.txt\x00", "")),
+        ]
+
+        # When
+        response = await git.merge_preview("repo", "rebase", "main")
+
+        # Then
+        assert response == {
+            "code": 0,
+            "conflict": True,
+            "files": ["a.txt", "b.txt"],
+            "commit": "c2",
+        }
+        merge_tree = ["git", "merge-tree", "--write-tree", "--name-only"]
+        merge_tree += ["--no-messages", "-z"]
+        assert [c[0][0] for c in mock_execute.call_args_list[1:]] == [
+            merge_tree + ["--merge-base=p1", "--end-of-options", "main", "c1"],
+            merge_tree + ["--merge-base=c1", "--end-of-options", "t1", "c2"],
+        ]
+
+
+@pytest.mark.asyncio
+async def test_merge_preview_rebase_root_commit():
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        # Given
+        git = Git()
+        git._git_version = parse("2.40.0")
+        mock_execute.side_effect = [
+            maybe_future((0, "c1\nc2 c1\n", "")),
+            maybe_future((0, "e1\n", "")),
+            maybe_future((0, "t1\x00", "")),
+            maybe_future((0, "t2\x00", "")),
+        ]
+
+        # When
+        response = await git.merge_preview("repo", "rebase", "main")
+
+        # Then
+        assert response == {"code": 0, "conflict": False, "files": []}
+        assert mock_execute.call_args_list[1][0][0] == [
+            "git",
+            "hash-object",
+            "-t",
+            "tree",
+            os.devnull,
+        ]
+        merge_tree = ["git", "merge-tree", "--write-tree", "--name-only"]
+        merge_tree += ["--no-messages", "-z"]
+        assert [c[0][0] for c in mock_execute.call_args_list[2:]] == [
+            merge_tree + ["--merge-base=e1", "--end-of-options", "main", "c1"],
+            merge_tree + ["--merge-base=c1", "--end-of-options", "t1", "c2"],
+        ]
+
+
+@pytest.mark.asyncio
+async def test_merge_preview_invalid_operation():
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().merge_preview("repo", "cherry-pick", "main")
+
+    assert error.value.status_code == 400
+
+
+async def test_merge_preview_handler(jp_fetch, jp_root_dir):
+    # Given
+    init_repository(jp_root_dir / "repo")
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "merge",
+        "preview",
+        body=json.dumps({"operation": "rebase", "target": "feature"}),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    payload = json.loads(response.body)
+    assert payload["conflict"]
+    assert payload["files"] == ["shared.txt"]
+
+
+async def test_merge_preview_handler_missing_target(jp_fetch, jp_root_dir):
+    init_repository(jp_root_dir / "repo")
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            NAMESPACE,
+            "repo",
+            "merge",
+            "preview",
+            body=json.dumps({"operation": "merge"}),
+            method="POST",
+        )
+
+    assert_http_error(error, 400)
@@ -0,0 +1,180 @@
+import json
+from pathlib import Path
+
+import nbformat
+import pytest
+import tornado
+from nbdime import diff_notebooks
+
+from jupyterlab_git.git import Git
+from jupyterlab_git.notebooks import align_cells, cell_diffs, cell_digest
+
+HERE = Path(__file__).parent.resolve()
+
+
+def notebook(*cells, ids=False):
+    nb = nbformat.v4.new_notebook()
+    for source in cells:
+        if source.startswith("#"):
+            cell = nbformat.v4.new_markdown_cell(source)
+        else:
+            cell = nbformat.v4.new_code_cell(source)
+        cell.id = source.split()[-1] if ids else None
+        if not ids:
+            del cell["id"]
+        nb.cells.append(cell)
+    return nb
+
+
+def digests(nb):
+    return [cell_digest(cell) for cell in nb.cells]
+
+
+def test_align_cells_by_source():
+    previous = notebook("# title", "a = 1", "b = 2", "c = 3")
+    current = notebook("# title", "a = 10", "c = 3", "# notes", "d = 4")
+
+    pairs = align_cells(digests(previous), digests(current))
+
+    assert pairs == [(0, 0), (1, 1), (2, None), (3, 2), (None, 3), (None, 4)]
+
+
+def test_align_cells_by_id():
+    previous = notebook("x = 1 first", "y = 2 second", ids=True)
+    current = notebook("y = 3 second", "x = 1 first", ids=True)
+
+    pairs = align_cells(digests(previous), digests(current))
+
+    # The moved cell is added back
+    assert pairs == [(None, 0), (0, 1), (1, None)]
+
+
+def test_cell_diffs_like_notebook_diff():
+    # Given
+    previous = nbformat.read(HERE / "samples" / "ipynb_base.json", as_version=4)
+    current = nbformat.read(HERE / "samples" / "ipynb_remote.json", as_version=4)
+    notebook_diff = diff_notebooks(previous, current)
+    patches = {
+        d["key"]: d["diff"] for d in notebook_diff[0]["diff"] if d["op"] == "patch"
+    }
+
+    # When
+    result = cell_diffs(previous, current, [(1, 1)])
+
+    # Then
+    assert result == [
+        {"previous": 1, "current": 1, "base": previous.cells[1], "diff": patches[1]}
+    ]
+
+
+def test_cell_diffs_ignore_cell_ids():
+    previous = notebook("a = 1 first", ids=True)
+    current = notebook("a = 2 other", ids=True)
+
+    [result] = cell_diffs(previous, current, [(0, 0)])
+
+    assert "id" not in result["base"]
+    assert result["diff"] == [
+        {"op": "patch", "key": "source", "diff": result["diff"][0]["diff"]}
+    ]
+    assert "id" in previous.cells[0]
+
+
+@pytest.mark.asyncio
+async def test_notebook_cells_then_cell_diffs():
+    # Given
+    git = Git()
+    previous = notebook("# title", "a = 1", "b = 2")
+    current = notebook("# title", "a = 10", "b = 2")
+    current.cells[2].outputs = [nbformat.v4.new_output("stream", text="2\n")]
+
+    # When
+    summary = await git.notebook_cells(previous, current)
+    details = await git.notebook_cell_diffs(
+        summary["previous"],
+        summary["current"],
+        [[1, 1], [2, 2], [None, 0]],
+        ignore_outputs=True,
+    )
+
+    # Then
+    assert [(c["status"], c["changes"]) for c in summary["cells"]] == [
+        ("unchanged", []),
+        ("modified", ["source"]),
+        ("modified", ["outputs"]),
+    ]
+    assert not summary["metadata"]
+    first, second, third = details["cells"]
+    assert first["diff"][0]["key"] == "source"
+    assert second["diff"] == []
+    assert third["remote"]["source"] == "# title"
+    # The cached notebooks are not modified by the ignored parts
+    again = await git.notebook_cell_diffs(
+        summary["previous"], summary["current"], [[2, 2]]
+    )
+    assert again["cells"][0]["diff"][0]["key"] == "outputs"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "keys, cells, status",
+    [
+        (("unknown", None), [[0, 0]], 404),
+        ((None, None), [[0, 1]], 400),
+        ((None, None), [[None, None]], 400),
+        ((None, None), [0, 0], 400),
+    ],
+)
+async def test_notebook_cell_diffs_invalid(keys, cells, status):
+    git = Git()
+    summary = await git.notebook_cells(notebook("a = 1"), notebook("a = 2"))
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await git.notebook_cell_diffs(
+            keys[0] or summary["previous"], keys[1] or summary["current"], cells
+        )
+
+    assert error.value.status_code == status
+
+
+async def test_diffnotebook_summary_and_cells_handlers(jp_fetch):
+    # Given
+    body = {
+        "previousContent": (HERE / "samples" / "ipynb_base.json").read_text(),
+        "currentContent": (HERE / "samples" / "ipynb_remote.json").read_text(),
+    }
+
+    # When
+    summary = await jp_fetch(
+        "git", "diffnotebook", "summary", body=json.dumps(body), method="POST"
+    )
+    summary = json.loads(summary.body)
+    modified = [
+        [c["previous"], c["current"]]
+        for c in summary["cells"]
+        if c["status"] != "unchanged"
+    ]
+    cells = await jp_fetch(
+        "git",
+        "diffnotebook",
+        "cells",
+        body=json.dumps(
+            {
+                "previous": summary["previous"],
+                "current": summary["current"],
+                "cells": modified,
+            }
+        ),
+        method="POST",
+    )
+
+    # Then
+    assert [c["status"] for c in summary["cells"]] == [
+        "removed",
+        "added",
+        "modified",
+        "unchanged",
+    ]
+    assert [[c["previous"], c["current"]] for c in json.loads(cells.body)["cells"]] == (
+        modified
+    )
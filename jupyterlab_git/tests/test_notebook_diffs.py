@@ -0,0 +1,202 @@
+import json
+import subprocess
+
+import nbformat
+import pytest
+import tornado
+
+from jupyterlab_git.git import Git
+from jupyterlab_git.handlers import NAMESPACE
+from jupyterlab_git.jobs import JobStatus
+
+
+def write_notebook(path, *sources):
+    nb = nbformat.v4.new_notebook()
+    for index, source in enumerate(sources):
+        cell = nbformat.v4.new_code_cell(source)
+        cell.id = "cell-{}".format(index)
+        nb.cells.append(cell)
+    nbformat.write(nb, path)
+
+
+def git(path, *args):
+    return subprocess.check_output(["git", *args], cwd=path, text=True).strip()
+
+
+def init_repository(path):
+    path.mkdir(parents=True)
+    (path / "sub").mkdir()
+    write_notebook(path / "first.ipynb", "a = 1")
+    write_notebook(path / "sub" / "second.ipynb", "b = 1")
+    write_notebook(path / "removed.ipynb", "c = 1")
+    (path / "data.txt").write_text("data")
+    git(path, "init", "-b", "main")
+    git(path, "config", "user.name", "JupyterLab Git")
+    git(path, "config", "user.email", "jlab.git@py.test")
+    git(path, "add", ".")
+    git(path, "commit", "-m", "init")
+
+    write_notebook(path / "first.ipynb", "a = 2")
+    write_notebook(path / "sub" / "second.ipynb", "b = 1", "b += 1")
+    write_notebook(path / "added.ipynb", "d = 1")
+    (path / "removed.ipynb").unlink()
+    (path / "data.txt").write_text("changed")
+    git(path, "add", "-A")
+    git(path, "commit", "-m", "change")
+    return path
+
+
+@pytest.mark.asyncio
+async def test_notebook_diffs(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    manager = Git()
+    events = []
+
+    # When
+    response = await manager.notebook_diffs(
+        str(repository), "HEAD", progress=events.append
+    )
+    again = await manager.notebook_diffs(str(repository), "HEAD")
+
+    # Then
+    assert response["code"] == 0
+    files = {f["filename"]: f for f in response["files"]}
+    assert sorted(files) == [
+        "added.ipynb",
+        "first.ipynb",
+        "removed.ipynb",
+        "sub/second.ipynb",
+    ]
+    assert files["added.ipynb"]["previous"] is None
+    assert files["removed.ipynb"]["current"] is None
+    assert files["first.ipynb"]["current"] == git(
+        repository, "rev-parse", "HEAD:first.ipynb"
+    )
+    assert {f["status"] for f in response["files"]} == {"computed"}
+    assert sorted(e["done"] for e in events) == [1, 2, 3, 4]
+    assert events[-1]["percent"] == 100
+    assert {f["status"] for f in again["files"]} == {"cached"}
+
+    # The notebook diff reuses the precomputed diff
+    previous = git(repository, "show", "HEAD~1:first.ipynb") + "\n"
+    current = git(repository, "show", "HEAD:first.ipynb") + "\n"
+    cached = manager._notebook_diff_cache[
+        (files["first.ipynb"]["previous"], files["first.ipynb"]["current"])
+    ]
+    result = await manager.get_nbdiff(previous, current)
+    assert result["diff"] is cached
+    assert result["base"]["cells"][0]["source"] == "a = 1"
+    assert cached[0]["key"] == "cells"
+
+
+@pytest.mark.asyncio
+async def test_notebook_diffs_cache_bounded_by_size(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    manager = Git()
+    manager._notebook_diff_cache.maxbytes = 300
+
+    # When
+    await manager.notebook_diffs(str(repository), "HEAD")
+
+    # Then
+    cache = manager._notebook_diff_cache
+    assert 0 < len(cache) < 4
+    assert cache.total == sum(cache.sizeof(diff) for diff in cache.values())
+    assert cache.total <= 300
+
+
+@pytest.mark.asyncio
+async def test_notebook_diffs_root_commit(tmp_path):
+    repository = init_repository(tmp_path / "repo")
+
+    response = await Git().notebook_diffs(str(repository), "HEAD~1")
+
+    assert sorted(f["filename"] for f in response["files"]) == [
+        "first.ipynb",
+        "removed.ipynb",
+        "sub/second.ipynb",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_notebook_diffs_failed(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    (repository / "first.ipynb").write_text("not a notebook")
+    git(repository, "commit", "-am", "broken")
+
+    # When
+    response = await Git().notebook_diffs(str(repository), "HEAD")
+
+    # Then
+    assert response["code"] == 0
+    [entry] = response["files"]
+    assert entry["status"] == "failed"
+    assert entry["message"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("commit, previous", [("--all", None), ("HEAD", "")])
+async def test_notebook_diffs_invalid_commit(tmp_path, commit, previous):
+    repository = init_repository(tmp_path / "repo")
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().notebook_diffs(str(repository), commit, previous)
+
+    assert error.value.status_code == 400
+
+
+async def test_notebook_diffs_handler_background(jp_fetch, jp_root_dir):
+    # Given
+    init_repository(jp_root_dir / "repo")
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "diff",
+        "notebooks",
+        body=json.dumps({"commit": "HEAD", "previous": "HEAD~1", "background": True}),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 202
+    job = json.loads(response.body)["job"]
+    assert job["kind"] == "notebook_diffs"
+
+    for _ in range(20):
+        response = await jp_fetch(
+            NAMESPACE, "jobs", job["id"], params={"since": 0, "wait": 1}
+        )
+        job = json.loads(response.body)["job"]
+        if job["status"] != JobStatus.RUNNING:
+            break
+
+    assert job["status"] == JobStatus.SUCCEEDED
+    assert len(job["result"]["files"]) == 4
+    assert sorted(e["filename"] for e in job["events"]) == sorted(
+        f["filename"] for f in job["result"]["files"]
+    )
+
+
+@pytest.mark.parametrize(
+    "body",
+    [{}, {"commit": 42}, {"commit": ["HEAD"]}, {"commit": "HEAD", "previous": 1}],
+)
+async def test_notebook_diffs_handler_invalid(jp_fetch, jp_root_dir, body):
+    init_repository(jp_root_dir / "repo")
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            NAMESPACE,
+            "repo",
+            "diff",
+            "notebooks",
+            body=json.dumps(body),
+            method="POST",
+        )
+
+    assert error.value.code == 400
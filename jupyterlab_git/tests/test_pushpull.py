@@ -30,6 +30,7 @@ async def test_git_pull_fail():
                 username=None,
                 password=None,
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 1, "message": "Authentication failed"} == actual_response
 
@@ -61,6 +62,7 @@ async def test_git_pull_with_conflict_fail():
                         username=None,
                         password=None,
                         is_binary=False,
+                        exclusive=False,
                     )
                 ]
             )
@@ -96,6 +98,7 @@ async def test_git_pull_with_auth_fail():
                 username="asdf",
                 password="qwerty",
                 is_binary=False,
+                exclusive=False,
             )
             assert {
                 "code": 1,
@@ -123,6 +126,7 @@ async def test_git_pull_success():
                 username=None,
                 password=None,
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 0, "message": output} == actual_response
 
@@ -150,6 +154,7 @@ async def test_git_pull_with_auth_success():
                 username="asdf",
                 password="qwerty",
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 0, "message": output} == actual_response
 
@@ -182,6 +187,7 @@ async def test_git_pull_with_auth_success_and_conflict_fail():
                         username="asdf",
                         password="qwerty",
                         is_binary=False,
+                        exclusive=False,
                     )
                 ]
             )
@@ -248,6 +254,7 @@ async def test_git_pull_with_auth_and_cache_credentials():
                         username="user",
                         password="pass",
                         is_binary=False,
+                        exclusive=False,
                     ),
                 ]
             )
@@ -291,6 +298,7 @@ async def test_git_pull_with_auth_and_cache_credentials_and_existing_credential_
                     username="user",
                     password="pass",
                     is_binary=False,
+                    exclusive=False,
                 ),
             ]
         )
@@ -320,6 +328,7 @@ async def test_git_push_fail():
                 username=None,
                 password=None,
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 1, "message": "Authentication failed"} == actual_response
 
@@ -352,6 +361,7 @@ async def test_git_push_with_auth_fail():
                 username="asdf",
                 password="qwerty",
                 is_binary=False,
+                exclusive=False,
             )
             assert {
                 "code": 1,
@@ -381,6 +391,7 @@ async def test_git_push_success():
                 username=None,
                 password=None,
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 0, "message": output} == actual_response
 
@@ -410,6 +421,7 @@ async def test_git_push_with_auth_success():
                 username="asdf",
                 password="qwerty",
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 0, "message": output} == actual_response
 
@@ -473,6 +485,7 @@ async def test_git_push_with_auth_and_cache_credentials():
                         username="user",
                         password="pass",
                         is_binary=False,
+                        exclusive=False,
                     ),
                 ]
             )
@@ -518,6 +531,7 @@ async def test_git_push_with_auth_and_cache_credentials_and_existing_credential_
                     username="user",
                     password="pass",
                     is_binary=False,
+                    exclusive=False,
                 ),
             ]
         )
@@ -546,5 +560,6 @@ async def test_git_push_no_tags_success():
                 username=None,
                 password=None,
                 is_binary=False,
+                exclusive=False,
             )
             assert {"code": 0, "message": output} == actual_response
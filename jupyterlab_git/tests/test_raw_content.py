@@ -0,0 +1,303 @@
+import base64
+import json
+import os
+import subprocess
+from unittest.mock import patch
+
+import pytest
+import tornado
+
+from jupyterlab_git.git import BLOB_CACHE_MAX_AGE_S, STREAM_CHUNK_SIZE, Git
+from jupyterlab_git.handlers import NAMESPACE, parse_range
+
+from .testutils import assert_http_error
+
+CONTENT = os.urandom(3 * STREAM_CHUNK_SIZE + 10)
+
+
+def init_repository(path):
+    (path / "data").mkdir(parents=True)
+    (path / "data" / "blob.bin").write_bytes(CONTENT)
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "add", "."],
+        ["git", "commit", "-m", "init"],
+    ):
+        subprocess.check_call(command, cwd=path)
+    return path
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("bytes=0-9", (0, 9)),
+        ("bytes=90-", (90, 99)),
+        ("bytes=-10", (90, 99)),
+        ("bytes=50-500", (50, 99)),
+        ("bytes=100-", ()),
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert parse_range(header, 100) == expected
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "reference", [{"git": "HEAD"}, {"special": "INDEX"}, {"special": "WORKING"}]
+)
+async def test_blob_info(tmp_path, reference):
+    repository = init_repository(tmp_path / "repo")
+
+    info = await Git().blob_info(str(repository), "data/blob.bin", reference)
+
+    assert info["code"] == 0
+    assert info["size"] == len(CONTENT)
+    assert ("file" in info) == (reference.get("special") == "WORKING")
+
+
+@pytest.mark.asyncio
+async def test_blob_info_outside_repository(tmp_path):
+    repository = init_repository(tmp_path / "repo")
+    (tmp_path / "secret.txt").write_text("secret")
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().blob_info(str(repository), "../secret.txt", {"special": "WORKING"})
+
+    assert error.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_blob_chunks_range(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    git = Git()
+    info = await git.blob_info(str(repository), "data/blob.bin", {"git": "HEAD"})
+    start, end = STREAM_CHUNK_SIZE - 5, 2 * STREAM_CHUNK_SIZE + 5
+
+    # When
+    chunks = [
+        chunk
+        async for chunk in git.blob_chunks(str(repository), info["oid"], start, end)
+    ]
+
+    # Then
+    assert b"".join(chunks) == CONTENT[start : end + 1]
+
+
+@pytest.mark.asyncio
+async def test_blob_chunks_ranges_copy_blob_once(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    git = Git()
+    info = await git.blob_info(str(repository), "data/blob.bin", {"git": "HEAD"})
+    ranges = [(2 * STREAM_CHUNK_SIZE, None), (10, 20), (STREAM_CHUNK_SIZE, 3)]
+
+    # When
+    with patch.object(Git, "_stream", autospec=True, side_effect=Git._stream) as mock:
+        contents = [
+            b"".join(
+                [
+                    chunk
+                    async for chunk in git.blob_chunks(
+                        str(repository), info["oid"], start, end
+                    )
+                ]
+            )
+            for start, end in ranges
+        ]
+
+    # Then
+    assert contents == [CONTENT[2 * STREAM_CHUNK_SIZE :], CONTENT[10:21], b""]
+    mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_blob_chunks_range_unknown_blob(tmp_path):
+    repository = init_repository(tmp_path / "repo")
+    git = Git()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        async for _ in git.blob_chunks(str(repository), "0" * 40, 10):
+            pass
+
+    assert len(git._blob_spools) == 0
+
+
+async def test_raw_content_handler(jp_fetch, jp_root_dir):
+    # Given
+    init_repository(jp_root_dir / "repo")
+
+    # When
+    head = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "content",
+        "raw",
+        params={"filename": "data/blob.bin"},
+        method="HEAD",
+    )
+    response = await jp_fetch(
+        NAMESPACE, "repo", "content", "raw", params={"filename": "data/blob.bin"}
+    )
+    partial = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "content",
+        "raw",
+        params={"filename": "data/blob.bin", "special": "WORKING"},
+        headers={"Range": "bytes=-10"},
+    )
+
+    # Then
+    assert head.headers["Content-Length"] == str(len(CONTENT))
+    assert head.headers["Content-Type"] == "application/octet-stream"
+    assert head.headers["Accept-Ranges"] == "bytes"
+    assert response.body == CONTENT
+    assert partial.code == 206
+    assert partial.headers["Content-Range"] == "bytes {}-{}/{}".format(
+        len(CONTENT) - 10, len(CONTENT) - 1, len(CONTENT)
+    )
+    assert partial.body == CONTENT[-10:]
+
+
+async def test_raw_content_handler_unsatisfiable_range(jp_fetch, jp_root_dir):
+    init_repository(jp_root_dir / "repo")
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            NAMESPACE,
+            "repo",
+            "content",
+            "raw",
+            params={"filename": "data/blob.bin", "ref": "main"},
+            headers={"Range": "bytes={}-".format(len(CONTENT))},
+        )
+
+    assert_http_error(error, 416)
+
+
+async def test_raw_content_handler_unknown_file(jp_fetch, jp_root_dir):
+    init_repository(jp_root_dir / "repo")
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            NAMESPACE, "repo", "content", "raw", params={"filename": "unknown.txt"}
+        )
+
+    assert_http_error(error, 404)
+
+
+def blob_hash(path, revision):
+    return subprocess.check_output(
+        ["git", "rev-parse", revision], cwd=path, text=True
+    ).strip()
+
+
+@pytest.mark.asyncio
+async def test_blob_content(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    (repository / "text.txt").write_text("héllo\n")
+    subprocess.check_call(["git", "add", "text.txt"], cwd=repository)
+    git = Git()
+
+    # When
+    text = await git.blob_content(str(repository), blob_hash(repository, ":text.txt"))
+    binary = await git.blob_content(
+        str(repository), blob_hash(repository, "HEAD:data/blob.bin")
+    )
+
+    # Then
+    assert text == {"code": 0, "content": "héllo\n"}
+    assert base64.decodebytes(binary["content"].encode("ascii")) == CONTENT
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("oid, status", [("HEAD", 400), ("0" * 40, 404), ("tree", 404)])
+async def test_blob_content_invalid(tmp_path, oid, status):
+    repository = init_repository(tmp_path / "repo")
+    if oid == "tree":
+        oid = blob_hash(repository, "HEAD^{tree}")
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().blob_content(str(repository), oid)
+
+    assert error.value.status_code == status
+
+
+async def test_content_handler_cached_by_blob(jp_fetch, jp_root_dir):
+    # Given
+    repository = init_repository(jp_root_dir / "repo")
+    (repository / "text.txt").write_text("content\n")
+    subprocess.check_call(["git", "add", "text.txt"], cwd=repository)
+    head = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "content",
+        "raw",
+        params={"filename": "text.txt", "special": "INDEX"},
+        method="HEAD",
+    )
+    etag = head.headers["Etag"]
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE, "repo", "content", params={"oid": etag.strip('"')}
+    )
+    with patch.object(Git, "blob_content") as mock_content:
+        with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+            await jp_fetch(
+                NAMESPACE,
+                "repo",
+                "content",
+                params={"oid": etag.strip('"')},
+                headers={"If-None-Match": etag},
+            )
+
+    # Then
+    assert head.headers["Cache-Control"] == "no-cache"
+    assert etag == '"{}"'.format(blob_hash(repository, ":text.txt"))
+    assert json.loads(response.body) == {"code": 0, "content": "content\n"}
+    assert response.headers["Etag"] == etag
+    assert response.headers["Cache-Control"] == "private, max-age={}, immutable".format(
+        BLOB_CACHE_MAX_AGE_S
+    )
+    # The repository is not read to answer a revalidation
+    assert error.value.code == 304
+    mock_content.assert_not_called()
+
+
+async def test_raw_content_handler_cached_by_blob(jp_fetch, jp_root_dir):
+    # Given
+    repository = init_repository(jp_root_dir / "repo")
+    oid = blob_hash(repository, "HEAD:data/blob.bin")
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "content",
+        "raw",
+        params={"filename": "data/blob.bin", "oid": oid},
+        headers={"Range": "bytes=0-9"},
+    )
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            NAMESPACE,
+            "repo",
+            "content",
+            "raw",
+            params={"filename": "data/blob.bin"},
+            headers={"If-None-Match": '"{}"'.format(oid)},
+        )
+
+    # Then
+    assert response.code == 206
+    assert response.body == CONTENT[:10]
+    assert response.headers["Cache-Control"].endswith("immutable")
+    assert error.value.code == 304
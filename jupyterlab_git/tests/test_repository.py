@@ -0,0 +1,134 @@
+import json
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from jupyterlab_git.git import Git
+from jupyterlab_git.handlers import NAMESPACE
+
+
+def init_repository(path: Path) -> Path:
+    path.mkdir(parents=True, exist_ok=True)
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "commit", "--allow-empty", "-m", "init"],
+    ):
+        subprocess.check_call(command, cwd=path)
+    return path
+
+
+@pytest.mark.asyncio
+async def test_repository_info(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    subfolder = repository / "sub"
+    subfolder.mkdir()
+
+    # When
+    info = await Git().repository_info(str(subfolder))
+
+    # Then
+    assert info == {
+        "code": 0,
+        "top_level": str(repository.resolve()),
+        "prefix": "sub/",
+        "git_dir": str(repository.resolve() / ".git"),
+        "common_dir": str(repository / ".git"),
+        "is_bare": False,
+        "is_shallow": False,
+        "head": "refs/heads/main",
+    }
+
+
+@pytest.mark.asyncio
+async def test_repository_info_cached(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    git = Git()
+    info = await git.repository_info(str(repository))
+
+    # When
+    subprocess.check_call(["git", "checkout", "-q", "--detach"], cwd=repository)
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        cached_info = await git.repository_info(str(repository))
+
+        # Then
+        mock_execute.assert_not_called()
+    assert cached_info == {**info, "head": None}
+
+
+@pytest.mark.asyncio
+async def test_repository_cached_per_root_dir_and_path(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    (repository / "sub").mkdir()
+    git = Git()
+    info = await git.repository(str(tmp_path), "repo/sub")
+
+    # When
+    with patch("jupyterlab_git.git.execute") as mock_execute, patch(
+        "jupyterlab_git.git.url2path"
+    ) as mock_url2path:
+        cached_info = await git.repository(str(tmp_path), "repo/sub")
+
+        # Then
+        mock_execute.assert_not_called()
+        mock_url2path.assert_not_called()
+    assert info["local_path"] == str(repository / "sub")
+    assert info["prefix"] == "sub/"
+    assert cached_info == info
+
+
+@pytest.mark.asyncio
+async def test_repository_info_invalidated_by_new_repository(tmp_path):
+    # Given
+    folder = tmp_path / "folder"
+    folder.mkdir()
+    git = Git()
+    info = await git.repository_info(str(folder))
+    assert info["top_level"] is None
+
+    # When
+    init_repository(folder)
+    info = await git.repository_info(str(folder))
+
+    # Then
+    assert info["top_level"] == str(folder.resolve())
+    assert info["prefix"] == ""
+
+
+@pytest.mark.asyncio
+async def test_repository_info_bare(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    bare = tmp_path / "bare.git"
+    subprocess.check_call(["git", "clone", "--bare", str(repository), str(bare)])
+
+    # When
+    info = await Git().repository_info(str(bare))
+
+    # Then
+    assert info["code"] == 0
+    assert info["is_bare"]
+    assert info["top_level"] is None
+    assert info["git_dir"] == str(bare)
+    assert info["head"] == "refs/heads/main"
+
+
+async def test_repository_handler(jp_fetch, jp_root_dir):
+    # Given
+    repository = init_repository(jp_root_dir / "repo")
+
+    # When
+    response = await jp_fetch(NAMESPACE, "repo", "repository", body="{}", method="POST")
+
+    # Then
+    assert response.code == 200
+    payload = json.loads(response.body)
+    assert payload["top_level"] == str(repository.resolve())
+    assert payload["prefix"] == ""
+    assert payload["head"] == "refs/heads/main"
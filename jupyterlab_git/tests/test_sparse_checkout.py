@@ -0,0 +1,148 @@
+import json
+import subprocess
+from unittest.mock import patch
+
+import pytest
+import tornado
+
+from jupyterlab_git.git import Git, execute
+from jupyterlab_git.handlers import NAMESPACE
+
+from .testutils import assert_http_error
+
+
+def init_repository(path):
+    for folder in ("data", "src"):
+        (path / folder).mkdir(parents=True)
+        for index in range(2):
+            (path / folder / "file{}.txt".format(index)).write_text(folder)
+    (path / "README.md").write_text("readme")
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "add", "."],
+        ["git", "commit", "-m", "init"],
+    ):
+        subprocess.check_call(command, cwd=path)
+    return path
+
+
+@pytest.mark.asyncio
+async def test_sparse_checkout_add_remove(tmp_path):
+    # Given
+    repository = str(init_repository(tmp_path / "repo"))
+    git = Git()
+    assert await git.sparse_checkout(repository) == {
+        "code": 0,
+        "enabled": False,
+        "directories": [],
+        "tracked": 5,
+        "skipped": 0,
+    }
+
+    # When
+    added = await git.sparse_checkout_add(repository, ["src"])
+    extended = await git.sparse_checkout_add(repository, ["data"])
+    removed = await git.sparse_checkout_remove(repository, ["src/"])
+
+    # Then
+    assert added == {
+        "code": 0,
+        "enabled": True,
+        "directories": ["src"],
+        "tracked": 5,
+        "skipped": 2,
+    }
+    assert extended["directories"] == ["data", "src"]
+    assert extended["skipped"] == 0
+    assert removed["directories"] == ["data"]
+    assert removed["skipped"] == 2
+    assert not (tmp_path / "repo" / "src").exists()
+
+
+@pytest.mark.asyncio
+async def test_sparse_checkout_add_lists_files_once(tmp_path):
+    repository = str(init_repository(tmp_path / "repo"))
+
+    with patch("jupyterlab_git.git.execute", wraps=execute) as mock_execute:
+        await Git().sparse_checkout_add(repository, ["src"])
+
+    commands = [call.args[0][:3] for call in mock_execute.call_args_list]
+    assert commands == [
+        ["git", "sparse-checkout", "list"],
+        ["git", "sparse-checkout", "set"],
+        ["git", "sparse-checkout", "list"],
+        ["git", "ls-files", "-t"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sparse_checkout_remove_not_sparse(tmp_path):
+    repository = str(init_repository(tmp_path / "repo"))
+
+    response = await Git().sparse_checkout_remove(repository, ["src"])
+
+    assert response == {"code": 128, "message": "The worktree is not sparse."}
+
+
+@pytest.mark.asyncio
+async def test_status_in_sparse_worktree(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    git = Git()
+    await git.sparse_checkout_add(str(repository), ["src"])
+
+    # When
+    (repository / "src" / "file0.txt").write_text("changed")
+    status = await git.status(str(repository))
+    changed = await git.changed_files(str(repository), base="WORKING", remote="HEAD")
+    content = await git.show(str(repository), "HEAD", "data/file0.txt")
+
+    # Then
+    assert status["code"] == 0
+    assert [(f["x"], f["y"], f["to"]) for f in status["files"]] == [
+        (" ", "M", "src/file0.txt")
+    ]
+    assert changed == {"code": 0, "files": ["src/file0.txt"]}
+    assert content == "data"
+
+
+async def test_sparse_checkout_handlers(jp_fetch, jp_root_dir):
+    # Given
+    init_repository(jp_root_dir / "repo")
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "sparse_checkout",
+        "add",
+        body=json.dumps({"directories": ["data"]}),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    assert json.loads(response.body)["directories"] == ["data"]
+
+    response = await jp_fetch(
+        NAMESPACE, "repo", "sparse_checkout", body="{}", method="POST"
+    )
+    assert json.loads(response.body)["skipped"] == 2
+
+
+async def test_sparse_checkout_handler_invalid_directories(jp_fetch, jp_root_dir):
+    init_repository(jp_root_dir / "repo")
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+        await jp_fetch(
+            NAMESPACE,
+            "repo",
+            "sparse_checkout",
+            "remove",
+            body=json.dumps({"directories": "data"}),
+            method="POST",
+        )
+
+    assert_http_error(error, 400)
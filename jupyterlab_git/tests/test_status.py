@@ -1,3 +1,4 @@
+import asyncio
 from unittest.mock import call, patch
 
 import pytest
@@ -351,7 +352,9 @@ async def test_status(tmp_path, output, diff_output, expected):
     with patch("jupyterlab_git.git.execute") as mock_execute:
         # Given
         repository = tmp_path / "test_curr_path"
-        (repository / ".git" / "rebase-merge").mkdir(parents=True)
+        (repository / ".git").mkdir(parents=True)
+        if expected["state"] == 3:
+            (repository / ".git" / "rebase-merge").mkdir()
 
         mock_execute.side_effect = [
             maybe_future((0, "\x00".join(output) + "\x00", "")),
@@ -359,10 +362,11 @@ async def test_status(tmp_path, output, diff_output, expected):
             maybe_future((0 if expected["state"] == 4 else 128, "", "cherry pick")),
             maybe_future((0 if expected["state"] == 2 else 128, "", "merge")),
             maybe_future(
-                (0 if expected["state"] == 3 else 128, ".git/rebase-merge", "rebase")
-            ),
-            maybe_future(
-                (0 if expected["state"] == 3 else 128, ".git/rebase-apply", "rebase")
+                (
+                    0,
+                    "\n".join([".git", ".git", "false", "false", "", str(repository)]),
+                    "",
+                )
             ),
         ]
 
@@ -415,16 +419,16 @@ async def test_status(tmp_path, output, diff_output, expected):
                 is_binary=False,
             ),
             call(
-                ["git", "rev-parse", "--git-path", "rebase-merge"],
-                cwd=str(repository),
-                timeout=20,
-                env=None,
-                username=None,
-                password=None,
-                is_binary=False,
-            ),
-            call(
-                ["git", "rev-parse", "--git-path", "rebase-apply"],
+                [
+                    "git",
+                    "rev-parse",
+                    "--git-dir",
+                    "--git-common-dir",
+                    "--is-bare-repository",
+                    "--is-shallow-repository",
+                    "--show-prefix",
+                    "--show-toplevel",
+                ],
                 cwd=str(repository),
                 timeout=20,
                 env=None,
@@ -435,12 +439,86 @@ async def test_status(tmp_path, output, diff_output, expected):
         ]
 
         if expected["state"] == 4:
-            expected_calls = expected_calls[:-3]
-        elif expected["state"] == 2:
             expected_calls = expected_calls[:-2]
-        elif expected["state"] == 3:
+        elif expected["state"] == 2:
             expected_calls = expected_calls[:-1]
 
         mock_execute.assert_has_calls(expected_calls)
 
         assert expected == actual_response
+
+
+@pytest.mark.asyncio
+async def test_status_single_flight(tmp_path):
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        # Given
+        repository = tmp_path / "test_curr_path"
+        (repository / ".git").mkdir(parents=True)
+        outputs = {
+            "status": "## main\x00?? untracked.ipynb\x00",
+            "diff": "",
+            "show": "",
+            "rev-parse": "\n".join(
+                [".git", ".git", "false", "false", "", str(repository)]
+            ),
+        }
+
+        async def execute(cmdline, **kwargs):
+            await asyncio.sleep(0.01)
+            code = 128 if cmdline[1] == "show" else 0
+            return code, outputs[cmdline[1]], ""
+
+        mock_execute.side_effect = execute
+        git = Git()
+
+        # When
+        responses = await asyncio.gather(
+            *(git.status(str(repository)) for _ in range(3))
+        )
+
+        # Then
+        assert mock_execute.call_count == 5
+        assert responses[0]["files"][0]["to"] == "untracked.ipynb"
+        assert responses[0] is responses[1] is responses[2]
+        assert git.single_flight_hits == {("status", (str(repository),), ()): 2}
+
+        # Once finished, the call is not shared; the repository descriptor is cached
+        await git.status(str(repository))
+        assert mock_execute.call_count == 9
+
+
+@pytest.mark.asyncio
+async def test_status_single_flight_not_shared_after_write(tmp_path):
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        # Given
+        repository = tmp_path / "test_curr_path"
+        (repository / ".git").mkdir(parents=True)
+        outputs = {
+            "status": "## main\x00?? untracked.ipynb\x00",
+            "diff": "",
+            "show": "",
+            "add": "",
+            "rev-parse": "\n".join(
+                [".git", ".git", "false", "false", "", str(repository)]
+            ),
+        }
+
+        async def execute(cmdline, **kwargs):
+            await asyncio.sleep(0.2 if cmdline[1] == "status" else 0.01)
+            code = 128 if cmdline[1] == "show" else 0
+            return code, outputs[cmdline[1]], ""
+
+        mock_execute.side_effect = execute
+        git = Git()
+        before = asyncio.ensure_future(git.status(str(repository)))
+        await asyncio.sleep(0.05)
+
+        # When
+        await git.add("untracked.ipynb", str(repository))
+        after = await git.status(str(repository))
+
+        # Then
+        assert after is not await before
+        assert git.single_flight_hits == {}
+        commands = [c.args[0][1] for c in mock_execute.call_args_list]
+        assert commands.count("status") == 2
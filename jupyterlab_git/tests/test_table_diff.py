@@ -0,0 +1,221 @@
+import io
+import json
+import subprocess
+from unittest.mock import patch
+
+import pytest
+import tornado
+
+from jupyterlab_git.git import Git
+from jupyterlab_git.handlers import NAMESPACE
+from jupyterlab_git.tables import table_diff
+
+PREVIOUS = "id,name,score\n1,alice,10\n2,bob,20\n3,carol,30\n"
+CURRENT = "id,score,name,team\n3,30,carol,x\n1,15,alice,y\n4,40,dave,z\n"
+
+
+def opener(content):
+    return lambda: None if content is None else io.StringIO(content)
+
+
+def init_repository(path):
+    path.mkdir(parents=True)
+    (path / "data.csv").write_text(PREVIOUS)
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "add", "."],
+        ["git", "commit", "-m", "init"],
+    ):
+        subprocess.check_call(command, cwd=path)
+    return path
+
+
+def test_table_diff_by_key():
+    result = table_diff(opener(PREVIOUS), opener(CURRENT), key=["id"])
+
+    assert result == {
+        "columns": {
+            "added": ["team"],
+            "removed": [],
+            "common": ["id", "score", "name"],
+        },
+        "rows": {"added": 1, "removed": 1, "changed": 1, "unchanged": 1},
+        "cells": {"id": 0, "score": 1, "name": 0},
+        "changes": [
+            {
+                "type": "changed",
+                "previous_row": 1,
+                "current_row": 2,
+                "values": ["1", "15", "alice", "y"],
+                "cells": {"score": ["10", "15"]},
+            },
+            {
+                "type": "removed",
+                "previous_row": 2,
+                "current_row": None,
+                "values": ["2", "bob", "20"],
+            },
+            {
+                "type": "added",
+                "previous_row": None,
+                "current_row": 3,
+                "values": ["4", "40", "dave", "z"],
+            },
+        ],
+        "truncated": False,
+    }
+
+
+def test_table_diff_by_values():
+    result = table_diff(opener(PREVIOUS), opener(CURRENT))
+
+    # Rows are matched on the common columns
+    assert result["rows"] == {"added": 2, "removed": 2, "changed": 0, "unchanged": 1}
+
+
+def test_table_diff_added_file():
+    result = table_diff(opener(None), opener(CURRENT), key=["id"])
+
+    assert result["columns"]["added"] == ["id", "score", "name", "team"]
+    assert result["rows"]["added"] == 3
+
+
+def test_table_diff_missing_key():
+    with pytest.raises(ValueError):
+        table_diff(opener(PREVIOUS), opener(CURRENT), key=["team"])
+
+
+def test_table_diff_partitions_keep_first_changes():
+    # Given
+    rows = 10000
+    previous = "id,value\n" + "".join("{},{}\n".format(i, i) for i in range(rows))
+    current = "id,value\n" + "".join(
+        "{},{}\n".format(i, i + (i % 3 == 0)) for i in reversed(range(rows))
+    )
+
+    # When
+    with patch("jupyterlab_git.tables.TABLE_PARTITION_SIZE", 10000):
+        result = table_diff(
+            opener(previous),
+            opener(current),
+            key=["id"],
+            max_changes=3,
+            size=len(previous) + len(current),
+        )
+
+    # Then
+    assert result["rows"]["changed"] == len(range(0, rows, 3))
+    assert result["cells"] == {"id": 0, "value": result["rows"]["changed"]}
+    assert [c["current_row"] for c in result["changes"]] == [1, 4, 7]
+    assert result["truncated"]
+
+
+def test_table_diff_partitions_open_one_file_at_once():
+    # Given
+    rows = 2000
+    previous = "id,value\n" + "".join("{},{}\n".format(i, i) for i in range(rows))
+    current = "id,value\n" + "".join("{},{}\n".format(i, -i) for i in range(rows))
+    opened = []
+    open_files = set()
+
+    def tracking_open(*args, **kwargs):
+        f = open(*args, **kwargs)
+        open_files.add(f)
+        opened.append(len([f for f in open_files if not f.closed]))
+        return f
+
+    # When
+    with patch("jupyterlab_git.tables.TABLE_PARTITION_SIZE", 100), patch(
+        "jupyterlab_git.tables.TABLE_PARTITION_BUFFER_SIZE", 1000
+    ), patch("jupyterlab_git.tables.open", tracking_open, create=True):
+        result = table_diff(
+            opener(previous),
+            opener(current),
+            key=["id"],
+            size=len(previous) + len(current),
+        )
+
+    # Then
+    assert result["rows"]["changed"] == rows - 1
+    assert len(opened) > 2 * 256
+    assert max(opened) == 1
+
+
+@pytest.mark.asyncio
+async def test_table_diff_working(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    (repository / "data.csv").write_text(CURRENT)
+
+    # When
+    response = await Git().table_diff(
+        str(repository),
+        "data.csv",
+        {"git": "HEAD"},
+        {"special": "WORKING"},
+        key=["id"],
+    )
+
+    # Then
+    assert response["code"] == 0
+    assert response["rows"] == {"added": 1, "removed": 1, "changed": 1, "unchanged": 1}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "filename, kwargs",
+    [
+        ("data.txt", {}),
+        ("data.csv", {"max_changes": -1}),
+        ("data.csv", {"key": "id"}),
+        ("data.csv", {"key": ["unknown"]}),
+    ],
+)
+async def test_table_diff_invalid_arguments(tmp_path, filename, kwargs):
+    repository = init_repository(tmp_path / "repo")
+
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().table_diff(
+            str(repository), filename, {"git": "HEAD"}, {"special": "WORKING"}, **kwargs
+        )
+
+    assert error.value.status_code == 400
+
+
+async def test_table_diff_handler(jp_fetch, jp_root_dir):
+    # Given
+    repository = init_repository(jp_root_dir / "repo")
+    (repository / "data.csv").write_text(PREVIOUS.replace("bob", "robert"))
+    subprocess.check_call(["git", "add", "data.csv"], cwd=repository)
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "diff",
+        "table",
+        body=json.dumps(
+            {
+                "filename": "data.csv",
+                "previous": {"git": "HEAD"},
+                "current": {"special": "INDEX"},
+                "key": ["id"],
+            }
+        ),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    payload = json.loads(response.body)
+    assert payload["changes"] == [
+        {
+            "type": "changed",
+            "previous_row": 2,
+            "current_row": 2,
+            "values": ["2", "robert", "20"],
+            "cells": {"name": ["bob", "robert"]},
+        }
+    ]
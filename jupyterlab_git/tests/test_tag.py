@@ -10,7 +10,13 @@ from .testutils import maybe_future
 @pytest.mark.asyncio
 async def test_git_tag_success():
     with patch("jupyterlab_git.git.execute") as mock_execute:
-        output_tags = "v1.0.0\t6db57bf4987d387d439acd16ddfe8d54d46e8f4\nv2.0.1\t2aeae86b6010dd1f05b820d8753cff8349c181a6"
+        output_tags = "\n".join(
+            [
+                "refs/heads/main\tmain\t6db57bf4987d387d439acd16ddfe8d54d46e8f4\t\t*",
+                "refs/tags/v1.0.0\tv1.0.0\t6db57bf4987d387d439acd16ddfe8d54d46e8f4\t\t ",
+                "refs/tags/v2.0.1\tv2.0.1\t2aeae86b6010dd1f05b820d8753cff8349c181a6\t\t ",
+            ]
+        )
 
         # Given
         mock_execute.return_value = maybe_future((0, output_tags, ""))
@@ -23,8 +29,10 @@ async def test_git_tag_success():
             [
                 "git",
                 "for-each-ref",
-                "--format=%(refname:short)%09%(objectname)",
-                "refs/tags",
+                "--format=%(refname)%09%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
+                "refs/heads/",
+                "refs/remotes/",
+                "refs/tags/",
             ],
             cwd="test_curr_path",
             timeout=20,
@@ -110,3 +118,54 @@ async def test_set_tag_succes():
                     tag, commitId
                 ),
             } == actual_response
+
+
+@pytest.mark.asyncio
+async def test_git_tag_page():
+    with patch("jupyterlab_git.git.execute") as mock_execute:
+        output_tags = "\n".join(
+            [
+                "refs/tags/v1.0.0\tv1.0.0\t6db57bf4987d387d439acd16ddfe8d54d46e8f4\t\t ",
+                "refs/tags/v1.1.0\tv1.1.0\t2aeae86b6010dd1f05b820d8753cff8349c181a6\t\t ",
+                "refs/tags/v1.2.0\tv1.2.0\t2aeae86b6010dd1f05b820d8753cff8349c181a6\t\t ",
+            ]
+        )
+
+        # Given
+        mock_execute.return_value = maybe_future((0, output_tags, ""))
+
+        # When
+        actual_response = await Git().tags(
+            "test_curr_path", pattern="v1.*", sort="date", offset=1, limit=1
+        )
+
+        # Then
+        mock_execute.assert_called_once_with(
+            [
+                "git",
+                "for-each-ref",
+                "--format=%(refname)%09%(refname:short)%09%(objectname)%09%(upstream:short)%09%(HEAD)",
+                "--ignore-case",
+                "--sort=-creatordate",
+                "--count=3",
+                "refs/tags/**/*v1.\\**",
+                "refs/tags/**/*v1.\\**/**",
+            ],
+            cwd="test_curr_path",
+            timeout=20,
+            env=None,
+            username=None,
+            password=None,
+            is_binary=False,
+        )
+
+        assert actual_response == {
+            "code": 0,
+            "tags": [
+                {
+                    "name": "v1.1.0",
+                    "baseCommitId": "2aeae86b6010dd1f05b820d8753cff8349c181a6",
+                }
+            ],
+            "has_more": True,
+        }
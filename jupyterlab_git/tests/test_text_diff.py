@@ -0,0 +1,301 @@
+import json
+import subprocess
+from unittest.mock import patch
+
+import pytest
+import tornado
+
+from jupyterlab_git.git import Git, parse_diff_hunks
+from jupyterlab_git.handlers import NAMESPACE
+
+from .testutils import maybe_future
+
+
+def init_repository(path):
+    path.mkdir(parents=True)
+    (path / "data.txt").write_text(
+        "".join("line {}\n".format(i) for i in range(1, 101))
+    )
+    for command in (
+        ["git", "init", "-b", "main"],
+        ["git", "config", "user.name", "JupyterLab Git"],
+        ["git", "config", "user.email", "jlab.git@py.test"],
+        ["git", "add", "."],
+        ["git", "commit", "-m", "init"],
+    ):
+        subprocess.check_call(command, cwd=path)
+    return path
+
+
+def edit(path, number, text):
+    lines = (path / "data.txt").read_text().splitlines(keepends=True)
+    lines[number - 1] = text + "\n"
+    (path / "data.txt").write_text("".join(lines))
+
+
+@pytest.mark.asyncio
+async def test_text_diff_working(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    edit(repository, 50, "changed")
+
+    # When
+    response = await Git().text_diff(
+        str(repository), "data.txt", {"git": "HEAD"}, {"special": "WORKING"}
+    )
+
+    # Then
+    assert response == {
+        "code": 0,
+        "binary": False,
+        "hunks": [
+            {
+                "old_start": 47,
+                "old_lines": 7,
+                "new_start": 47,
+                "new_lines": 7,
+                # Function context found by git
+                "header": "line 46",
+                "lines": [
+                    " line 47",
+                    " line 48",
+                    " line 49",
+                    "-line 50",
+                    "+changed",
+                    " line 51",
+                    " line 52",
+                    " line 53",
+                ],
+            }
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_text_diff_index_and_commits(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    edit(repository, 10, "staged")
+    subprocess.check_call(["git", "add", "data.txt"], cwd=repository)
+    edit(repository, 90, "unstaged")
+    git = Git()
+
+    # When
+    staged = await git.text_diff(
+        str(repository), "data.txt", {"git": "HEAD"}, {"special": "INDEX"}, context=0
+    )
+    unstaged = await git.text_diff(
+        str(repository),
+        "data.txt",
+        {"special": "INDEX", "git": "INDEX"},
+        {"special": "WORKING"},
+        context=0,
+    )
+    subprocess.check_call(["git", "commit", "-qam", "update"], cwd=repository)
+    committed = await git.text_diff(
+        str(repository), "data.txt", {"git": "HEAD~1"}, {"git": "HEAD"}, context=0
+    )
+
+    # Then
+    assert [h["lines"] for h in staged["hunks"]] == [["-line 10", "+staged"]]
+    assert [h["lines"] for h in unstaged["hunks"]] == [["-line 90", "+unstaged"]]
+    assert [h["lines"] for h in committed["hunks"]] == [
+        ["-line 10", "+staged"],
+        ["-line 90", "+unstaged"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_text_diff_in_process():
+    with patch.object(Git, "get_content_at_reference") as mock_content:
+        # Given
+        mock_content.side_effect = [
+            maybe_future({"content": "a\nb\nc\n"}),
+            maybe_future({"content": "a\nB\nc\n"}),
+        ]
+
+        # When
+        response = await Git().text_diff(
+            "repo", "file.txt", {"special": "BASE"}, {"special": "WORKING"}
+        )
+
+        # Then
+        assert response["hunks"] == [
+            {
+                "old_start": 1,
+                "old_lines": 3,
+                "new_start": 1,
+                "new_lines": 3,
+                "header": "",
+                "lines": [" a", "-b", "+B", " c"],
+            }
+        ]
+
+
+@pytest.mark.asyncio
+async def test_text_diff_invalid_context():
+    with pytest.raises(tornado.web.HTTPError) as error:
+        await Git().text_diff(
+            "repo", "file.txt", {"git": "HEAD"}, {"special": "WORKING"}, context=-1
+        )
+
+    assert error.value.status_code == 400
+
+
+def test_parse_diff_hunks():
+    patch = "\n".join(
+        [
+            "diff --git a/f b/f",
+            "--- a/f",
+            "+++ b/f",
+            "@@ -3 +3,2 @@ def main():",
+            "-old",
+            "+new",
+            "+last",
+            "\\ No newline at end of file",
+        ]
+    )
+
+    assert parse_diff_hunks(patch) == [
+        {
+            "old_start": 3,
+            "old_lines": 1,
+            "new_start": 3,
+            "new_lines": 2,
+            "header": "def main():",
+            "lines": ["-old", "+new", "+last", "\\ No newline at end of file"],
+        }
+    ]
+
+
+def test_parse_diff_hunks_split_on_line_feeds_only():
+    patch = "@@ -1 +1 @@\n-a\x0cb\r\n+a\u2028b\r"
+
+    assert parse_diff_hunks(patch)[0]["lines"] == ["-a\x0cb\r", "+a\u2028b\r"]
+
+
+def test_text_diff_command_end_of_options():
+    assert Git._text_diff_command({"git": "HEAD~1"}, {"special": "WORKING"}) == [
+        "git",
+        "diff",
+        "--end-of-options",
+        "HEAD~1",
+    ]
+    assert Git._text_diff_command({"git": "--output=x"}, {"git": "HEAD"}) == [
+        "git",
+        "diff",
+        "--end-of-options",
+        "--output=x",
+        "HEAD",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_text_lines(tmp_path):
+    repository = init_repository(tmp_path / "repo")
+
+    response = await Git().text_lines(
+        str(repository), "data.txt", {"git": "HEAD"}, 99, 120
+    )
+
+    assert response == {"code": 0, "lines": ["line 99", "line 100"], "total": 100}
+
+
+async def test_text_diff_handler(jp_fetch, jp_root_dir):
+    # Given
+    repository = init_repository(jp_root_dir / "repo")
+    edit(repository, 1, "first")
+
+    # When
+    response = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "diff",
+        "text",
+        body=json.dumps(
+            {
+                "filename": "data.txt",
+                "previous": {"git": "HEAD"},
+                "current": {"special": "WORKING"},
+                "context": 1,
+            }
+        ),
+        method="POST",
+    )
+    lines = await jp_fetch(
+        NAMESPACE,
+        "repo",
+        "diff",
+        "text",
+        "lines",
+        body=json.dumps(
+            {
+                "filename": "data.txt",
+                "reference": {"special": "WORKING"},
+                "start": 1,
+                "end": 2,
+            }
+        ),
+        method="POST",
+    )
+
+    # Then
+    assert response.code == 200
+    assert json.loads(response.body)["hunks"][0]["lines"] == [
+        "-line 1",
+        "+first",
+        " line 2",
+    ]
+    assert json.loads(lines.body)["lines"] == ["first", "line 2"]
+
+
+@pytest.mark.asyncio
+async def test_text_lines_ranges(tmp_path):
+    # Given
+    repository = init_repository(tmp_path / "repo")
+    (repository / "data.txt").write_text("a\x0cb\nc\u2028d\ne")
+    subprocess.check_call(["git", "commit", "-qam", "update"], cwd=repository)
+    git = Git()
+
+    # When
+    ranges = [
+        await git.text_lines(str(repository), "data.txt", {"git": "HEAD"}, *lines)
+        for lines in [(1, 1), (2, 5), (4, 5)]
+    ]
+
+    # Then
+    assert ranges == [
+        {"code": 0, "lines": ["a\x0cb"], "total": 3},
+        {"code": 0, "lines": ["c\u2028d", "e"], "total": 3},
+        {"code": 0, "lines": [], "total": 3},
+    ]
+    assert len(git._line_offsets_cache) == 1
+
+
+async def test_text_lines_handler_failure(jp_fetch, jp_root_dir):
+    init_repository(jp_root_dir / "repo")
+
+    with patch.object(Git, "text_lines") as mock_lines:
+        mock_lines.return_value = maybe_future(
+            {"code": 128, "command": "git cat-file", "message": "fatal"}
+        )
+
+        with pytest.raises(tornado.httpclient.HTTPClientError) as error:
+            await jp_fetch(
+                NAMESPACE,
+                "repo",
+                "diff",
+                "text",
+                "lines",
+                body=json.dumps(
+                    {
+                        "filename": "data.txt",
+                        "reference": {"git": "HEAD"},
+                        "start": 1,
+                        "end": 2,
+                    }
+                ),
+                method="POST",
+            )
+
+    assert error.value.code == 500
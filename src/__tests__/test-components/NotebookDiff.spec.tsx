@@ -3,7 +3,6 @@ import { DiffModel } from '../../components/diff/model';
 import { NotebookDiff, ROOT_CLASS } from '../../components/diff/NotebookDiff';
 import { requestAPI } from '../../git';
 import { Git } from '../../tokens';
-import * as diffResponse from './data/nbDiffResponse.json';
 import { RenderMimeRegistry } from '@jupyterlab/rendermime';
 
 jest.mock('../../git');
@@ -26,7 +25,60 @@ describe('NotebookDiff', () => {
       repositoryPath: 'path'
     });
 
-    (requestAPI as jest.Mock).mockResolvedValueOnce(diffResponse);
+    (requestAPI as jest.Mock)
+      .mockResolvedValueOnce({
+        previous: 'previous-key',
+        current: 'current-key',
+        metadata: false,
+        cells: [
+          {
+            status: 'modified',
+            previous: 0,
+            current: 0,
+            cell_type: 'code',
+            changes: ['source']
+          },
+          {
+            status: 'added',
+            previous: null,
+            current: 1,
+            cell_type: 'markdown',
+            changes: []
+          }
+        ]
+      })
+      .mockResolvedValueOnce({
+        cells: [
+          {
+            previous: 0,
+            current: 0,
+            base: {
+              cell_type: 'code',
+              source: 'a = 1',
+              metadata: {},
+              outputs: [],
+              execution_count: null
+            },
+            diff: [
+              {
+                op: 'patch',
+                key: 'source',
+                diff: [
+                  { op: 'addrange', key: 0, valuelist: ['a = 2'] },
+                  { op: 'removerange', key: 0, length: 1 }
+                ]
+              }
+            ]
+          },
+          {
+            previous: null,
+            current: 1,
+            base: null,
+            diff: null,
+            remote: { cell_type: 'markdown', source: '# Title', metadata: {} }
+          }
+        ]
+      });
 
     // When
     const widget = new NotebookDiff(model, new RenderMimeRegistry());
@@ -38,16 +90,28 @@ describe('NotebookDiff', () => {
       resolveTest = resolve;
     });
     setTimeout(() => {
-      expect(requestAPI).toHaveBeenCalled();
-      expect(requestAPI).toBeCalledWith('diffnotebook', 'POST', {
+      expect(requestAPI).toHaveBeenCalledTimes(2);
+      expect(requestAPI).toBeCalledWith('diffnotebook/summary', 'POST', {
         currentContent: 'challenger',
         previousContent: 'reference'
       });
+      // The cell diffs are requested once the cells are displayed
+      expect(requestAPI).toBeCalledWith('diffnotebook/cells', 'POST', {
+        previous: 'previous-key',
+        current: 'current-key',
+        cells: [
+          [0, 0],
+          [null, 1]
+        ]
+      });
       expect(widget.node.querySelectorAll('.jp-git-diff-error')).toHaveLength(
         0
       );
       expect(widget.node.querySelectorAll(`.${ROOT_CLASS}`)).toHaveLength(1);
-      expect(widget.node.querySelectorAll('.jp-Notebook-diff')).toHaveLength(1);
+      expect(widget.node.querySelectorAll('.jp-Notebook-diff')).toHaveLength(2);
+      expect(
+        widget.node.querySelectorAll('.jp-git-diff-cell-placeholder')
+      ).toHaveLength(0);
       resolveTest();
     }, 1);
     await terminateTest;
@@ -88,7 +152,7 @@ describe('NotebookDiff', () => {
     });
     setTimeout(() => {
       expect(requestAPI).toHaveBeenCalled();
-      expect(requestAPI).toBeCalledWith('diffnotebook', 'POST', {
+      expect(requestAPI).toBeCalledWith('diffnotebook/summary', 'POST', {
         currentContent: 'challenger',
         previousContent: 'reference'
       });
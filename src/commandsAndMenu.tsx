@@ -1377,24 +1377,55 @@ export function addCommands(
           )})`;
         }
 
+        let conflict: Promise<Git.IConflictFile | undefined> | null = null;
         if (diffContext.baseRef) {
           props.reference.label = trans.__('Current');
           props.challenger.label = trans.__('Incoming');
 
-          // Only add base when diff-ing merge conflicts
-          props.base = {
-            content: async () => {
-              return requestAPI<Git.IDiffContent>(
-                URLExt.join(repositoryPath, 'content'),
+          // Read the three versions of the conflicted file in a single request
+          // kept until the diff is refreshed
+          const readStage = async (
+            stage: 'base' | 'ours' | 'theirs',
+            fallback: () => Promise<string>
+          ): Promise<string> => {
+            if (!conflict) {
+              conflict = requestAPI<Git.IConflictsResult>(
+                URLExt.join(repositoryPath, 'conflicts'),
                 'POST',
-                {
-                  filename,
-                  reference: {
-                    special: Git.Diff.SpecialRef[diffContext.baseRef as any]
-                  }
+                { filenames: [filename] }
+              ).then(data => data.files[0]);
+              conflict.catch(() => {
+                conflict = null;
+              });
+            }
+            const file = await conflict;
+            // Once resolved, the file has no stages anymore; binary
+            // versions are base64 encoded
+            if (!file || file[stage]?.binary) {
+              return fallback();
+            }
+            return file[stage]?.content ?? '';
+          };
+          const readBase = async () => {
+            return requestAPI<Git.IDiffContent>(
+              URLExt.join(repositoryPath, 'content'),
+              'POST',
+              {
+                filename,
+                reference: {
+                  special: Git.Diff.SpecialRef[diffContext.baseRef as any]
                 }
-              ).then(data => data.content);
-            },
+              }
+            ).then(data => data.content);
+          };
+          const readReference = props.reference.content;
+          const readChallenger = props.challenger.content;
+          props.reference.content = () => readStage('ours', readReference);
+          props.challenger.content = () => readStage('theirs', readChallenger);
+
+          // Only add base when diff-ing merge conflicts
+          props.base = {
+            content: () => readStage('base', readBase),
             label: trans.__('Result'),
             source: diffContext.baseRef,
             updateAt: Date.now()
@@ -1403,6 +1434,10 @@ export function addCommands(
 
         // Create the diff widget
         const model = new DiffModel(props);
+        // Read the conflicted versions again when the diff is refreshed
+        model.changed.connect(() => {
+          conflict = null;
+        });
 
         const widget = await commands.execute(CommandIDs.gitShowDiff, {
           model,
@@ -2153,7 +2188,8 @@ export async function showGitOperationDialog<T>(
         );
         break;
       case Operation.Fetch:
-        result = await model.fetch(authentication);
+        // Requested by the user; do not wait for the scheduled fetch
+        result = await model.fetch(authentication, true);
         model.credentialsRequired = false;
         break;
       default:
@@ -146,6 +146,19 @@ export class SinglePastCommitInfo extends React.Component<
           modifiedFiles: log.modified_files!,
           loadingState: 'success'
         });
+
+        if (
+          log.modified_files?.some(file =>
+            file.modified_file_path.endsWith('.ipynb')
+          )
+        ) {
+          // Prepare the notebook diffs while the user browses the files
+          this.props.model
+            .precomputeNotebookDiffs(this.props.commit.commit)
+            .catch(reason => {
+              console.warn('Failed to precompute the notebook diffs.', reason);
+            });
+        }
       }
     } catch (err) {
       console.error(
@@ -5,7 +5,11 @@
 
 /* eslint-disable no-inner-declarations */
 
-import { INotebookContent } from '@jupyterlab/nbformat';
+import {
+  ICell,
+  INotebookContent,
+  INotebookMetadata
+} from '@jupyterlab/nbformat';
 import { IRenderMimeRegistry } from '@jupyterlab/rendermime';
 import { Contents } from '@jupyterlab/services';
 import { nullTranslator, TranslationBundle } from '@jupyterlab/translation';
@@ -42,17 +46,71 @@ export const ROOT_CLASS = 'nbdime-root';
 const HIDE_UNCHANGED_CLASS = 'jp-mod-hideUnchanged';
 
 /**
- * Data return by the ndbime api endpoint
+ * Class of the placeholder of a cell whose diff is not loaded yet
+ */
+const CELL_PLACEHOLDER_CLASS = 'jp-git-diff-cell-placeholder';
+
+/**
+ * Margin around the viewport within which the cell diffs are loaded
+ */
+const CELLS_LOADING_MARGIN = '500px';
+
+/**
+ * Cells alignment returned by the diffnotebook/summary endpoint
  */
-interface INbdimeDiff {
+interface ICellsSummary {
   /**
-   * Base notebook content
+   * Key of the previous notebook
    */
-  base: INotebookContent;
+  previous: string;
+  /**
+   * Key of the current notebook
+   */
+  current: string;
+  /**
+   * Aligned cells in the notebooks order
+   */
+  cells: ICellSummary[];
   /**
-   * Diff to obtain challenger from base
+   * Whether the notebook metadata changed
    */
-  diff: IDiffEntry[];
+  metadata: boolean;
+}
+
+/**
+ * Change of a cell between two notebooks
+ */
+interface ICellSummary {
+  status: 'unchanged' | 'modified' | 'added' | 'removed';
+  /**
+   * Cell index in the previous notebook; null for an added cell
+   */
+  previous: number | null;
+  /**
+   * Cell index in the current notebook; null for a removed cell
+   */
+  current: number | null;
+  cell_type: string;
+}
+
+/**
+ * Cell diff returned by the diffnotebook/cells endpoint
+ */
+interface ICellDiff {
+  previous: number | null;
+  current: number | null;
+  /**
+   * Previous cell
+   */
+  base: ICell | null;
+  /**
+   * Diff from the previous to the current cell
+   */
+  diff: IDiffEntry[] | null;
+  /**
+   * Current cell; only for an added cell
+   */
+  remote?: ICell;
 }
 
 interface INbdimeMergeDiff {
@@ -258,14 +316,15 @@ export class NotebookDiff extends Panel implements Git.Diff.IDiffWidget {
       const challengerContent = await this._model.challenger.content();
       const baseContent = await this._model.base?.content();
 
-      const createView = baseContent
-        ? this.createMergeView.bind(this)
-        : this.createDiffView.bind(this);
+      if (!baseContent) {
+        await this.createCellsDiffView(challengerContent, referenceContent);
+        return;
+      }
 
-      this._nbdWidget = await createView(
+      this._nbdWidget = await this.createMergeView(
         challengerContent,
         referenceContent,
-        baseContent ?? ''
+        baseContent
       );
 
       while (this._scroller.widgets.length > 0) {
@@ -290,17 +349,138 @@ export class NotebookDiff extends Panel implements Git.Diff.IDiffWidget {
     }
   }
 
-  protected async createDiffView(
+  /**
+   * Display the cells of two notebooks and diff them as they scroll into view.
+   *
+   * The cells are aligned first, which is much faster than a notebook diff;
+   * each cell is displayed as a placeholder until its diff is loaded.
+   */
+  protected async createCellsDiffView(
     challengerContent: string,
     referenceContent: string
-  ): Promise<NotebookDiffWidget> {
-    const data = await requestAPI<INbdimeDiff>('diffnotebook', 'POST', {
-      currentContent: challengerContent,
-      previousContent: referenceContent
+  ): Promise<void> {
+    const summary = await requestAPI<ICellsSummary>(
+      'diffnotebook/summary',
+      'POST',
+      {
+        currentContent: challengerContent,
+        previousContent: referenceContent
+      }
+    );
+    const metadata = Private.languageMetadata(
+      challengerContent,
+      referenceContent
+    );
+
+    this._cellsObserver?.disconnect();
+    this._cellsObserver = null;
+    while (this._scroller.widgets.length > 0) {
+      this._scroller.widgets[0].dispose();
+    }
+
+    if (summary.metadata) {
+      const note = new Widget();
+      note.addClass('jp-git-diff-notebook-metadata');
+      note.node.textContent = this._trans.__('The notebook metadata changed.');
+      this._scroller.addWidget(note);
+    }
+
+    const placeholders = new Map<Element, [Widget, ICellSummary]>();
+    for (const cell of summary.cells) {
+      const placeholder = Private.cellPlaceholder(cell, this._trans);
+      placeholders.set(placeholder.node, [placeholder, cell]);
+      this._scroller.addWidget(placeholder);
+    }
+    Private.markUnchangedRanges(this._scroller.node, false);
+
+    const load = (nodes: Element[]): Promise<void> =>
+      this.loadCells(
+        summary,
+        nodes.map(node => placeholders.get(node)!),
+        metadata
+      );
+
+    if (typeof IntersectionObserver === 'undefined') {
+      await load([...placeholders.keys()]);
+      return;
+    }
+
+    const observer = (this._cellsObserver = new IntersectionObserver(
+      entries => {
+        const visible = entries
+          .filter(entry => entry.isIntersecting)
+          .map(entry => entry.target);
+        visible.forEach(node => observer.unobserve(node));
+        if (visible.length > 0) {
+          load(visible).catch(reason => {
+            console.error(reason);
+          });
+        }
+      },
+      { rootMargin: CELLS_LOADING_MARGIN }
+    ));
+    placeholders.forEach((_, node) => observer.observe(node));
+  }
+
+  /**
+   * Load the diffs of some cells and display them instead of placeholders.
+   */
+  protected async loadCells(
+    summary: ICellsSummary,
+    cells: [Widget, ICellSummary][],
+    metadata: INotebookMetadata
+  ): Promise<void> {
+    let data: { cells: ICellDiff[] };
+    try {
+      data = await requestAPI<{ cells: ICellDiff[] }>(
+        'diffnotebook/cells',
+        'POST',
+        {
+          previous: summary.previous,
+          current: summary.current,
+          cells: cells.map(([, cell]) => [cell.previous, cell.current])
+        }
+      );
+    } catch (reason) {
+      const message = (reason as Error).message ?? reason;
+      for (const [placeholder] of cells) {
+        placeholder.node.textContent = this._trans.__(
+          'Failed to load the cell diff: %1',
+          message
+        );
+      }
+      return;
+    }
+
+    const widgets: NotebookDiffWidget[] = [];
+    data.cells.forEach((cellDiff, index) => {
+      const placeholder = cells[index][0];
+      const position = this._scroller.widgets.indexOf(placeholder);
+      if (position < 0) {
+        // The view has been refreshed
+        return;
+      }
+      const [base, diff] = Private.cellNotebookDiff(cellDiff, metadata);
+      const widget = new NotebookDiffWidget({
+        model: new NotebookDiffModel(base, diff),
+        rendermime: this._renderMime
+      });
+      this._scroller.insertWidget(position, widget as any);
+      placeholder.dispose();
+      widgets.push(widget);
     });
 
-    const model = new NotebookDiffModel(data.base, data.diff);
-    return new NotebookDiffWidget({ model, rendermime: this._renderMime });
+    await Promise.all(
+      widgets.map(widget =>
+        widget.init().catch(reason => {
+          // See refresh for the nbdime initialization failures
+          console.debug(
+            this._trans.__('Failed to init notebook diff view: %1', reason)
+          );
+        })
+      )
+    );
+    Private.markUnchangedRanges(this._scroller.node, false);
   }
 
   protected async createMergeView(
@@ -318,6 +498,15 @@ export class NotebookDiff extends Panel implements Git.Diff.IDiffWidget {
     return new NotebookMergeWidget({ model, rendermime: this._renderMime });
   }
 
+  /**
+   * Dispose of the resources held by the widget.
+   */
+  dispose(): void {
+    this._cellsObserver?.disconnect();
+    this._cellsObserver = null;
+    super.dispose();
+  }
+
   /**
    * Handle `'activate-request'` messages.
    */
@@ -351,6 +540,7 @@ export class NotebookDiff extends Panel implements Git.Diff.IDiffWidget {
   }
 
   protected _areUnchangedCellsHidden = false;
+  protected _cellsObserver: IntersectionObserver | null = null;
   protected _isReady: Promise<void>;
   protected _lastSerializeModel: INotebookContent | null = null;
   protected _model: Git.Diff.IModel;
@@ -363,6 +553,78 @@ export class NotebookDiff extends Panel implements Git.Diff.IDiffWidget {
 }
 
 namespace Private {
+  /**
+   * Get the metadata telling the language of the first readable notebook.
+   */
+  export function languageMetadata(...contents: string[]): INotebookMetadata {
+    for (const content of contents) {
+      if (!content) {
+        continue;
+      }
+      try {
+        const metadata: INotebookMetadata =
+          (JSON.parse(content) as INotebookContent).metadata ?? {};
+        const { kernelspec, language_info } = metadata;
+        return {
+          ...(kernelspec ? { kernelspec } : {}),
+          ...(language_info ? { language_info } : {})
+        };
+      } catch (reason) {
+        // Not a notebook JSON; the cells are then displayed as plain text
+      }
+    }
+    return {};
+  }
+
+  /**
+   * Create the placeholder of a cell whose diff is not loaded yet.
+   *
+   * It is styled as a cell diff so that the unchanged cells can be hidden.
+   */
+  export function cellPlaceholder(
+    cell: ICellSummary,
+    trans: TranslationBundle
+  ): Widget {
+    const placeholder = new Widget();
+    placeholder.addClass(CELLDIFF_CLASS);
+    placeholder.addClass(CELL_PLACEHOLDER_CLASS);
+    if (cell.status === 'unchanged') {
+      placeholder.addClass(UNCHANGED_DIFF_CLASS);
+    }
+    placeholder.node.textContent = trans.__(
+      'Loading %1 cell...',
+      cell.cell_type
+    );
+    return placeholder;
+  }
+
+  /**
+   * Get a one cell notebook and its diff displaying the diff of a cell.
+   */
+  export function cellNotebookDiff(
+    cell: ICellDiff,
+    metadata: INotebookMetadata
+  ): [INotebookContent, IDiffEntry[]] {
+    const base: INotebookContent = {
+      nbformat: 4,
+      nbformat_minor: 5,
+      metadata,
+      cells: cell.base ? [cell.base] : []
+    };
+    let cellsDiff: IDiffEntry | null = null;
+    if (cell.remote) {
+      cellsDiff = { op: 'addrange', key: 0, valuelist: [cell.remote] };
+    } else if (cell.current === null) {
+      cellsDiff = { op: 'removerange', key: 0, length: 1 };
+    } else if (cell.diff && cell.diff.length > 0) {
+      cellsDiff = { op: 'patch', key: 0, diff: cell.diff };
+    }
+    return [
+      base,
+      cellsDiff ? [{ op: 'patch', key: 'cells', diff: [cellsDiff] }] : []
+    ];
+  }
+
   /**
    * Create a header widget for the diff view.
    */
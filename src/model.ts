@@ -846,6 +846,35 @@ export class GitExtension implements IGitExtension {
     return data;
   }
 
+  /**
+   * Compute in the background the diffs of the notebooks changed by a commit,
+   * so they are ready when the notebooks are opened.
+   *
+   * @param commit - the commit whose changes are diffed
+   * @param previous - the commit to compare against; default the first parent
+   * @returns promise which resolves with the background job
+   *
+   * @throws {Git.NotInRepository} If the current path is not a Git repository
+   * @throws {Git.GitResponseError} If the server response is not ok
+   * @throws {ServerConnection.NetworkError} If the request cannot be made
+   */
+  async precomputeNotebookDiffs(
+    commit: string,
+    previous?: string
+  ): Promise<Git.IJob> {
+    const path = await this._getPathRepository();
+    const data = await requestAPI<{ code: number; job: Git.IJob }>(
+      URLExt.join(path, 'diff', 'notebooks'),
+      'POST',
+      {
+        commit,
+        previous,
+        background: true
+      }
+    );
+    return data.job;
+  }
+
   /**
    * Dispose of model resources.
    */
@@ -923,26 +952,30 @@ export class GitExtension implements IGitExtension {
    * Fetch to get ahead/behind status
    *
    * @param auth - remote authentication information
+   * @param force - whether to fetch even if the next scheduled fetch is not due
    * @returns promise which resolves upon fetching
    *
    * @throws {Git.NotInRepository} If the current path is not a Git repository
    * @throws {Git.GitResponseError} If the server response is not ok
    * @throws {ServerConnection.NetworkError} If the request cannot be made
    */
-  async fetch(auth?: Git.IAuth): Promise<Git.IResultWithMessage> {
+  async fetch(auth?: Git.IAuth, force = false): Promise<Git.IFetchResult> {
     const path = await this._getPathRepository();
-    const data = this._taskHandler.execute<Git.IResultWithMessage>(
+    const data = await this._taskHandler.execute<Git.IFetchResult>(
       'git:fetch:remote',
       async () => {
-        return await requestAPI<Git.IResultWithMessage>(
+        return await requestAPI<Git.IFetchResult>(
           URLExt.join(path, 'remote', 'fetch'),
           'POST',
           {
-            auth: auth as any
+            auth: auth as any,
+            force,
+            generation: this._fetchGeneration
           }
         );
       }
     );
+    this._fetchGeneration = data.generation ?? null;
     return data;
   }
 
@@ -2118,7 +2151,10 @@ export class GitExtension implements IGitExtension {
       return;
     }
     try {
-      await this.fetch();
+      const result = await this.fetch();
+      if (result.changed) {
+        await this.refreshBranch();
+      }
     } catch (error) {
       console.error('Failed to fetch remotes', error);
       if (
@@ -2243,6 +2279,7 @@ export class GitExtension implements IGitExtension {
   private _docmanager: IDocumentManager | null;
   private _docRegistry: DocumentRegistry | null;
   private _fetchPoll: Poll;
+  private _fetchGeneration: number | null = null;
   private _isDisposed = false;
   private _markerCache = new Markers(() => this._markChanged.emit());
   private __currentMarker: BranchMarker = new BranchMarker(() => {});
@@ -347,6 +347,20 @@ export interface IGitExtension extends IDisposable {
    */
   diff(previous?: string, current?: string): Promise<Git.IDiffResult>;
 
+  /**
+   * Compute in the background the diffs of the notebooks changed by a commit,
+   * so they are ready when the notebooks are opened.
+   *
+   * @param commit - the commit whose changes are diffed
+   * @param previous - the commit to compare against; default the first parent
+   * @returns promise which resolves with the background job
+   *
+   * @throws {Git.NotInRepository} If the current path is not a Git repository
+   * @throws {Git.GitResponseError} If the server response is not ok
+   * @throws {ServerConnection.NetworkError} If the request cannot be made
+   */
+  precomputeNotebookDiffs(commit: string, previous?: string): Promise<Git.IJob>;
+
   /**
    * Drop a stash entry, or clear the entire stash.
    *
@@ -372,13 +386,14 @@ export interface IGitExtension extends IDisposable {
    * Fetch to get ahead/behind status
    *
    * @param auth - remote authentication information
+   * @param force - whether to fetch even if the next scheduled fetch is not due
    * @returns promise which resolves upon fetching
    *
    * @throws {Git.NotInRepository} If the current path is not a Git repository
    * @throws {Git.GitResponseError} If the server response is not ok
    * @throws {ServerConnection.NetworkError} If the request cannot be made
    */
-  fetch(auth?: Git.IAuth): Promise<Git.IResultWithMessage>;
+  fetch(auth?: Git.IAuth, force?: boolean): Promise<Git.IFetchResult>;
 
   /**
    * Match files status information based on a provided file path.
@@ -965,6 +980,24 @@ export namespace Git {
     upstream: string | null;
     top_commit: string;
     tag: string | null;
+    /**
+     * Number of commits ahead of the upstream branch; null if no upstream
+     *
+     * Only set for local branches when requested.
+     */
+    ahead?: number | null;
+    /**
+     * Number of commits behind the upstream branch; null if no upstream
+     */
+    behind?: number | null;
+    /**
+     * Number of commits ahead of the requested base reference
+     */
+    base_ahead?: number;
+    /**
+     * Number of commits behind the requested base reference
+     */
+    base_behind?: number;
   }
 
   /** Interface for GitBranch request result,
@@ -974,6 +1007,10 @@ export namespace Git {
     code: number;
     branches?: IBranch[];
     current_branch?: IBranch;
+    /**
+     * Whether more branches match the request; only set for paginated requests
+     */
+    has_more?: boolean;
   }
 
   /**
@@ -986,6 +1023,50 @@ export namespace Git {
     content: string;
   }
 
+  /**
+   * Version of a conflicted file at an index stage
+   */
+  export interface IConflictVersion {
+    oid: string;
+    /**
+     * File content; base64 encoded if binary
+     */
+    content: string;
+    binary: boolean;
+  }
+
+  /**
+   * Versions of a conflicted file; null if the file does not exist at a stage
+   */
+  export interface IConflictFile {
+    filename: string;
+    base: IConflictVersion | null;
+    /**
+     * HEAD version
+     */
+    ours: IConflictVersion | null;
+    /**
+     * Version being merged
+     */
+    theirs: IConflictVersion | null;
+    /**
+     * Notebook merge decisions; only if requested
+     */
+    merge?: { base: any; merge_decisions: any[] };
+    /**
+     * Error if the merge decisions failed
+     */
+    message?: string;
+  }
+
+  /**
+   * Interface for the conflicts request result
+   */
+  export interface IConflictsResult {
+    code: number;
+    files: IConflictFile[];
+  }
+
   /**
    * Interface for GitDiff request result
    */
@@ -1279,10 +1360,102 @@ export namespace Git {
     | 'stashed'
     | null;
 
+  /**
+   * Interface for the fetch request result
+   */
+  export interface IFetchResult extends IResultWithMessage {
+    /**
+     * Whether a fetch was run or the last result was returned
+     */
+    fetched?: boolean;
+    /**
+     * Counter of the remote-tracking references changes
+     */
+    generation?: number;
+    /**
+     * Whether the remote-tracking references changed since the known generation
+     */
+    changed?: boolean;
+    /**
+     * Whether the current branch upstream is outdated; only set if the remotes were probed
+     */
+    behind_remote?: boolean;
+  }
+
+  /**
+   * Progress event of a background git operation
+   */
+  export interface IJobProgress {
+    /**
+     * Git progress phase; e.g. "Receiving objects"
+     */
+    phase: string;
+    percent: number;
+    done: number;
+    total: number;
+    /**
+     * Diffed notebook; only for the notebook diffs
+     */
+    filename?: string;
+    /**
+     * Notebook diff status; only for the notebook diffs
+     */
+    status?: INotebookDiffsFile['status'];
+  }
+
+  /**
+   * Notebook diffed by the notebook diffs precomputation
+   */
+  export interface INotebookDiffsFile {
+    filename: string;
+    /**
+     * Blob hashes; null if the notebook is added or deleted
+     */
+    previous: string | null;
+    current: string | null;
+    status: 'cached' | 'computed' | 'failed';
+    message?: string;
+  }
+
+  /**
+   * Notebook diffs precomputation result
+   */
+  export interface INotebookDiffsResult {
+    code: number;
+    files: INotebookDiffsFile[];
+  }
+
+  /**
+   * Background git operation (clone, fetch, pull, push or notebook diffs)
+   */
+  export interface IJob {
+    id: string;
+    kind: 'clone' | 'fetch' | 'pull' | 'push' | 'notebook_diffs';
+    status: 'running' | 'succeeded' | 'failed' | 'cancelled';
+    created: number;
+    finished: number | null;
+    /**
+     * Progress events since the requested index
+     */
+    events: IJobProgress[];
+    /**
+     * Index to request the next progress events
+     */
+    next: number;
+    /**
+     * Operation response once finished
+     */
+    result: IResultWithMessage | null;
+  }
+
   export interface ITagResult {
     code: number;
     message?: string;
     tags?: ITag[];
+    /**
+     * Whether more tags match the request; only set for paginated requests
+     */
+    has_more?: boolean;
   }
 
   /**